@@ -0,0 +1,151 @@
+import argparse
+import json
+import time
+from itertools import combinations
+
+from analysis import analyze_estate_gaps
+from tax import known_province, province_name
+
+# Book-wide risk totals kept as materialized views. Every combination of the
+# dimensions below has its own table of pre-aggregated cells, so a read is
+# one dict lookup. Each client's contribution to every cell is remembered;
+# when that client's findings change the old contribution is subtracted and
+# the new one added, so an update touches one household and never rescans
+# the book.
+#
+# A cell holds the number of findings, the number of households with at
+# least one of them, and the balance at risk: the total of the distinct
+# accounts those findings point at. Client-wide findings (account type ALL)
+# put every account the client holds at risk.
+#
+# Provinces are keyed by the canonical name the tax tables use, so "ON",
+# "ontario" and "Ontario" share a row; a missing or unrecognised province
+# is 'Unknown' rather than folded into the default.
+
+DIMENSIONS = ('rule', 'severity', 'account_type', 'province')
+GROUPINGS = [dims for n in range(len(DIMENSIONS) + 1) for dims in combinations(DIMENSIONS, n)]
+
+FINDINGS = 0
+HOUSEHOLDS = 1
+BALANCE = 2
+
+
+def accounts_at_risk(finding, accounts):
+    if finding['account_type'] == 'ALL':
+        return accounts
+    if finding['account_id'] is not None:
+        matched = [a for a in accounts if a.get('account_id') == finding['account_id']]
+        if matched:
+            return matched
+    # Findings without an account ID point at every account of their type
+    return [a for a in accounts if a.get('type') == finding['account_type']]
+
+
+def province_key(province):
+    return province_name(province) if known_province(province) else 'Unknown'
+
+
+def contribution(profile, findings):
+    # {(grouping, key): (findings, balance at risk)} for one household
+    accounts = profile.get('accounts', [])
+    province = province_key(profile.get('province'))
+    cells = {}
+
+    for f in findings:
+        values = {'rule': f['rule'], 'severity': f['severity'], 'account_type': f['account_type'], 'province': province}
+        at_risk = {id(a): a.get('balance') or 0 for a in accounts_at_risk(f, accounts)}
+        for dims in GROUPINGS:
+            cell = (dims, tuple(values[d] for d in dims))
+            count, balances = cells.get(cell, (0, {}))
+            cells[cell] = (count + 1, {**balances, **at_risk})
+
+    return {cell: (count, sum(balances.values())) for cell, (count, balances) in cells.items()}
+
+
+class RiskAggregates:
+
+    def __init__(self):
+        self.tables = {dims: {} for dims in GROUPINGS}
+        self.contributions = {}
+
+    def apply(self, cells, sign):
+        for (dims, key), (count, balance) in cells.items():
+            table = self.tables[dims]
+            row = table.setdefault(key, [0, 0, 0])
+            row[FINDINGS] += sign * count
+            row[HOUSEHOLDS] += sign
+            row[BALANCE] += sign * balance
+            if not row[HOUSEHOLDS]:
+                del table[key]
+
+    def update(self, client_id, profile, findings):
+        # Replaces whatever this client contributed before
+        cells = contribution(profile, findings)
+        previous = self.contributions.get(client_id)
+        if previous is not None:
+            self.apply(previous, -1)
+        self.apply(cells, 1)
+        self.contributions[client_id] = cells
+
+    def remove(self, client_id):
+        previous = self.contributions.pop(client_id, None)
+        if previous is not None:
+            self.apply(previous, -1)
+
+    def query(self, **filters):
+        # e.g. query(rule = 'R3', account_type = 'RRSP') or
+        # query(severity = 'CRITICAL', province = 'Ontario')
+        unknown = set(filters) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {sorted(unknown)}")
+        if 'province' in filters and filters['province'] != 'Unknown':
+            filters['province'] = province_key(filters['province'])
+        dims = tuple(d for d in DIMENSIONS if d in filters)
+        row = self.tables[dims].get(tuple(filters[d] for d in dims), (0, 0, 0))
+        return {'findings': row[FINDINGS], 'households': row[HOUSEHOLDS], 'balance_at_risk': row[BALANCE]}
+
+    def table(self, *by):
+        # Every cell of one grouping, e.g. table('severity', 'province')
+        dims = tuple(d for d in DIMENSIONS if d in by)
+        if len(dims) != len(by):
+            raise ValueError(f"Group by must be drawn from {DIMENSIONS}")
+        return {
+            key: {'findings': row[FINDINGS], 'households': row[HOUSEHOLDS], 'balance_at_risk': row[BALANCE]}
+            for key, row in sorted(self.tables[dims].items())
+        }
+
+    @property
+    def households(self):
+        return len(self.contributions)
+
+
+def aggregate_book(wrappers, as_of = None):
+    aggregates = RiskAggregates()
+    for i, wrapper in enumerate(wrappers):
+        client = wrapper['client']
+        aggregates.update(wrapper.get('_profile_id', i), client, analyze_estate_gaps(client, as_of = as_of, compact = True))
+    return aggregates
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Book-wide risk totals by rule, severity, account type and province')
+    parser.add_argument('book', help = 'clients.json')
+    parser.add_argument('--by', nargs = '+', default = ['severity', 'province'], choices = DIMENSIONS)
+    parser.add_argument('--as-of', default = None, help = 'Evaluate date-based rules as of YYYY-MM-DD (default: today)')
+    args = parser.parse_args()
+
+    with open(args.book) as f:
+        wrappers = json.load(f)['clients']
+
+    start = time.perf_counter()
+    aggregates = aggregate_book(wrappers, args.as_of)
+    elapsed = time.perf_counter() - start
+    print(f"  {aggregates.households} households aggregated in {elapsed:.2f}s\n")
+
+    for key, row in aggregates.table(*args.by).items():
+        label = ' / '.join(str(k) for k in key)
+        print(f"  {label:<40} {row['findings']:>7} findings {row['households']:>7} households  ${row['balance_at_risk']:>14,}")
+
+
+if __name__ == "__main__":
+    main()
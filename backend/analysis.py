@@ -1,3 +1,38 @@
+import hashlib
+import re
+import sys
+import unicodedata
+from datetime import date, datetime
+from functools import lru_cache
+from string import Formatter
+from time import perf_counter
+
+from metrics import ANALYSIS_BUCKETS, RULE_BUCKETS, TELEMETRY, counter, histogram, on_toggle, span
+from rulepack import DEFAULT_PATH as RULE_PACK_PATH, RulePackHolder
+from tax import DEFAULT_OTHER_INCOME, DESIGNEE_SLOTS, deemed_income_tax, passes_to_estate, probate_fee, province_label, spousal_rollover
+
+# Bump whenever rule logic or finding text changes — cached findings keyed
+# on an older version are ignored
+ENGINE_VERSION = '1.4'
+
+
+@lru_cache(maxsize = 65536)
+def parse_date(text):
+    # Profiles repeat the same handful of dates across a book, so parsing
+    # is cached
+    return datetime.strptime(text, '%Y-%m-%d').date()
+
+
+def to_date(value):
+    if value is None:
+        return date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return parse_date(value)
+
+
 def safe_get(obj, *keys):
     current = obj
     for key in keys:
@@ -7,573 +42,979 @@ def safe_get(obj, *keys):
             return None
         current = current.get(key)
     return current
-    
-def check_province(client):
-    findings = []
 
-    province = client.get('province', '')
 
-    # CHECK 1 — Quebec hard stop (Rule Q1)
-    if province.lower() in ['quebec', 'qc']:
-        findings.append({
-            'severity': 'REQUIRES_SPECIALIST',
-            'account_id': None,
-            'account_type': 'ALL',
-            'rule': 'Q1',
-            'issue': 'Quebec client — this analysis may be incomplete',
-            'consequence': 'Quebec operates under civil law, which is fundamentally different from the rest of Canada. Beneficiary designations on RRSPs and RRIFs work differently — they are made through the contract with the financial institution or through a will, not a simple form. Rules that apply in other provinces may not apply here.',
-            'action': 'Consult a Quebec notary before making any estate planning decisions. Do not rely solely on this analysis for Quebec-specific situations.'
-        })
+HONORIFICS = {'mr', 'mrs', 'ms', 'miss', 'dr'}
+# Generational suffixes tell a father from his son, so they stay in the key
+SUFFIXES = {'junior': 'jr', 'senior': 'sr'}
+NON_LETTERS = re.compile(r"[^\w\s]")
+
+
+@lru_cache(maxsize = 65536)
+def normalize_name(name):
+    # 'Dr. Zoë  O'Brien-Smith' and 'zoe obrien smith' are the same person
+    if not isinstance(name, str):
+        return None
+    text = unicodedata.normalize('NFKD', name)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = NON_LETTERS.sub(lambda m: ' ' if m.group() == '-' else '', text)
+    words = [SUFFIXES.get(w, w) for w in text.split() if w not in HONORIFICS]
+    return ' '.join(words) or None
+
+
+# Finding text shared by every engine. Placeholders are filled from the
+# params passed to build_finding.
+FINDING_TEMPLATES = {
+    'Q1': {
+        'severity': 'REQUIRES_SPECIALIST',
+        'account_type': 'ALL',
+        'rule': 'Q1',
+        'issue': 'Quebec client — this analysis may be incomplete',
+        'consequence': 'Quebec operates under civil law, which is fundamentally different from the rest of Canada. Beneficiary designations on RRSPs and RRIFs work differently — they are made through the contract with the financial institution or through a will, not a simple form. Rules that apply in other provinces may not apply here.',
+        'action': 'Consult a Quebec notary before making any estate planning decisions. Do not rely solely on this analysis for Quebec-specific situations.'
+    },
+    'T1': {
+        'severity': 'HIGH',
+        'account_type': 'TFSA',
+        'rule': 'T1',
+        'issue': 'No successor holder or beneficiary named',
+        'consequence': 'Account loses tax-free status on death and enters estate — subject to probate delays and tax on growth after death',
+        'action': 'Name a successor holder if married or common-law. Name a beneficiary at minimum.'
+    },
+    'T3': {
+        'severity': 'CRITICAL',
+        'account_type': 'TFSA',
+        'rule': 'T3',
+        'issue': 'Successor holder on TFSA is an ex-spouse',
+        'consequence': 'Ex-spouse legally inherits the entire TFSA tax-free and immediately upon death. Divorce does not remove this automatically. Your will cannot override it. There is no recovery once it happens.',
+        'action': 'Update successor holder immediately. This is the single most urgent fix in your estate plan.'
+    },
+    'T6-successor': {
+        'severity': 'CRITICAL',
+        'account_type': 'TFSA',
+        'rule': 'T6',
+        'issue': 'Successor holder on TFSA is deceased',
+        'consequence': 'The designation has failed. The account will fall into your estate as if no successor holder was ever named — probate applies, tax-free status is lost on post-death growth.',
+        'action': 'Name a new successor holder immediately. Consider adding a contingent beneficiary as a backup.'
+    },
+    'T6-beneficiary': {
+        'severity': 'CRITICAL',
+        'account_type': 'TFSA',
+        'rule': 'T6',
+        'issue': 'Primary beneficiary on TFSA is deceased',
+        'consequence': 'The designation has failed. Account falls into estate — probate, delays, and loss of tax-free status on any growth after date of death.',
+        'action': 'Update beneficiary to a living person immediately. Add a contingent beneficiary as a backup going forward.'
+    },
+    'T2': {
+        'severity': 'MEDIUM',
+        'account_type': 'TFSA',
+        'rule': 'T2',
+        'issue': 'Spouse named as beneficiary instead of successor holder',
+        'consequence': 'Spouse receives the money tax-free but the account itself closes. They lose the contribution room and tax-free status of the account. Successor holder designation would have preserved both.',
+        'action': 'Upgrade designation from beneficiary to successor holder. Your spouse keeps the account itself, not just the cash.'
+    },
+    'T5': {
+        'severity': 'MEDIUM',
+        'account_type': 'TFSA',
+        'rule': 'T5',
+        'issue': 'Minor child named as TFSA beneficiary',
+        'consequence': 'Minors cannot legally receive large sums directly. A court-appointed trustee will control the funds until the child reaches age of majority (18 or 19 depending on province). This creates legal costs and delays — and the child still gets the money at 18 regardless of maturity.',
+        'action': 'Consider naming the other parent as beneficiary instead, or establish a formal trust with conditions for when and how the child receives the funds.'
+    },
+    'C6-TFSA': {
+        'severity': 'MEDIUM',
+        'account_type': 'TFSA',
+        'rule': 'C6',
+        'issue': 'No contingent beneficiary named on TFSA',
+        'consequence': 'If your primary beneficiary dies before you and you have not updated the designation, the account falls to your estate. A contingent beneficiary is a backup that prevents this automatically.',
+        'action': 'Name a contingent beneficiary on this account. Common choices are adult children, a sibling, or a trusted person.'
+    },
+    'R1-RRSP': {
+        'severity': 'HIGH',
+        'account_type': 'RRSP',
+        'rule': 'R1',
+        'issue': 'No beneficiary or successor annuitant named on RRSP',
+        'consequence': 'Full RRSP value is added to your income in the year of death. On this ${balance:,} RRSP that could mean about ${tax:,} in unexpected taxes. Account also enters probate — delays and additional costs on top of the tax hit.',
+        'action': 'If married or common-law: name your spouse as successor annuitant immediately. If single: name a beneficiary. Either is far better than nothing.'
+    },
+    'R2': {
+        'severity': 'MEDIUM',
+        'account_type': 'RRSP',
+        'rule': 'R2',
+        'issue': 'Spouse named as beneficiary instead of successor annuitant on RRSP',
+        'consequence': 'Spouse receives the RRSP tax-free via spousal rollover — which is good. But the process is more complex than successor annuitant. The account closes and spouse receives a lump sum transfer rather than inheriting the account itself.',
+        'action': 'Upgrade designation to successor annuitant. Cleaner transfer, same tax benefit, less administrative burden on your spouse during an already difficult time.'
+    },
+    'R3-RRSP-annuitant': {
+        'severity': 'CRITICAL',
+        'account_type': 'RRSP',
+        'rule': 'R3',
+        'issue': 'Ex-spouse still listed as successor annuitant on RRSP',
+        'consequence': 'Ex-spouse legally receives the entire RRSP. This is ironclad — your will cannot override it, courts will generally not override it. The ex-spouse keeps the money. Divorce does not automatically remove this designation.',
+        'action': 'Update this immediately. This is the highest priority fix for any recently divorced client.'
+    },
+    'R3-RRSP-beneficiary': {
+        'severity': 'CRITICAL',
+        'account_type': 'RRSP',
+        'rule': 'R3',
+        'issue': 'Ex-spouse still listed as primary beneficiary on RRSP',
+        'consequence': 'Ex-spouse legally receives the full RRSP value. They will also owe income tax on the full amount that year — but that does not reduce what they receive. Your will cannot override this designation.',
+        'action': 'Update beneficiary designation immediately.'
+    },
+    'R6-RRSP-beneficiary': {
+        'severity': 'CRITICAL',
+        'account_type': 'RRSP',
+        'rule': 'R6',
+        'issue': 'Primary beneficiary on RRSP is deceased',
+        'consequence': 'Designation has failed. Full RRSP value collapses into your estate as income in year of death — maximum tax exposure plus probate delays. Treated as if no beneficiary was ever named.',
+        'action': 'Update beneficiary immediately. Consider naming a contingent beneficiary as a permanent backup.'
+    },
+    'R4': {
+        'severity': 'MEDIUM',
+        'account_type': 'RRSP',
+        'rule': 'R4',
+        'issue': 'Non-spouse ({relationship}) named as RRSP beneficiary — significant tax consequence',
+        'consequence': 'Your {relationship} receives the full RRSP value but it is added entirely to their income that year. On this account balance of ${balance:,} that could mean about ${tax:,} in tax the same year they receive it. This is often a complete surprise.',
+        'action': 'Make sure your beneficiary understands this tax consequence. Consider life insurance as a strategy to cover the tax bill, or review whether this designation still reflects your intent.'
+    },
+    'R5': {
+        'severity': 'MEDIUM',
+        'account_type': 'RRSP',
+        'rule': 'R5',
+        'issue': 'Minor child named as RRSP beneficiary',
+        'consequence': 'Minor children cannot receive RRSP proceeds directly. A court-appointed trustee controls the funds until age of majority. However — if the child is financially dependent due to disability, there are favorable tax rules available that require specific documentation to claim.',
+        'action': 'Confirm whether the child qualifies as a financially dependent minor or disabled dependent. If yes, ensure dependency is documented. If no, consider naming the other parent or establishing a trust.'
+    },
+    'C6-RRSP': {
+        'severity': 'MEDIUM',
+        'account_type': 'RRSP',
+        'rule': 'C6',
+        'issue': 'No contingent beneficiary named on RRSP',
+        'consequence': 'If your primary beneficiary dies before you and the designation is not updated, the full RRSP value collapses into your estate — maximum tax exposure and probate delays.',
+        'action': 'Name a contingent beneficiary. On an RRSP this is especially important given the tax consequences of the account entering the estate.'
+    },
+    'R1-RRIF': {
+        'severity': 'HIGH',
+        'account_type': 'RRIF',
+        'rule': 'R1',
+        'issue': 'No beneficiary or successor annuitant named on RRIF',
+        'consequence': 'Full RRIF value is added to your income in the year of death — on this ${balance:,} RRIF about ${tax:,}, potentially the largest single tax bill your estate will face. Account enters probate on top of the tax hit.',
+        'action': 'Name your spouse as successor annuitant immediately. If no spouse, name a beneficiary. Do not leave this blank.'
+    },
+    'R6-RRIF-annuitant': {
+        'severity': 'CRITICAL',
+        'account_type': 'RRIF',
+        'rule': 'R6',
+        'issue': 'Successor annuitant on RRIF is deceased',
+        'consequence': 'The designation has failed. The full RRIF balance collapses into your estate as income in the year of death. On large RRIFs this can mean a six-figure tax bill with no liquid assets to pay it.',
+        'action': 'Update successor annuitant immediately. Review whether your estate has enough liquid assets to cover the potential tax liability.'
+    },
+    'R6-RRIF-beneficiary': {
+        'severity': 'CRITICAL',
+        'account_type': 'RRIF',
+        'rule': 'R6',
+        'issue': 'Primary beneficiary on RRIF is deceased',
+        'consequence': 'Designation has failed. Full RRIF value enters estate as taxable income in year of death. With no liquid assets to cover the bill, the executor may be forced to sell other estate assets.',
+        'action': 'Update beneficiary immediately. Given the size of most RRIFs, also review estate liquidity — is there enough cash outside this account to pay the tax bill?'
+    },
+    'R3-RRIF-annuitant': {
+        'severity': 'CRITICAL',
+        'account_type': 'RRIF',
+        'rule': 'R3',
+        'issue': 'Ex-spouse still listed as successor annuitant on RRIF',
+        'consequence': 'Ex-spouse steps into your RRIF and continues receiving payments as if the account were always theirs. This cannot be undone after death. Your will cannot override it.',
+        'action': 'Update immediately. Highest priority fix.'
+    },
+    'R7': {
+        'severity': 'HIGH',
+        'account_type': 'RRIF',
+        'rule': 'R7',
+        'issue': 'Large RRIF with insufficient liquid assets to cover potential estate tax bill',
+        'consequence': 'This RRIF is worth ${balance:,}. If it collapses into the estate, income tax and probate in {province} could reach ${tax:,}. Your non-registered assets total only ${non_registered_balance:,} — potentially not enough to cover it. The executor may be forced to sell assets or borrow.',
+        'action': 'Review estate liquidity with a financial advisor. Life insurance is often used specifically to fund this tax liability.'
+    },
+    'C6-RRIF': {
+        'severity': 'MEDIUM',
+        'account_type': 'RRIF',
+        'rule': 'C6',
+        'issue': 'No contingent beneficiary named on RRIF',
+        'consequence': 'If primary beneficiary predeceases you and designation is not updated, the full RRIF value enters your estate as taxable income. The stakes on a RRIF are higher than most accounts given the tax exposure.',
+        'action': 'Name a contingent beneficiary on this account as a permanent safety net.'
+    },
+    'L1': {
+        'severity': 'HIGH',
+        'account_type': 'ALL',
+        'rule': 'L1',
+        'issue': 'Recently married but spouse not named on any account',
+        'consequence': 'Your new spouse has no legal claim to any of your registered accounts. In most provinces marriage does not automatically update beneficiary designations. If you die tomorrow your spouse may receive nothing from your investment accounts.',
+        'action': 'Review and update all account designations to reflect your marriage. Update your will at the same time.'
+    },
+    'L2': {
+        'severity': 'CRITICAL',
+        'account_type': 'ALL',
+        'rule': 'L2',
+        'issue': 'Recently divorced but ex-spouse still named on one or more accounts',
+        'consequence': 'Divorce does NOT automatically remove beneficiary designations in Canada. Your ex-spouse will legally inherit every account still named in their favour. Your will cannot override this. This is the most common and costly estate planning mistake Canadians make.',
+        'action': 'Treat this as an emergency. Update every account designation today. Do not wait.'
+    },
+    'L3': {
+        'severity': 'MEDIUM',
+        'account_type': 'ALL',
+        'rule': 'L3',
+        'issue': 'New child not reflected in any account designations',
+        'consequence': 'Your new child receives nothing from your registered accounts by default. If your will also predates the child, they may be inadequately provided for entirely. There is also no formal guardian named if both parents die.',
+        'action': 'Review all account designations with your new child in mind. Update your will immediately and name a guardian.'
+    },
+    'L5': {
+        'severity': 'MEDIUM',
+        'account_type': 'ALL',
+        'rule': 'L5',
+        'issue': 'Common-law partner of {months} months not named on any account',
+        'consequence': 'Your common-law partner qualifies for the same tax advantages as a married spouse in Canada — but only if properly designated. Without any designation they receive nothing from your registered accounts.',
+        'action': "Update designations to reflect your common-law relationship. Note that common-law rules vary by province — confirm your province's definition applies to your situation."
+    },
+    'L0-no-will': {
+        'severity': 'HIGH',
+        'account_type': 'ALL',
+        'rule': 'L0',
+        'issue': 'No will on file',
+        'consequence': 'Without a will, provincial intestacy rules decide who gets everything — not you. For clients with children this also means no guardian is formally named. The courts decide. Registered accounts with named beneficiaries bypass this, but everything else does not.',
+        'action': 'Create a will as soon as possible. This is especially urgent if you have children, a common-law partner, or significant non-registered assets.'
+    },
+    'L0-outdated': {
+        'severity': 'MEDIUM',
+        'account_type': 'ALL',
+        'rule': 'L0',
+        'issue': 'Will has not been updated in {years} years',
+        'consequence': 'A will that predates major life events — marriage, divorce, children, significant assets — may no longer reflect your wishes. Named executors or beneficiaries in the will may have died or become estranged.',
+        'action': 'Review your will with an estate lawyer. At minimum confirm the executor is still willing and able, and that the beneficiaries still reflect your wishes.'
+    },
+    'C5': {
+        'severity': 'CRITICAL',
+        'account_type': 'ALL',
+        'rule': 'C5',
+        'issue': 'No beneficiary named on any account — complete estate planning gap',
+        'consequence': 'Your entire investment portfolio will go through probate. Maximum tax exposure on all registered accounts. Maximum delays for your family. Everything becomes public record through probate court. This is the worst possible estate planning outcome.',
+        'action': 'This requires immediate attention across every account. Start with your RRSP or RRIF — the tax consequences there are the most severe.'
+    },
+    'C2': {
+        'severity': 'HIGH',
+        'account_type': 'ALL',
+        'rule': 'C2',
+        'issue': 'Beneficiaries named on some accounts but missing on others: {types}',
+        'consequence': 'Creates a two-tier distribution. Some accounts transfer quickly and tax-efficiently to your named beneficiaries. The undesignated accounts go through probate — slower, more expensive, and in the case of registered accounts, with full tax exposure.',
+        'action': 'Complete beneficiary designations on: {types}.'
+    }
+}
+
+TEXT_FIELDS = ('issue', 'consequence', 'action')
+
+
+def template_params(template):
+    # Placeholder names in order of first appearance across the text fields
+    names = []
+    for field in TEXT_FIELDS:
+        for _, name, spec, _ in Formatter().parse(template[field]):
+            if name and name not in names:
+                names.append(name)
+    return tuple(names)
+
+
+TEMPLATE_PARAMS = {template_id: template_params(t) for template_id, t in FINDING_TEMPLATES.items()}
+
+
+class Finding:
+    # Compact finding: a template ID, the account ID and a tuple of template
+    # parameters. The English text lives once in FINDING_TEMPLATES and is only
+    # rendered when a text field is read or the finding is serialized.
+    # Supports dict-style access so code written against finding dicts keeps
+    # working.
+
+    __slots__ = ('template_id', 'account_id', 'params')
+
+    def __init__(self, template_id, account_id = None, params = ()):
+        self.template_id = template_id
+        self.account_id = account_id
+        self.params = params
+
+    @property
+    def template(self):
+        return FINDING_TEMPLATES[self.template_id]
+
+    @property
+    def severity(self):
+        return self.template['severity']
+
+    @property
+    def rule(self):
+        return self.template['rule']
+
+    @property
+    def account_type(self):
+        return self.template['account_type']
+
+    def render(self, field):
+        text = self.template[field]
+        if not self.params:
+            return text
+        return text.format(**dict(zip(TEMPLATE_PARAMS[self.template_id], self.params)))
+
+    def __getitem__(self, key):
+        if key == 'account_id':
+            return self.account_id
+        if key in TEXT_FIELDS:
+            return self.render(key)
+        return self.template[key]
+
+    def get(self, key, default = None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def to_dict(self):
+        template = self.template
+        return {
+            'severity': template['severity'],
+            'account_id': self.account_id,
+            'account_type': template['account_type'],
+            'rule': template['rule'],
+            'issue': self.render('issue'),
+            'consequence': self.render('consequence'),
+            'action': self.render('action')
+        }
+
+    def to_compact(self):
+        return [self.template_id, self.account_id, list(self.params)]
+
+    @classmethod
+    def from_compact(cls, row):
+        template_id, account_id, params = row
+        return cls(sys.intern(template_id), account_id, tuple(params))
+
+    def __eq__(self, other):
+        if isinstance(other, Finding):
+            return (self.template_id, self.account_id, self.params) == (other.template_id, other.account_id, other.params)
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.template_id, self.account_id, self.params))
+
+    def __repr__(self):
+        return f"Finding({self.template_id!r}, {self.account_id!r}, {self.params!r})"
+
+
+def make_finding(template_id, account_id = None, **params):
+    values = tuple(
+        sys.intern(params[name]) if isinstance(params[name], str) else params[name]
+        for name in TEMPLATE_PARAMS[template_id]
+    )
+    return Finding(template_id, account_id, values)
+
+
+def build_finding(template_id, account_id = None, **params):
+    return make_finding(template_id, account_id, **params).to_dict()
+
+
+def compact_templates():
+    # Every template once, for compact output that references them by ID
+    return {template_id: dict(t) for template_id, t in FINDING_TEMPLATES.items()}
+
+
+# Templates that share a rule and account type are the designation variants
+# of one check (T6-successor / T6-beneficiary, say). A finding dict is traced
+# back to its template by the fixed start of its issue text.
+TEMPLATES_BY_RULE = {}
+for template_id, t in FINDING_TEMPLATES.items():
+    TEMPLATES_BY_RULE.setdefault((t['rule'], t['account_type']), []).append((t['issue'].split('{')[0], template_id))
 
-    return findings
 
-def check_tfsa_rules(account, client):
-    findings = []
+def template_id_of(finding):
+    if isinstance(finding, Finding):
+        return finding.template_id
+    candidates = TEMPLATES_BY_RULE[(finding['rule'], finding['account_type'])]
+    if len(candidates) == 1:
+        return candidates[0][1]
+    for prefix, template_id in candidates:
+        if finding['issue'].startswith(prefix):
+            return template_id
+    raise KeyError(f"No template for {finding['rule']} finding: {finding['issue']}")
+
 
-    # CHECK 1 — No successor holder AND no beneficiary
+def finding_id(client_id, finding):
+    # Deterministic across runs: built from the client, the rule and
+    # designation (the template) and the account. Severity and wording are
+    # left out, so a finding that is re-graded keeps its ID.
+    material = f"{client_id}|{template_id_of(finding)}|{finding['account_id'] or ''}"
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()[:16]
+
+
+DESIGNATION_SLOTS = ['successor_holder', 'successor_annuitant', 'beneficiary_primary']
+BENEFICIARY_SLOTS = ['beneficiary_primary', 'beneficiary_contingent']
+CHILD_RELATIONSHIPS = ['child', 'son', 'daughter']
+NON_SPOUSE_RELATIONSHIPS = ['brother', 'sister', 'sibling', 'friend', 'parent', 'mother', 'father']
+
+# The day units time-based rules measure in. The thresholds themselves
+# (and the severity order) come from the rule pack.
+DAYS_PER_YEAR = 365
+DAYS_PER_MONTH = 30
+
+RULE_PACK = RulePackHolder(RULE_PACK_PATH, {t['severity'] for t in FINDING_TEMPLATES.values()})
+
+
+def rule_pack():
+    return RULE_PACK.current
+
+
+class ClientIndex:
+    # One pass over a client's accounts and children, built once per
+    # analysis and shared by every rule so no rule has to rescan accounts.
+
+    def __init__(self, client, as_of = None, pack = None):
+        self.accounts = client.get('accounts', [])
+        # The date time-based rules (L0, L5) are evaluated on
+        self.as_of = to_date(as_of)
+        # The rule pack this analysis started with, and the client's
+        # province's thresholds from it
+        self.pack = pack or RULE_PACK.current
+        self.thresholds = self.pack.for_province(client.get('province'))
+
+        # relationship -> accounts naming that relationship as successor
+        # holder, successor annuitant or primary beneficiary
+        self.designated_relationships = {}
+        # relationship -> accounts naming that relationship as primary or
+        # contingent beneficiary
+        self.beneficiary_relationships = {}
+        self.balance_by_type = {}
+        self.designated_accounts = []
+        self.undesignated_accounts = []
+        self.names_ex_spouse = False
+
+        for account in self.accounts:
+            account_type = account.get('type')
+            self.balance_by_type[account_type] = self.balance_by_type.get(account_type, 0) + account.get('balance', 0)
+
+            has_designation = False
+            for slot in DESIGNATION_SLOTS:
+                if safe_get(account, slot) is not None:
+                    has_designation = True
+                relationship = safe_get(account, slot, 'relationship')
+                if relationship is not None:
+                    self.designated_relationships.setdefault(relationship, []).append(account)
+                if safe_get(account, slot, 'is_currently_spouse') is False:
+                    self.names_ex_spouse = True
+
+            for slot in BENEFICIARY_SLOTS:
+                relationship = safe_get(account, slot, 'relationship')
+                if relationship is not None:
+                    self.beneficiary_relationships.setdefault(relationship, []).append(account)
+
+            if has_designation:
+                self.designated_accounts.append(account)
+            else:
+                self.undesignated_accounts.append(account)
+
+        self.children_by_name = {}
+        for child in client.get('children', []):
+            self.children_by_name.setdefault(normalize_name(child.get('name')), []).append(child)
+
+    def names_relationship(self, *relationships):
+        return any(r in self.designated_relationships for r in relationships)
+
+    def names_beneficiary_relationship(self, *relationships):
+        return any(r in self.beneficiary_relationships for r in relationships)
+
+    def is_minor_child(self, name):
+        return any(child.get('is_minor') is True for child in self.children_by_name.get(normalize_name(name), []))
+
+
+class Rule:
+
+    def __init__(self, rule_id, scope, reads, check):
+        self.rule_id = rule_id
+        self.scope = scope
+        self.reads = reads
+        self.check = check
+        self.calls = 0
+        self.seconds = 0.0
+
+
+class RuleRegistry:
+    # Every rule declares the account types it applies to ('client' for
+    # household-level rules) and the profile fields it reads. Reads are
+    # dotted paths: 'account.x' is a field of the account being checked,
+    # 'accounts.*.x' a field of any account, anything else a client field,
+    # and 'as_of' marks rules that depend on today's date. A trailing '?'
+    # means the rule only checks whether the field is set. compile() turns
+    # the registry into a dispatch table of only the applicable, enabled rules
+    # per account type, in registration order.
+
+    def __init__(self):
+        self.rules = []
+        self.timing = False
+        self._compiled = {}
+
+    def register(self, rule_id, scope, reads):
+        def decorator(check):
+            for s in scope:
+                self.rules.append(Rule(rule_id, s, reads, check))
+            self._compiled.clear()
+            return check
+        return decorator
+
+    def rule_ids(self):
+        return sorted({r.rule_id for r in self.rules})
+
+    def compile(self, only = None, skip = None):
+        key = (frozenset(only) if only else None, frozenset(skip) if skip else None)
+        if key not in self._compiled:
+            table = {}
+            for r in self.rules:
+                if only and r.rule_id not in only:
+                    continue
+                if skip and r.rule_id in skip:
+                    continue
+                table.setdefault(r.scope, []).append(r)
+            self._compiled[key] = {scope: tuple(rules) for scope, rules in table.items()}
+        return self._compiled[key]
+
+    def run(self, rules, *args):
+        findings = []
+        if self.timing:
+            observe = TELEMETRY.enabled
+            for r in rules:
+                start = perf_counter()
+                findings += r.check(*args)
+                elapsed = perf_counter() - start
+                r.seconds += elapsed
+                r.calls += 1
+                if observe:
+                    RULE_EVALUATIONS.inc(r.rule_id)
+                    RULE_SECONDS.observe(elapsed, r.rule_id)
+        else:
+            for r in rules:
+                findings += r.check(*args)
+        return findings
+
+    def stats(self):
+        return [
+            {
+                'rule': r.rule_id,
+                'scope': r.scope,
+                'calls': r.calls,
+                'seconds': r.seconds,
+                'mean_us': r.seconds / r.calls * 1e6 if r.calls else 0.0
+            }
+            for r in self.rules
+        ]
+
+    def reset_stats(self):
+        for r in self.rules:
+            r.calls = 0
+            r.seconds = 0.0
+
+
+RULES = RuleRegistry()
+rule = RULES.register
+
+# Per-rule timing is what the rule metrics are built from, so it follows telemetry
+on_toggle(lambda on: setattr(RULES, 'timing', on))
+
+RULE_EVALUATIONS = counter('estate_rule_evaluations_total', 'Rule checks run', ['rule'])
+RULE_SECONDS = histogram('estate_rule_seconds', 'Time in one rule check', ['rule'], RULE_BUCKETS)
+FINDINGS = counter('estate_findings_total', 'Findings raised', ['severity'])
+ANALYSIS_SECONDS = histogram('estate_analysis_seconds', 'Time to analyse one client', buckets = ANALYSIS_BUCKETS)
+
+NO_RULES = ()
+
+
+# ── Province rules ──────────────────────────────────────────────
+
+@rule('Q1', ['client'], reads = ['province'])
+def quebec_civil_law(client, index):
+    # Civil-law province (Quebec) hard stop
+    if index.thresholds.civil_law:
+        return [make_finding('Q1')]
+    return []
+
+
+# ── TFSA rules ──────────────────────────────────────────────────
+
+@rule('T1', ['TFSA'], reads = ['account.successor_holder?', 'account.beneficiary_primary?'])
+def tfsa_no_designation(account, client, index):
+    # No successor holder AND no beneficiary
     has_successor = safe_get(account, "successor_holder") is not None
     has_beneficiary = safe_get(account, "beneficiary_primary") is not None
 
     if not has_successor and has_beneficiary:
-        findings.append({
-            'severity': 'HIGH',
-            'account_id': account.get('account_id'),
-            'account_type': 'TFSA',
-            'rule': 'T1',
-            'issue': 'No successor holder or beneficiary named',
-            'consequence': 'Account loses tax-free status on death and enters estate — subject to probate delays and tax on growth after death',
-            'action': 'Name a successor holder if married or common-law. Name a beneficiary at minimum.'
-        })
-    # Check 2: Successor holder is no longer a spouse (alive ex)
+        return [make_finding('T1', account.get('account_id'))]
+    return []
+
+
+@rule('T3', ['TFSA'], reads = ['account.successor_holder.is_currently_spouse'])
+def tfsa_ex_spouse_successor(account, client, index):
+    # Successor holder is no longer a spouse (alive ex)
     is_current_spouse = safe_get(account, "successor_holder", "is_currently_spouse")
 
     if is_current_spouse is False:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': account.get('account_id'),
-            'account_type': 'TFSA',
-            'rule': 'T3',
-            'issue': 'Successor holder on TFSA is an ex-spouse',
-            'consequence': 'Ex-spouse legally inherits the entire TFSA tax-free and immediately upon death. Divorce does not remove this automatically. Your will cannot override it. There is no recovery once it happens.',
-            'action': 'Update successor holder immediately. This is the single most urgent fix in your estate plan.'
-        })
-        
-    # Check 3: Successor holder or beneficiary is deceased
+        return [make_finding('T3', account.get('account_id'))]
+    return []
+
+
+@rule('T6', ['TFSA'], reads = ['account.successor_holder.is_currently_alive', 'account.beneficiary_primary.is_currently_alive'])
+def tfsa_deceased_designation(account, client, index):
+    # Successor holder or beneficiary is deceased
+    findings = []
     is_successor_alive = safe_get(account, "successor_holder", "is_currently_alive")
     is_beneficiary_alive = safe_get(account, "beneficiary_primary", "is_currently_alive")
 
     if is_successor_alive is False:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': account.get('account_id'),
-            'account_type': 'TFSA',
-            'rule': 'T6',
-            'issue': 'Successor holder on TFSA is deceased',
-            'consequence': 'The designation has failed. The account will fall into your estate as if no successor holder was ever named — probate applies, tax-free status is lost on post-death growth.',
-            'action': 'Name a new successor holder immediately. Consider adding a contingent beneficiary as a backup.'
-        })
+        findings.append(make_finding('T6-successor', account.get('account_id')))
 
     if is_beneficiary_alive is False:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': account.get('account_id'),
-            'account_type': 'TFSA',
-            'rule': 'T6',
-            'issue': 'Primary beneficiary on TFSA is deceased',
-            'consequence': 'The designation has failed. Account falls into estate — probate, delays, and loss of tax-free status on any growth after date of death.',
-            'action': 'Update beneficiary to a living person immediately. Add a contingent beneficiary as a backup going forward.'
-        })
-
-    
-    # CHECK 4 — Married client named spouse as beneficiary but not successor holder (Rule T2)
+        findings.append(make_finding('T6-beneficiary', account.get('account_id')))
+
+    return findings
+
+
+@rule('T2', ['TFSA'], reads = ['marital_status', 'account.beneficiary_primary.relationship', 'account.successor_holder?'])
+def tfsa_spouse_as_beneficiary(account, client, index):
+    # Married client named spouse as beneficiary but not successor holder
     is_married = safe_get(client, "marital_status") == "married"
     beneficiary_relationship = safe_get(account, 'beneficiary_primary', 'relationship')
     has_successor_holder = safe_get(account, 'successor_holder') is not None
 
     if is_married and beneficiary_relationship == 'spouse' and not has_successor_holder:
-        findings.append({
-            'severity': 'MEDIUM',
-            'account_id': account.get('WS'),
-            'account_type': 'TFSA',
-            'rule': 'T2',
-            'issue': 'Spouse named as beneficiary instead of successor holder',
-            'consequence': 'Spouse receives the money tax-free but the account itself closes. They lose the contribution room and tax-free status of the account. Successor holder designation would have preserved both.',
-            'action': 'Upgrade designation from beneficiary to successor holder. Your spouse keeps the account itself, not just the cash.'
-        })
-
-    # CHECK 5 — Minor child named as beneficiary (Rule T5)
+        return [make_finding('T2', account.get('account_id'))]
+    return []
+
+
+@rule('T5', ['TFSA'], reads = ['account.beneficiary_primary.name', 'children.*.name', 'children.*.is_minor'])
+def tfsa_minor_beneficiary(account, client, index):
+    # Minor child named as beneficiary
     beneficiary_name = safe_get(account, 'beneficiary_primary', 'name')
-    children = client.get('children', [])
-    beneficiary_is_minor = any(
-        child['name'] == beneficiary_name and child.get('is_minor') is True
-        for child in children
-    )
 
-    if beneficiary_name is not None and beneficiary_is_minor:
-        findings.append({
-            'severity': 'MEDIUM',
-            'account_id': account.get('WS'),
-            'account_type': 'TFSA',
-            'rule': 'T5',
-            'issue': 'Minor child named as TFSA beneficiary',
-            'consequence': 'Minors cannot legally receive large sums directly. A court-appointed trustee will control the funds until the child reaches age of majority (18 or 19 depending on province). This creates legal costs and delays — and the child still gets the money at 18 regardless of maturity.',
-            'action': 'Consider naming the other parent as beneficiary instead, or establish a formal trust with conditions for when and how the child receives the funds.'
-        })
-
-    # CHECK 6 — No contingent beneficiary named (Rule C6)
+    if beneficiary_name is not None and index.is_minor_child(beneficiary_name):
+        return [make_finding('T5', account.get('account_id'))]
+    return []
+
+
+@rule('C6', ['TFSA'], reads = ['account.beneficiary_primary?', 'account.beneficiary_contingent?'])
+def tfsa_no_contingent(account, client, index):
+    # No contingent beneficiary named
     has_primary = safe_get(account, 'beneficiary_primary') is not None
     has_contingent = safe_get(account, 'beneficiary_contingent') is not None
 
     if has_primary and not has_contingent:
-        findings.append({
-            'severity': 'MEDIUM',
-            'account_id': account.get('WS'),
-            'account_type': 'TFSA',
-            'rule': 'C6',
-            'issue': 'No contingent beneficiary named on TFSA',
-            'consequence': 'If your primary beneficiary dies before you and you have not updated the designation, the account falls to your estate. A contingent beneficiary is a backup that prevents this automatically.',
-            'action': 'Name a contingent beneficiary on this account. Common choices are adult children, a sibling, or a trusted person.'
-        })
+        return [make_finding('C6-TFSA', account.get('account_id'))]
+    return []
 
-    return findings
 
-def check_rrsp_rules(account, client):
-    findings = []
+# ── RRSP / RRIF rules ───────────────────────────────────────────
+
+# A spousal rollover depends on who is named in these two slots
+TAX_READS = ['account.balance', 'province', 'annual_income', 'account.successor_annuitant', 'account.beneficiary_primary']
+
+
+def other_income(client):
+    income = client.get('annual_income')
+    return DEFAULT_OTHER_INCOME if income is None else income
 
-    # CHECK 1 — No beneficiary and no successor annuitant (Rule R1)
+
+def account_tax(account, client):
+    # Tax if this account's full value is deemed income on the final return;
+    # none when it rolls over to a surviving spouse
+    if spousal_rollover(account):
+        return 0
+    return deemed_income_tax(account.get('balance', 0), client.get('province'), other_income(client))
+
+
+def account_probate(account, client):
+    # Probate on this account, if it passes through the estate
+    if not passes_to_estate(account):
+        return 0
+    return probate_fee(account.get('balance', 0), client.get('province'))
+
+
+@rule('R1', ['RRSP', 'RRIF'], reads = ['account.successor_annuitant?', 'account.beneficiary_primary?'] + TAX_READS)
+def registered_no_designation(account, client, index):
+    # No beneficiary and no successor annuitant
     has_successor_annuitant = safe_get(account, 'successor_annuitant') is not None
     has_beneficiary = safe_get(account, 'beneficiary_primary') is not None
 
     if not has_successor_annuitant and not has_beneficiary:
-        findings.append({
-            'severity': 'HIGH',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRSP',
-            'rule': 'R1',
-            'issue': 'No beneficiary or successor annuitant named on RRSP',
-            'consequence': 'Full RRSP value is added to your income in the year of death. On a $200,000 RRSP this could mean $80,000-$100,000 in unexpected taxes. Account also enters probate — delays and additional costs on top of the tax hit.',
-            'action': 'If married or common-law: name your spouse as successor annuitant immediately. If single: name a beneficiary. Either is far better than nothing.'
-        })
-
-    # CHECK 2 — Married client but spouse named as beneficiary not successor annuitant (Rule R2)
+        return [make_finding(
+            'R1-' + account['type'], account.get('account_id'),
+            balance = account.get('balance', 0),
+            tax = account_tax(account, client)
+        )]
+    return []
+
+
+@rule('R2', ['RRSP'], reads = ['marital_status', 'account.beneficiary_primary.relationship', 'account.successor_annuitant?'])
+def rrsp_spouse_as_beneficiary(account, client, index):
+    # Married client but spouse named as beneficiary not successor annuitant
     is_married = client.get('marital_status') == 'married'
     beneficiary_relationship = safe_get(account, 'beneficiary_primary', 'relationship')
     has_successor_annuitant = safe_get(account, 'successor_annuitant') is not None
 
     if is_married and beneficiary_relationship == 'spouse' and not has_successor_annuitant:
-        findings.append({
-            'severity': 'MEDIUM',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRSP',
-            'rule': 'R2',
-            'issue': 'Spouse named as beneficiary instead of successor annuitant on RRSP',
-            'consequence': 'Spouse receives the RRSP tax-free via spousal rollover — which is good. But the process is more complex than successor annuitant. The account closes and spouse receives a lump sum transfer rather than inheriting the account itself.',
-            'action': 'Upgrade designation to successor annuitant. Cleaner transfer, same tax benefit, less administrative burden on your spouse during an already difficult time.'
-        })
-
-    # CHECK 3 — Ex-spouse still listed as successor annuitant (Rule R3)
+        return [make_finding('R2', account.get('account_id'))]
+    return []
+
+
+@rule('R3', ['RRSP'], reads = ['account.successor_annuitant.is_currently_spouse', 'account.beneficiary_primary.is_currently_spouse'])
+def rrsp_ex_spouse_designated(account, client, index):
+    # Ex-spouse still listed as successor annuitant or primary beneficiary
+    findings = []
     annuitant_is_current_spouse = safe_get(account, 'successor_annuitant', 'is_currently_spouse')
+    beneficiary_is_current_spouse = safe_get(account, 'beneficiary_primary', 'is_currently_spouse')
 
     if annuitant_is_current_spouse is False:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRSP',
-            'rule': 'R3',
-            'issue': 'Ex-spouse still listed as successor annuitant on RRSP',
-            'consequence': 'Ex-spouse legally receives the entire RRSP. This is ironclad — your will cannot override it, courts will generally not override it. The ex-spouse keeps the money. Divorce does not automatically remove this designation.',
-            'action': 'Update this immediately. This is the highest priority fix for any recently divorced client.'
-        })
-
-    # CHECK 4 — Ex-spouse still listed as primary beneficiary (Rule R3 variant)
-    beneficiary_is_current_spouse = safe_get(account, 'beneficiary_primary', 'is_currently_spouse')
+        findings.append(make_finding('R3-RRSP-annuitant', account.get('account_id')))
 
     if beneficiary_is_current_spouse is False:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRSP',
-            'rule': 'R3',
-            'issue': 'Ex-spouse still listed as primary beneficiary on RRSP',
-            'consequence': 'Ex-spouse legally receives the full RRSP value. They will also owe income tax on the full amount that year — but that does not reduce what they receive. Your will cannot override this designation.',
-            'action': 'Update beneficiary designation immediately.'
-        })
-
-    # CHECK 5 — Primary beneficiary is deceased (Rule R6 variant)
+        findings.append(make_finding('R3-RRSP-beneficiary', account.get('account_id')))
+
+    return findings
+
+
+@rule('R6', ['RRSP'], reads = ['account.beneficiary_primary.is_currently_alive'])
+def rrsp_deceased_beneficiary(account, client, index):
+    # Primary beneficiary is deceased
     beneficiary_is_alive = safe_get(account, 'beneficiary_primary', 'is_currently_alive')
 
     if beneficiary_is_alive is False:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRSP',
-            'rule': 'R6',
-            'issue': 'Primary beneficiary on RRSP is deceased',
-            'consequence': 'Designation has failed. Full RRSP value collapses into your estate as income in year of death — maximum tax exposure plus probate delays. Treated as if no beneficiary was ever named.',
-            'action': 'Update beneficiary immediately. Consider naming a contingent beneficiary as a permanent backup.'
-        })
-
-    # CHECK 6 — Non-spouse adult named as beneficiary — tax surprise warning (Rule R4)
+        return [make_finding('R6-RRSP-beneficiary', account.get('account_id'))]
+    return []
+
+
+@rule('R4', ['RRSP'], reads = ['account.beneficiary_primary.relationship'] + TAX_READS)
+def rrsp_non_spouse_beneficiary(account, client, index):
+    # Non-spouse adult named as beneficiary — tax surprise warning
     beneficiary_relationship = safe_get(account, 'beneficiary_primary', 'relationship')
-    non_spouse_relationships = ['brother', 'sister', 'sibling', 'friend', 'parent', 'mother', 'father']
     balance = account.get('balance', 0)
 
-    if beneficiary_relationship in non_spouse_relationships and balance > 0:
-        findings.append({
-            'severity': 'MEDIUM',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRSP',
-            'rule': 'R4',
-            'issue': f'Non-spouse ({beneficiary_relationship}) named as RRSP beneficiary — significant tax consequence',
-            'consequence': f'Your {beneficiary_relationship} receives the full RRSP value but it is added entirely to their income that year. On this account balance of ${balance:,} they could owe ${int(balance * 0.40):,}+ in taxes the same year they receive it. This is often a complete surprise.',
-            'action': 'Make sure your beneficiary understands this tax consequence. Consider life insurance as a strategy to cover the tax bill, or review whether this designation still reflects your intent.'
-        })
-
-    # CHECK 7 — Minor child named as beneficiary (Rule R5 context)
-    beneficiary_name = safe_get(account, 'beneficiary_primary', 'name')
-    children = client.get('children', [])
-    beneficiary_is_minor = any(
-        child['name'] == beneficiary_name and child.get('is_minor') is True
-        for child in children
-    )
+    if beneficiary_relationship in NON_SPOUSE_RELATIONSHIPS and balance > 0:
+        return [make_finding(
+            'R4', account.get('account_id'),
+            relationship = beneficiary_relationship,
+            balance = balance,
+            tax = account_tax(account, client)
+        )]
+    return []
 
-    if beneficiary_name is not None and beneficiary_is_minor:
-        findings.append({
-            'severity': 'MEDIUM',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRSP',
-            'rule': 'R5',
-            'issue': 'Minor child named as RRSP beneficiary',
-            'consequence': 'Minor children cannot receive RRSP proceeds directly. A court-appointed trustee controls the funds until age of majority. However — if the child is financially dependent due to disability, there are favorable tax rules available that require specific documentation to claim.',
-            'action': 'Confirm whether the child qualifies as a financially dependent minor or disabled dependent. If yes, ensure dependency is documented. If no, consider naming the other parent or establishing a trust.'
-        })
-
-    # CHECK 8 — No contingent beneficiary (Rule C6)
-    has_primary = safe_get(account, 'beneficiary_primary') is not None
-    has_contingent = safe_get(account, 'beneficiary_contingent') is not None
 
-    if has_primary and not has_contingent:
-        findings.append({
-            'severity': 'MEDIUM',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRSP',
-            'rule': 'C6',
-            'issue': 'No contingent beneficiary named on RRSP',
-            'consequence': 'If your primary beneficiary dies before you and the designation is not updated, the full RRSP value collapses into your estate — maximum tax exposure and probate delays.',
-            'action': 'Name a contingent beneficiary. On an RRSP this is especially important given the tax consequences of the account entering the estate.'
-        })
+@rule('R5', ['RRSP'], reads = ['account.beneficiary_primary.name', 'children.*.name', 'children.*.is_minor'])
+def rrsp_minor_beneficiary(account, client, index):
+    # Minor child named as beneficiary
+    beneficiary_name = safe_get(account, 'beneficiary_primary', 'name')
 
-    return findings
+    if beneficiary_name is not None and index.is_minor_child(beneficiary_name):
+        return [make_finding('R5', account.get('account_id'))]
+    return []
 
 
-def check_rrif_rules(account, client):
+@rule('R6', ['RRIF'], reads = ['account.successor_annuitant.is_currently_alive', 'account.beneficiary_primary.is_currently_alive'])
+def rrif_deceased_designation(account, client, index):
+    # Successor annuitant or primary beneficiary is deceased
     findings = []
-
-    # CHECK 1 — No successor annuitant and no beneficiary (Rule R1 equivalent)
-    has_successor_annuitant = safe_get(account, 'successor_annuitant') is not None
-    has_beneficiary = safe_get(account, 'beneficiary_primary') is not None
-
-    if not has_successor_annuitant and not has_beneficiary:
-        findings.append({
-            'severity': 'HIGH',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRIF',
-            'rule': 'R1',
-            'issue': 'No beneficiary or successor annuitant named on RRIF',
-            'consequence': 'Full RRIF value is added to your income in the year of death — potentially the largest single tax bill your estate will face. Account enters probate on top of the tax hit.',
-            'action': 'Name your spouse as successor annuitant immediately. If no spouse, name a beneficiary. Do not leave this blank.'
-        })
-
-    # CHECK 2 — Successor annuitant is deceased (Rule T6 equivalent)
     annuitant_is_alive = safe_get(account, 'successor_annuitant', 'is_currently_alive')
+    beneficiary_is_alive = safe_get(account, 'beneficiary_primary', 'is_currently_alive')
 
     if annuitant_is_alive is False:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRIF',
-            'rule': 'R6',
-            'issue': 'Successor annuitant on RRIF is deceased',
-            'consequence': 'The designation has failed. The full RRIF balance collapses into your estate as income in the year of death. On large RRIFs this can mean a six-figure tax bill with no liquid assets to pay it.',
-            'action': 'Update successor annuitant immediately. Review whether your estate has enough liquid assets to cover the potential tax liability.'
-        })
-
-    # CHECK 3 — Primary beneficiary is deceased (Rule T6 equivalent)
-    beneficiary_is_alive = safe_get(account, 'beneficiary_primary', 'is_currently_alive')
+        findings.append(make_finding('R6-RRIF-annuitant', account.get('account_id')))
 
     if beneficiary_is_alive is False:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRIF',
-            'rule': 'R6',
-            'issue': 'Primary beneficiary on RRIF is deceased',
-            'consequence': 'Designation has failed. Full RRIF value enters estate as taxable income in year of death. With no liquid assets to cover the bill, the executor may be forced to sell other estate assets.',
-            'action': 'Update beneficiary immediately. Given the size of most RRIFs, also review estate liquidity — is there enough cash outside this account to pay the tax bill?'
-        })
-
-    # CHECK 4 — Ex-spouse still listed as successor annuitant (Rule R3)
+        findings.append(make_finding('R6-RRIF-beneficiary', account.get('account_id')))
+
+    return findings
+
+
+@rule('R3', ['RRIF'], reads = ['account.successor_annuitant.is_currently_spouse'])
+def rrif_ex_spouse_annuitant(account, client, index):
+    # Ex-spouse still listed as successor annuitant
     annuitant_is_current_spouse = safe_get(account, 'successor_annuitant', 'is_currently_spouse')
 
     if annuitant_is_current_spouse is False:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRIF',
-            'rule': 'R3',
-            'issue': 'Ex-spouse still listed as successor annuitant on RRIF',
-            'consequence': 'Ex-spouse steps into your RRIF and continues receiving payments as if the account were always theirs. This cannot be undone after death. Your will cannot override it.',
-            'action': 'Update immediately. Highest priority fix.'
-        })
-
-    # CHECK 5 — Large RRIF with no liquid non-registered assets (Rule R7)
-    balance = account.get('balance', 0)
-    all_accounts = client.get('accounts', [])
-    non_registered_balance = sum(
-        a.get('balance', 0)
-        for a in all_accounts
-        if a.get('type') == 'non-registered'
-    )
+        return [make_finding('R3-RRIF-annuitant', account.get('account_id'))]
+    return []
+
 
-    if balance > 100000 and non_registered_balance < (balance * 0.30):
-        findings.append({
-            'severity': 'HIGH',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRIF',
-            'rule': 'R7',
-            'issue': 'Large RRIF with insufficient liquid assets to cover potential estate tax bill',
-            'consequence': f'This RRIF is worth ${balance:,}. If it collapses into the estate, the tax bill could reach ${int(balance * 0.40):,}+. Your non-registered assets total only ${non_registered_balance:,} — potentially not enough to cover it. The executor may be forced to sell assets or borrow.',
-            'action': 'Review estate liquidity with a financial advisor. Life insurance is often used specifically to fund this tax liability.'
-        })
-
-    # CHECK 6 — No contingent beneficiary (Rule C6)
+@rule('R7', ['RRIF'], reads = ['accounts.*.type', 'accounts.*.balance'] + TAX_READS + [f'account.{slot}' for slot in DESIGNEE_SLOTS])
+def rrif_liquidity(account, client, index):
+    # Large RRIF whose tax and probate bill outruns the non-registered assets
+    # available to pay it
+    balance = account.get('balance', 0)
+    non_registered_balance = index.balance_by_type.get('non-registered', 0)
+    if balance <= index.thresholds.rrif_liquidity_min_balance:
+        return []
+
+    bill = account_tax(account, client) + account_probate(account, client)
+    if non_registered_balance < bill:
+        return [make_finding(
+            'R7', account.get('account_id'),
+            balance = balance,
+            province = province_label(client.get('province')),
+            tax = bill,
+            non_registered_balance = non_registered_balance
+        )]
+    return []
+
+
+@rule('C6', ['RRSP', 'RRIF'], reads = ['account.beneficiary_primary?', 'account.beneficiary_contingent?'])
+def registered_no_contingent(account, client, index):
+    # No contingent beneficiary
     has_primary = safe_get(account, 'beneficiary_primary') is not None
     has_contingent = safe_get(account, 'beneficiary_contingent') is not None
 
     if has_primary and not has_contingent:
-        findings.append({
-            'severity': 'MEDIUM',
-            'account_id': account.get('account_id'),
-            'account_type': 'RRIF',
-            'rule': 'C6',
-            'issue': 'No contingent beneficiary named on RRIF',
-            'consequence': 'If primary beneficiary predeceases you and designation is not updated, the full RRIF value enters your estate as taxable income. The stakes on a RRIF are higher than most accounts given the tax exposure.',
-            'action': 'Name a contingent beneficiary on this account as a permanent safety net.'
-        })
+        return [make_finding('C6-' + account['type'], account.get('account_id'))]
+    return []
 
-    return findings
 
+# ── Life event rules ────────────────────────────────────────────
 
-def check_life_events(client):
-    findings = []
+DESIGNATION_RELATIONSHIP_READS = [f'accounts.*.{slot}.relationship' for slot in DESIGNATION_SLOTS]
+
+
+@rule('L1', ['client'], reads = ['marital_status', 'marriage_date'] + DESIGNATION_RELATIONSHIP_READS)
+def married_spouse_not_named(client, index):
+    # Recently married but no updates made
+    if client.get('marital_status') == 'married' and client.get('marriage_date'):
+        if not index.names_relationship('spouse'):
+            return [make_finding('L1')]
+    return []
+
+
+@rule('L2', ['client'], reads = ['marital_status'] + [f'accounts.*.{slot}.is_currently_spouse' for slot in DESIGNATION_SLOTS])
+def divorced_ex_still_named(client, index):
+    # Recently divorced but designations not updated
+    if client.get('marital_status') == 'divorced' and index.names_ex_spouse:
+        return [make_finding('L2')]
+    return []
 
-    # CHECK 1 — Recently married but no updates made (Rule L1)
-    marital_status = client.get('marital_status')
-    marriage_date = client.get('marriage_date')
-    accounts = client.get('accounts', [])
-
-    if marital_status == 'married' and marriage_date:
-        any_account_names_spouse = any(
-            safe_get(a, 'successor_holder', 'relationship') == 'spouse' or
-            safe_get(a, 'successor_annuitant', 'relationship') == 'spouse' or
-            safe_get(a, 'beneficiary_primary', 'relationship') == 'spouse'
-            for a in accounts
-        )
-
-        if not any_account_names_spouse:
-            findings.append({
-                'severity': 'HIGH',
-                'account_id': None,
-                'account_type': 'ALL',
-                'rule': 'L1',
-                'issue': 'Recently married but spouse not named on any account',
-                'consequence': 'Your new spouse has no legal claim to any of your registered accounts. In most provinces marriage does not automatically update beneficiary designations. If you die tomorrow your spouse may receive nothing from your investment accounts.',
-                'action': 'Review and update all account designations to reflect your marriage. Update your will at the same time.'
-            })
-
-    # CHECK 2 — Recently divorced but designations not updated (Rule L2)
-    if marital_status == 'divorced':
-        any_account_names_ex = any(
-            safe_get(a, 'successor_holder', 'is_currently_spouse') is False or
-            safe_get(a, 'successor_annuitant', 'is_currently_spouse') is False or
-            safe_get(a, 'beneficiary_primary', 'is_currently_spouse') is False
-            for a in accounts
-        )
-
-        if any_account_names_ex:
-            findings.append({
-                'severity': 'CRITICAL',
-                'account_id': None,
-                'account_type': 'ALL',
-                'rule': 'L2',
-                'issue': 'Recently divorced but ex-spouse still named on one or more accounts',
-                'consequence': 'Divorce does NOT automatically remove beneficiary designations in Canada. Your ex-spouse will legally inherit every account still named in their favour. Your will cannot override this. This is the most common and costly estate planning mistake Canadians make.',
-                'action': 'Treat this as an emergency. Update every account designation today. Do not wait.'
-            })
-
-    # CHECK 3 — New child but no accounts updated (Rule L3)
+
+@rule('L3', ['client'], reads = ['province', 'children.*.age_months'] + [f'accounts.*.{slot}.relationship' for slot in BENEFICIARY_SLOTS])
+def new_child_not_named(client, index):
+    # New child but no accounts updated
     children = client.get('children', [])
     has_newborn = any(
-        child.get('age_months') is not None and child.get('age_months') <= 12
+        child.get('age_months') is not None and child.get('age_months') <= index.thresholds.newborn_months
         for child in children
     )
 
-    if has_newborn:
-        any_account_names_child = any(
-            safe_get(a, 'beneficiary_primary', 'relationship') in ['child', 'son', 'daughter'] or
-            safe_get(a, 'beneficiary_contingent', 'relationship') in ['child', 'son', 'daughter']
-            for a in accounts
-        )
-
-        if not any_account_names_child:
-            findings.append({
-                'severity': 'MEDIUM',
-                'account_id': None,
-                'account_type': 'ALL',
-                'rule': 'L3',
-                'issue': 'New child not reflected in any account designations',
-                'consequence': 'Your new child receives nothing from your registered accounts by default. If your will also predates the child, they may be inadequately provided for entirely. There is also no formal guardian named if both parents die.',
-                'action': 'Review all account designations with your new child in mind. Update your will immediately and name a guardian.'
-            })
-
-    # CHECK 4 — Common-law partner not designated anywhere (Rule L5)
+    if has_newborn and not index.names_beneficiary_relationship(*CHILD_RELATIONSHIPS):
+        return [make_finding('L3')]
+    return []
+
+
+@rule('L5', ['client'], reads = ['as_of', 'province', 'current_partner'] + DESIGNATION_RELATIONSHIP_READS)
+def common_law_partner_not_named(client, index):
+    # Common-law partner not designated anywhere
     current_partner = client.get('current_partner')
-    if current_partner:
-        months_together = current_partner.get('months_living_together', 0) or 0
-        cohabitation_start = current_partner.get('cohabitation_start')
-
-        if cohabitation_start:
-            from datetime import datetime
-            start = datetime.strptime(cohabitation_start, '%Y-%m-%d')
-            months_together = (datetime.now() - start).days // 30
-
-        if months_together >= 12:
-            any_account_names_partner = any(
-                safe_get(a, 'successor_holder', 'relationship') == 'common-law' or
-                safe_get(a, 'successor_annuitant', 'relationship') == 'common-law' or
-                safe_get(a, 'beneficiary_primary', 'relationship') == 'common-law'
-                for a in accounts
-            )
-
-            if not any_account_names_partner:
-                findings.append({
-                    'severity': 'MEDIUM',
-                    'account_id': None,
-                    'account_type': 'ALL',
-                    'rule': 'L5',
-                    'issue': f'Common-law partner of {months_together} months not named on any account',
-                    'consequence': 'Your common-law partner qualifies for the same tax advantages as a married spouse in Canada — but only if properly designated. Without any designation they receive nothing from your registered accounts.',
-                    'action': 'Update designations to reflect your common-law relationship. Note that common-law rules vary by province — confirm your province\'s definition applies to your situation.'
-                })
-
-    # CHECK 5 — No will at all (Rule L1)
-    has_will = client.get('has_will', False)
-
-    if not has_will:
-        findings.append({
-            'severity': 'HIGH',
-            'account_id': None,
-            'account_type': 'ALL',
-            'rule': 'L0',
-            'issue': 'No will on file',
-            'consequence': 'Without a will, provincial intestacy rules decide who gets everything — not you. For clients with children this also means no guardian is formally named. The courts decide. Registered accounts with named beneficiaries bypass this, but everything else does not.',
-            'action': 'Create a will as soon as possible. This is especially urgent if you have children, a common-law partner, or significant non-registered assets.'
-        })
-
-    # CHECK 6 — Will is severely outdated
+    if not current_partner:
+        return []
+
+    months_together = current_partner.get('months_living_together', 0) or 0
+    cohabitation_start = current_partner.get('cohabitation_start')
+
+    if cohabitation_start:
+        months_together = (index.as_of - parse_date(cohabitation_start)).days // DAYS_PER_MONTH
+
+    if months_together >= index.thresholds.cohabitation_months and not index.names_relationship('common-law'):
+        return [make_finding('L5', None, months = months_together)]
+    return []
+
+
+@rule('L0', ['client'], reads = ['as_of', 'province', 'has_will', 'will_last_updated'])
+def will_missing_or_outdated(client, index):
+    findings = []
+
+    # No will at all
+    if not client.get('has_will', False):
+        findings.append(make_finding('L0-no-will'))
+
+    # Will is severely outdated
     will_last_updated = client.get('will_last_updated')
 
     if will_last_updated:
-        from datetime import datetime
-        updated = datetime.strptime(will_last_updated, '%Y-%m-%d')
-        years_since_update = (datetime.now() - updated).days // 365
-
-        if years_since_update >= 10:
-            findings.append({
-                'severity': 'MEDIUM',
-                'account_id': None,
-                'account_type': 'ALL',
-                'rule': 'L0',
-                'issue': f'Will has not been updated in {years_since_update} years',
-                'consequence': 'A will that predates major life events — marriage, divorce, children, significant assets — may no longer reflect your wishes. Named executors or beneficiaries in the will may have died or become estranged.',
-                'action': 'Review your will with an estate lawyer. At minimum confirm the executor is still willing and able, and that the beneficiaries still reflect your wishes.'
-            })
+        years_since_update = (index.as_of - parse_date(will_last_updated)).days // DAYS_PER_YEAR
+
+        if years_since_update >= index.thresholds.will_outdated_years:
+            findings.append(make_finding('L0-outdated', None, years = years_since_update))
 
     return findings
 
 
-def check_cross_account(client):
-    findings = []
-    accounts = client.get('accounts', [])
-
-    # CHECK 1 — Complete gap across all accounts (Rule C5)
-    def account_has_any_designation(account):
-        return (
-            safe_get(account, 'successor_holder') is not None or
-            safe_get(account, 'successor_annuitant') is not None or
-            safe_get(account, 'beneficiary_primary') is not None
-        )
-
-    all_accounts_empty = not any(
-        account_has_any_designation(a) for a in accounts
-    )
+# ── Cross-account rules ─────────────────────────────────────────
 
-    if all_accounts_empty and len(accounts) > 0:
-        findings.append({
-            'severity': 'CRITICAL',
-            'account_id': None,
-            'account_type': 'ALL',
-            'rule': 'C5',
-            'issue': 'No beneficiary named on any account — complete estate planning gap',
-            'consequence': 'Your entire investment portfolio will go through probate. Maximum tax exposure on all registered accounts. Maximum delays for your family. Everything becomes public record through probate court. This is the worst possible estate planning outcome.',
-            'action': 'This requires immediate attention across every account. Start with your RRSP or RRIF — the tax consequences there are the most severe.'
-        })
-
-    # CHECK 2 — Inconsistent designations across accounts (Rule C1)
-    designated_accounts = [a for a in accounts if account_has_any_designation(a)]
-    undesignated_accounts = [a for a in accounts if not account_has_any_designation(a)]
-
-    if len(designated_accounts) > 0 and len(undesignated_accounts) > 0:
-        undesignated_types = [a.get('type') for a in undesignated_accounts]
-        findings.append({
-            'severity': 'HIGH',
-            'account_id': None,
-            'account_type': 'ALL',
-            'rule': 'C2',
-            'issue': f'Beneficiaries named on some accounts but missing on others: {", ".join(undesignated_types)}',
-            'consequence': 'Creates a two-tier distribution. Some accounts transfer quickly and tax-efficiently to your named beneficiaries. The undesignated accounts go through probate — slower, more expensive, and in the case of registered accounts, with full tax exposure.',
-            'action': f'Complete beneficiary designations on: {", ".join(undesignated_types)}.'
-        })
+DESIGNATION_READS = [f'accounts.*.{slot}?' for slot in DESIGNATION_SLOTS]
 
-    return findings
 
-def analyze_estate_gaps(client_profile):
-    findings = []
+@rule('C5', ['client'], reads = ['accounts?'] + DESIGNATION_READS)
+def no_designation_anywhere(client, index):
+    # Complete gap across all accounts
+    if len(index.designated_accounts) == 0 and len(index.accounts) > 0:
+        return [make_finding('C5')]
+    return []
 
-    findings += check_province(client_profile)
 
-    for account in client_profile.get("accounts", []):
-        account_type = account.get('type')
+@rule('C2', ['client'], reads = ['accounts?', 'accounts.*.type'] + DESIGNATION_READS)
+def inconsistent_designations(client, index):
+    # Beneficiaries named on some accounts but not others
+    if len(index.designated_accounts) > 0 and len(index.undesignated_accounts) > 0:
+        undesignated_types = [a.get('type') for a in index.undesignated_accounts]
+        return [make_finding('C2', None, types = ', '.join(undesignated_types))]
+    return []
 
-        if account_type == 'TFSA':
-            findings += check_tfsa_rules(account, client_profile)
-        elif account_type == 'RRSP':
-            findings += check_rrsp_rules(account, client_profile)
-        elif account_type == 'RRIF':
-            findings += check_rrif_rules(account, client_profile)
-    
-    findings += check_life_events(client_profile)
 
-    findings += check_cross_account(client_profile)
+# ── Entry points ────────────────────────────────────────────────
 
-    severity_order = {
-        'CRITICAL': 0,
-        'REQUIRES_SPECIALIST': 1,
-        'HIGH': 2,
-        'MEDIUM': 3,
-        'LOW': 4
-    }
-    findings.sort(key = lambda f: severity_order.get(f['severity'], 99))
+def check_account(account, client, index = None, dispatch = None, as_of = None):
+    dispatch = dispatch or RULES.compile()
+    index = index or ClientIndex(client, as_of)
+    return RULES.run(dispatch.get(account.get('type'), NO_RULES), account, client, index)
+
+
+def check_client(client, index = None, dispatch = None, as_of = None):
+    dispatch = dispatch or RULES.compile()
+    index = index or ClientIndex(client, as_of)
+    return RULES.run(dispatch.get('client', NO_RULES), client, index)
+
+
+def analyze_estate_gaps(client_profile, only = None, skip = None, as_of = None, compact = False):
+    if TELEMETRY.enabled:
+        with span('analysis', accounts = len(client_profile.get('accounts') or ())) as s:
+            findings = evaluate(client_profile, only, skip, as_of)
+            s.attributes['findings'] = len(findings)
+        ANALYSIS_SECONDS.observe(s.seconds)
+        for f in findings:
+            FINDINGS.inc(f.severity)
+    else:
+        findings = evaluate(client_profile, only, skip, as_of)
+
+    if compact:
+        return findings
+    return [f.to_dict() for f in findings]
+
+
+def evaluate(client_profile, only, skip, as_of):
+    # Findings as Finding objects, most severe first
+    findings = []
+    dispatch = RULES.compile(only, skip)
+    index = ClientIndex(client_profile, as_of, RULE_PACK.current)
+
+    # FHSA and non-registered accounts have no account-level rules yet, so
+    # they resolve to an empty rule list here and only feed the
+    # household-level checks
+    for account in index.accounts:
+        findings += RULES.run(dispatch.get(account.get('type'), NO_RULES), account, client_profile, index)
+
+    findings += RULES.run(dispatch.get('client', NO_RULES), client_profile, index)
 
+    severity_order = index.pack.severity_order
+    findings.sort(key = lambda f: severity_order.get(f.severity, 99))
     return findings
-    
\ No newline at end of file
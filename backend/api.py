@@ -0,0 +1,158 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+
+from analysis import RULE_PACK, analyze_estate_gaps, to_date
+from metrics import enable
+from service import CLIENTS_PATH
+from web import HTTPError, handle_metrics, send_response, server_port, start_server
+
+# Serves one household at a time to the frontend, so opening the page costs
+# one client's profile and findings instead of the whole book. The book is
+# read on first use (and again when clients.json changes on disk), and each
+# client is analysed the first time it is asked for — again each day, since
+# L0 and L5 read the date. Responses are gzipped when the browser accepts
+# it and carry a content ETag per encoding, and If-None-Match gets a 304.
+
+PORT = 3002
+MIN_GZIP_BYTES = 1024
+
+
+class Payload:
+
+    __slots__ = ('body', 'gzipped', 'etag', 'gzip_etag')
+
+    def __init__(self, value):
+        self.body = json.dumps(value, separators = (',', ':')).encode('utf-8')
+        self.gzipped = gzip.compress(self.body, mtime = 0) if len(self.body) >= MIN_GZIP_BYTES else None
+        # Strong tags are per representation, so the two encodings differ
+        digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [t.strip().removeprefix('W/') for t in header.split(',')]
+    return '*' in tags or etag in tags
+
+
+def accepts_gzip(header):
+    for part in (header or '').split(','):
+        coding, *params = [p.strip() for p in part.split(';')]
+        if coding in ('gzip', '*') and 'q=0' not in params:
+            return True
+    return False
+
+
+async def send_payload(request, writer, payload):
+    gzipped = payload.gzipped is not None and accepts_gzip(request.headers.get('accept-encoding'))
+    etag = payload.gzip_etag if gzipped else payload.etag
+    headers = {
+        'ETag': etag,
+        'Cache-Control': 'no-cache',
+        'Vary': 'Accept-Encoding',
+        'Access-Control-Expose-Headers': 'ETag'
+    }
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        await send_response(writer, 304, headers = headers)
+    elif gzipped:
+        await send_response(writer, 200, payload.gzipped, dict(headers, **{'Content-Encoding': 'gzip'}))
+    else:
+        await send_response(writer, 200, payload.body, headers)
+
+
+class ClientAPI:
+
+    def __init__(self, path = CLIENTS_PATH):
+        self.path = path
+        self.mtime = None
+        self.pack_identity = None
+        self.as_of = None
+        self.book = None
+        self.payloads = {}
+
+    def load(self):
+        # Nothing is read until the first request; edits to the file or the
+        # rule pack, and a new day, are picked up on the next one
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self.mtime:
+            with open(self.path) as f:
+                self.book = json.load(f)['clients']
+            self.mtime = mtime
+            self.payloads = {}
+
+        pack = RULE_PACK.reload_if_changed()
+        if pack.identity != self.pack_identity:
+            self.pack_identity = pack.identity
+            self.payloads = {}
+
+        as_of = to_date(None)
+        if as_of != self.as_of:
+            self.as_of = as_of
+            self.payloads = {}
+        return self.book
+
+    def index_payload(self):
+        book = self.load()
+        if 'index' not in self.payloads:
+            self.payloads['index'] = Payload([
+                {'index': i, 'name': w['client'].get('name'), 'scenario': w.get('_scenario')}
+                for i, w in enumerate(book)
+            ])
+        return self.payloads['index']
+
+    def client_payload(self, index):
+        book = self.load()
+        if not 0 <= index < len(book):
+            raise HTTPError(404, f"No client {index}")
+        if index not in self.payloads:
+            wrapper = book[index]
+            self.payloads[index] = Payload({
+                'index': index,
+                'scenario': wrapper.get('_scenario'),
+                'client': wrapper['client'],
+                'findings': analyze_estate_gaps(wrapper['client'], as_of = self.as_of)
+            })
+        return self.payloads[index]
+
+    async def handle(self, request, writer):
+        parts = [p for p in request.path.split('?')[0].split('/') if p]
+        if await handle_metrics(request, writer):
+            return
+        if request.method != 'GET':
+            raise HTTPError(405)
+
+        if parts == ['clients']:
+            await send_payload(request, writer, self.index_payload())
+        elif len(parts) == 2 and parts[0] == 'clients' and parts[1].isdigit():
+            await send_payload(request, writer, self.client_payload(int(parts[1])))
+        else:
+            raise HTTPError(404)
+
+
+async def serve(args):
+    if args.metrics:
+        enable()
+    api = ClientAPI(args.clients)
+    server = await start_server(api.handle, args.host, args.port)
+    print(f"Client API running on http://{args.host}:{server_port(server)}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Serves one client's profile and findings at a time")
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = PORT)
+    parser.add_argument('--clients', default = CLIENTS_PATH)
+    parser.add_argument('--metrics', action = 'store_true', help = 'Record metrics and traces, served at /metrics and /traces')
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from analysis import ENGINE_VERSION, RULES, analyze_estate_gaps, rule_pack
+from synthetic import REFERENCE_DATE, ProfileGenerator
+
+# Metrics where a bigger number is a regression; clients_per_sec is the
+# one where a smaller number is
+HIGHER_IS_WORSE = ['p50_us', 'p99_us', 'peak_memory_mb']
+DEFAULT_TOLERANCE = 0.10
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+def measure_throughput(profiles, as_of, repeat):
+    # Best of several plain passes — the minimum is the least noisy figure
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for profile in profiles:
+            analyze_estate_gaps(profile, as_of = as_of)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(profiles) / best if best else 0.0
+
+
+def measure_latency(profiles, as_of):
+    latencies = []
+    for profile in profiles:
+        start = time.perf_counter()
+        analyze_estate_gaps(profile, as_of = as_of)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    return latencies
+
+
+def measure_rule_costs(profiles, as_of):
+    RULES.reset_stats()
+    # Telemetry may already have timing on; leave it as it was
+    timing, RULES.timing = RULES.timing, True
+    try:
+        for profile in profiles:
+            analyze_estate_gaps(profile, as_of = as_of)
+    finally:
+        RULES.timing = timing
+
+    # Rules registered for several account types (R1, C6, R3, R6) are summed
+    costs = {}
+    for s in RULES.stats():
+        cost = costs.setdefault(s['rule'], {'calls': 0, 'seconds': 0.0})
+        cost['calls'] += s['calls']
+        cost['seconds'] += s['seconds']
+    RULES.reset_stats()
+
+    return {
+        rule_id: dict(cost, mean_us = cost['seconds'] / cost['calls'] * 1e6 if cost['calls'] else 0.0)
+        for rule_id, cost in sorted(costs.items(), key = lambda item: -item[1]['seconds'])
+    }
+
+
+def measure_peak_memory(profiles, as_of):
+    # Peak Python allocations while the whole book's findings are held
+    tracemalloc.start()
+    try:
+        results = [analyze_estate_gaps(profile, as_of = as_of) for profile in profiles]
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del results
+    return peak / (1024 * 1024)
+
+
+def run_benchmark(clients = 10000, seed = 0, repeat = 3, accounts = (1, 6), children = (0, 3), events = (0, 2), as_of = REFERENCE_DATE):
+    generator = ProfileGenerator(seed, accounts, children, events, as_of)
+    profiles = [w['client'] for w in generator.generate(clients)]
+
+    latencies = measure_latency(profiles, as_of)
+
+    return {
+        'engine_version': ENGINE_VERSION,
+        'rule_pack': rule_pack().version,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'book': {
+            'clients': clients,
+            'seed': seed,
+            'accounts': list(accounts),
+            'children': list(children),
+            'events': list(events),
+            'as_of': as_of.isoformat()
+        },
+        'clients_per_sec': measure_throughput(profiles, as_of, repeat),
+        'p50_us': percentile(latencies, 50),
+        'p99_us': percentile(latencies, 99),
+        'peak_memory_mb': measure_peak_memory(profiles, as_of),
+        'rules': measure_rule_costs(profiles, as_of)
+    }
+
+
+def compare(report, baseline, tolerance = DEFAULT_TOLERANCE):
+    # Returns one line per metric that got worse by more than the tolerance
+    regressions = []
+    if report['book'] != baseline.get('book'):
+        regressions.append(f"book differs from the baseline's ({baseline.get('book')}) — rerun with the same knobs")
+        return regressions
+
+    if report['clients_per_sec'] < baseline['clients_per_sec'] * (1 - tolerance):
+        regressions.append(f"clients_per_sec {report['clients_per_sec']:,.0f} vs baseline {baseline['clients_per_sec']:,.0f}")
+
+    for metric in HIGHER_IS_WORSE:
+        if report[metric] > baseline[metric] * (1 + tolerance):
+            regressions.append(f"{metric} {report[metric]:,.1f} vs baseline {baseline[metric]:,.1f}")
+
+    return regressions
+
+
+def print_report(report):
+    print(f"  {report['book']['clients']:,} clients (seed {report['book']['seed']}), engine {report['engine_version']}, Python {report['python']}")
+    print(f"  {report['clients_per_sec']:,.0f} clients/sec")
+    print(f"  per-client latency p50 {report['p50_us']:,.1f}us  p99 {report['p99_us']:,.1f}us")
+    print(f"  peak memory {report['peak_memory_mb']:,.1f} MB")
+    print("  per-rule cost:")
+    for rule_id, cost in report['rules'].items():
+        print(f"    {rule_id:<4} {cost['calls']:>9,} calls  {cost['seconds']:.3f}s  {cost['mean_us']:.2f}us/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Benchmark analyze_estate_gaps on a synthetic book')
+    parser.add_argument('--clients', type = int, default = 10000)
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--repeat', type = int, default = 3)
+    parser.add_argument('--accounts', type = int, nargs = 2, default = (1, 6), metavar = ('MIN', 'MAX'))
+    parser.add_argument('--children', type = int, nargs = 2, default = (0, 3), metavar = ('MIN', 'MAX'))
+    parser.add_argument('--events', type = int, nargs = 2, default = (0, 2), metavar = ('MIN', 'MAX'))
+    parser.add_argument('--save', default = None, help = 'Write the report here as the new baseline')
+    parser.add_argument('--baseline', default = None, help = 'Fail if the run regresses against this report')
+    parser.add_argument('--tolerance', type = float, default = DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    report = run_benchmark(args.clients, args.seed, args.repeat, tuple(args.accounts), tuple(args.children), tuple(args.events))
+    print_report(report)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok = True)
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent = 2)
+        print(f"  baseline saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"  REGRESSION: {line}")
+        if regressions:
+            sys.exit(1)
+        print("  no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
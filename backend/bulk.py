@@ -0,0 +1,189 @@
+import argparse
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from analysis import Finding, analyze_estate_gaps, compact_templates, to_date
+
+DEFAULT_CHUNK_SIZE = 256
+
+
+def chunked(items, size):
+    shard = []
+    for item in items:
+        shard.append(item)
+        if len(shard) >= size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+_worker_caches = {}
+
+
+def worker_cache(cache_dir, compact = False):
+    # One cache per worker process, sharing the on-disk tier
+    if (cache_dir, compact) not in _worker_caches:
+        from cache import FindingsCache
+        _worker_caches[(cache_dir, compact)] = FindingsCache(directory = cache_dir, compact = compact)
+    return _worker_caches[(cache_dir, compact)]
+
+
+def run_engine(profiles, engine, as_of = None, compact = False):
+    if engine == 'vectorized':
+        # NumPy is only needed for the columnar engine
+        from vectorized import analyze_book_vectorized
+        return analyze_book_vectorized(profiles, as_of, compact)
+    return [analyze_estate_gaps(profile, as_of = as_of, compact = compact) for profile in profiles]
+
+
+def analyze_shard(shard_id, profiles, engine = 'scalar', cache_dir = None, as_of = None, compact = False):
+    start = time.perf_counter()
+
+    results = [None] * len(profiles)
+    cache = worker_cache(cache_dir, compact) if cache_dir else None
+    if cache:
+        keys = [cache.key(profile, as_of) for profile in profiles]
+        results = [cache.get(key) for key in keys]
+    missing = [i for i, findings in enumerate(results) if findings is None]
+
+    computed = run_engine([profiles[i] for i in missing], engine, as_of, compact)
+    for i, findings in zip(missing, computed):
+        results[i] = findings
+        if cache:
+            cache.put(keys[i], findings)
+
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        'shard': shard_id,
+        'pid': os.getpid(),
+        'clients': len(profiles),
+        'cache_hits': len(profiles) - len(missing),
+        'seconds': elapsed,
+        'clients_per_sec': len(profiles) / elapsed if elapsed > 0 else None
+    }
+    return results, stats
+
+
+def iter_shards(profiles, workers = None, chunk_size = DEFAULT_CHUNK_SIZE, engine = 'scalar', cache_dir = None, as_of = None, compact = False):
+    # Yields (results, stats) per shard in input order. Only a small window
+    # of shards is in flight at once so memory stays flat on huge books.
+    # "Today" is fixed here, once, so a run that crosses midnight still
+    # evaluates (and caches) every shard as of the same day.
+    as_of = to_date(as_of)
+    workers = workers or os.cpu_count() or 1
+    shards = enumerate(chunked(profiles, chunk_size))
+
+    if workers == 1:
+        for shard_id, shard in shards:
+            yield analyze_shard(shard_id, shard, engine, cache_dir, as_of, compact)
+        return
+
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        in_flight = deque()
+        for shard_id, shard in shards:
+            in_flight.append(pool.submit(analyze_shard, shard_id, shard, engine, cache_dir, as_of, compact))
+            if len(in_flight) >= workers * 2:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def analyze_book(profiles, workers = None, chunk_size = DEFAULT_CHUNK_SIZE, engine = 'scalar', cache_dir = None, as_of = None, compact = False):
+    all_results = []
+    shard_stats = []
+
+    for results, stats in iter_shards(profiles, workers, chunk_size, engine, cache_dir, as_of, compact):
+        all_results.extend(results)
+        shard_stats.append(stats)
+
+    return all_results, shard_stats
+
+
+def compact_document(entries):
+    # findings.json with every template written once and findings stored as
+    # [template_id, account_id, params] references
+    return {
+        'format': 'compact-v1',
+        'templates': compact_templates(),
+        'clients': [
+            dict(entry, findings = [f.to_compact() for f in entry['findings']])
+            for entry in entries
+        ]
+    }
+
+
+def expand_document(document):
+    # Turns a compact document back into the regular findings.json layout
+    if document.get('format') != 'compact-v1':
+        return document
+    return [
+        dict(entry, findings = [Finding.from_compact(row).to_dict() for row in entry['findings']])
+        for entry in document['clients']
+    ]
+
+
+def print_shard_stats(shard_stats, wall_seconds):
+    for s in shard_stats:
+        rate = f"{s['clients_per_sec']:,.0f}" if s['clients_per_sec'] else 'n/a'
+        print(f"  shard {s['shard']:>5}  pid {s['pid']:>7}  {s['clients']:>6} clients  {s['cache_hits']:>6} cached  {s['seconds']:.3f}s  {rate} clients/sec")
+
+    total = sum(s['clients'] for s in shard_stats)
+    overall = total / wall_seconds if wall_seconds > 0 else 0
+    print(f"  {total:,} clients in {wall_seconds:.2f}s — {overall:,.0f} clients/sec across {len(shard_stats)} shards")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Run the analysis engine over a whole client book')
+    parser.add_argument('input', nargs = '?', default = 'backend/config/clients.json')
+    parser.add_argument('output', nargs = '?', default = 'docs/findings.json')
+    parser.add_argument('--workers', type = int, default = None)
+    parser.add_argument('--chunk-size', type = int, default = DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--engine', choices = ['scalar', 'vectorized'], default = 'scalar')
+    parser.add_argument('--cache-dir', default = None, help = 'Reuse findings for unchanged profiles across runs')
+    parser.add_argument('--as-of', default = None, help = 'Evaluate date-based rules as of YYYY-MM-DD (default: today)')
+    parser.add_argument('--compact', action = 'store_true', help = 'Write templates once and findings by reference')
+    args = parser.parse_args()
+
+    with open(args.input) as f:
+        data = json.load(f)
+
+    wrappers = data['clients']
+
+    start = time.perf_counter()
+    results, shard_stats = analyze_book(
+        [w['client'] for w in wrappers],
+        workers = args.workers,
+        chunk_size = args.chunk_size,
+        engine = args.engine,
+        cache_dir = args.cache_dir,
+        as_of = args.as_of,
+        compact = args.compact
+    )
+    wall_seconds = time.perf_counter() - start
+
+    all_results = [
+        {
+            'client_id': w.get('_profile_id', i),
+            'name':      w['client']['name'],
+            'scenario':  w.get('_scenario'),
+            'findings':  findings
+        }
+        for i, (w, findings) in enumerate(zip(wrappers, results))
+    ]
+
+    with open(args.output, 'w') as f:
+        if args.compact:
+            json.dump(compact_document(all_results), f, separators = (',', ':'))
+        else:
+            json.dump(all_results, f, indent = 2)
+
+    print_shard_stats(shard_stats, wall_seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import copy
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from analysis import ENGINE_VERSION, Finding, analyze_estate_gaps, rule_pack
+from timeline import next_change
+
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def canonical_json(obj):
+    return json.dumps(obj, sort_keys = True, separators = (',', ':'), ensure_ascii = False)
+
+
+def profile_hash(profile):
+    return hashlib.sha256(canonical_json(profile).encode('utf-8')).hexdigest()
+
+
+class FindingsCache:
+    # Findings keyed by a hash of the canonical client profile, the engine
+    # version, the rule pack's identity and, for profiles L0 or L5 can date, the next
+    # day their findings change — so a run tomorrow still hits unless a
+    # threshold or a year/month count falls in between. A bounded in-memory
+    # LRU sits in front of an optional on-disk tier that survives restarts.
+    # Callers get their own copies, so editing a result never reaches the
+    # cache. A compact cache holds Finding objects and stores them on disk
+    # by template reference.
+
+    def __init__(self, max_entries = DEFAULT_MAX_ENTRIES, directory = None, version = ENGINE_VERSION, compact = False):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.version = version + ('+compact' if compact else '')
+        self.compact = compact
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+
+    def key(self, profile, as_of = None):
+        pack = rule_pack()
+        changes = next_change(profile, as_of, pack)
+        until = changes.isoformat() if changes else 'undated'
+        material = f"{self.version}|{pack.identity}|{until}|{profile_hash(profile)}"
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def disk_path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, key):
+        findings = self.entries.get(key)
+        if findings is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return self.copy(findings)
+
+        if self.directory:
+            path = self.disk_path(key)
+            if os.path.exists(path):
+                with open(path) as f:
+                    findings = json.load(f)
+                if self.compact:
+                    findings = [Finding.from_compact(row) for row in findings]
+                self.disk_hits += 1
+                self.remember(key, findings)
+                return self.copy(findings)
+
+        self.misses += 1
+        return None
+
+    def copy(self, findings):
+        # Finding objects are never changed in place; dicts can be
+        return list(findings) if self.compact else copy.deepcopy(findings)
+
+    def put(self, key, findings):
+        self.remember(key, self.copy(findings))
+
+        if self.directory:
+            path = self.disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                rows = [finding.to_compact() for finding in findings] if self.compact else findings
+                json.dump(rows, f, separators = (',', ':'))
+            os.replace(tmp_path, path)
+
+    def remember(self, key, findings):
+        self.entries[key] = findings
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last = False)
+            self.evictions += 1
+
+    def analyze(self, profile, as_of = None):
+        key = self.key(profile, as_of)
+        findings = self.get(key)
+        if findings is None:
+            findings = analyze_estate_gaps(profile, as_of = as_of, compact = self.compact)
+            self.put(key, findings)
+        return findings
+
+    def stats(self):
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0
+        }
@@ -0,0 +1,166 @@
+import argparse
+import json
+import sys
+import time
+
+from analysis import Finding, finding_id, rule_pack
+from stream import open_input
+
+# What changed between two runs over a book. Each finding gets an ID built
+# from its client, template and account (see analysis.finding_id), and two
+# runs are compared in one streaming pass: both are read in lockstep and a
+# household whose counterpart has already been read is joined at once, so
+# runs written in the same book order are diffed in constant memory.
+# Households that arrive out of step wait in a hash table until their match
+# turns up. Within a household, findings are hash-joined on ID.
+#
+# Only the delta is emitted: findings that are new, resolved, or whose
+# severity changed.
+
+NEW = 'new'
+RESOLVED = 'resolved'
+SEVERITY_CHANGED = 'severity_changed'
+
+
+def iter_run(path):
+    # Yields (client_id, findings) from findings.json (regular or compact)
+    # or from stream.py NDJSON output (optionally .gz). Entries written
+    # before findings had client IDs are keyed by their line or position.
+    with open_input(path) as f:
+        if path.endswith('.json'):
+            document = json.load(f)
+            compact = isinstance(document, dict) and document.get('format') == 'compact-v1'
+            entries = document['clients'] if compact else document
+            for i, entry in enumerate(entries):
+                yield entry_key(entry, i), decode(entry['findings'], compact)
+            return
+
+        compact = False
+        for i, raw in enumerate(f):
+            if not raw.strip():
+                continue
+            entry = json.loads(raw)
+            if entry.get('format') == 'compact-v1':
+                compact = True
+                continue
+            yield entry_key(entry, i), decode(entry['findings'], compact)
+
+
+def entry_key(entry, position):
+    for key in ('client_id', 'line'):
+        if entry.get(key) is not None:
+            return entry[key]
+    return position
+
+
+def decode(findings, compact):
+    if compact:
+        return [Finding.from_compact(row) for row in findings]
+    return findings
+
+
+def keyed(client_id, findings):
+    # {finding ID: finding}. The same check can fire twice on accounts that
+    # have no account_id; repeats are numbered in engine order.
+    by_id = {}
+    for f in findings:
+        base = key = finding_id(client_id, f)
+        n = 1
+        while key in by_id:
+            n += 1
+            key = f"{base}-{n}"
+        by_id[key] = f
+    return by_id
+
+
+def change(kind, client_id, fid, finding, previous = None):
+    entry = {
+        'change':     kind,
+        'client_id':  client_id,
+        'id':         fid,
+        'rule':       finding['rule'],
+        'account_id': finding['account_id'],
+        'severity':   finding['severity'],
+        'issue':      finding['issue']
+    }
+    if previous is not None:
+        entry['previous_severity'] = previous['severity']
+        order = rule_pack().severity_order
+        entry['escalated'] = order.get(finding['severity'], 99) < order.get(previous['severity'], 99)
+    return entry
+
+
+def diff_household(client_id, old, new):
+    old = keyed(client_id, old)
+    new = keyed(client_id, new)
+    for fid, f in new.items():
+        before = old.get(fid)
+        if before is None:
+            yield change(NEW, client_id, fid, f)
+        elif before['severity'] != f['severity']:
+            yield change(SEVERITY_CHANGED, client_id, fid, f, before)
+    for fid, f in old.items():
+        if fid not in new:
+            yield change(RESOLVED, client_id, fid, f)
+
+
+def diff_runs(old_run, new_run):
+    # old_run / new_run: iterables of (client_id, findings)
+    waiting_old = {}
+    waiting_new = {}
+    old_run = iter(old_run)
+    new_run = iter(new_run)
+
+    while True:
+        old_entry = next(old_run, None)
+        new_entry = next(new_run, None)
+        if old_entry is None and new_entry is None:
+            break
+
+        if old_entry is not None and new_entry is not None and old_entry[0] == new_entry[0]:
+            yield from diff_household(old_entry[0], old_entry[1], new_entry[1])
+            continue
+
+        if old_entry is not None:
+            client_id, findings = old_entry
+            if client_id in waiting_new:
+                yield from diff_household(client_id, findings, waiting_new.pop(client_id))
+            else:
+                waiting_old[client_id] = findings
+        if new_entry is not None:
+            client_id, findings = new_entry
+            if client_id in waiting_old:
+                yield from diff_household(client_id, waiting_old.pop(client_id), findings)
+            else:
+                waiting_new[client_id] = findings
+
+    # Households only in one run: everything they had resolved, or is new
+    for client_id, findings in waiting_new.items():
+        yield from diff_household(client_id, [], findings)
+    for client_id, findings in waiting_old.items():
+        yield from diff_household(client_id, findings, [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'New, resolved and re-graded findings between two runs')
+    parser.add_argument('old', help = 'findings.json or stream.py NDJSON output from the earlier run')
+    parser.add_argument('new', help = 'The same for the later run')
+    parser.add_argument('--out', default = None, help = 'Write changes as NDJSON here (default: stdout)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    counts = {NEW: 0, RESOLVED: 0, SEVERITY_CHANGED: 0}
+    out = open(args.out, 'w') if args.out else sys.stdout
+    try:
+        for entry in diff_runs(iter_run(args.old), iter_run(args.new)):
+            counts[entry['change']] += 1
+            out.write(json.dumps(entry, separators = (',', ':')) + '\n')
+    finally:
+        if args.out:
+            out.close()
+
+    print(f"  {counts[NEW]} new, {counts[RESOLVED]} resolved, {counts[SEVERITY_CHANGED]} re-graded in {time.perf_counter() - start:.2f}s", file = sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
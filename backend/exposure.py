@@ -0,0 +1,178 @@
+import argparse
+import json
+import time
+
+import numpy as np
+
+from stream import iter_records, open_input
+from tax import DEFAULT_OTHER_INCOME, DEFAULT_PROVINCE, PROVINCE_CODES, TABLES, known_province, passes_to_estate, province_code, province_name, spousal_rollover
+
+# What a death would cost each household, for a whole book and a set of
+# what-if scenarios at once. Accounts are loaded into NumPy columns a single
+# time and every scenario is evaluated over all of them together:
+#
+#   - RRSP and RRIF balances are deemed income on the final return, stacked
+#     on top of the client's other income, unless a valid spousal rollover
+#     applies. That needs a living current spouse or common-law partner named
+#     as successor annuitant or primary beneficiary.
+#   - Accounts with no living designee, and every non-registered account,
+#     pass through the estate and attract probate at the province's rates.
+#   - Liquidity is non-registered money set against that bill.
+#
+# A household whose province is missing or unrecognised is estimated at
+# Ontario rates and marked in 'assumed_province'.
+
+REGISTERED = ('RRSP', 'RRIF')
+
+# growth scales every balance (a market move); other_income replaces each
+# client's annual_income; rollover=False ignores spousal rollovers (the
+# spouse dies first); province moves everyone to one province
+BASE_SCENARIO = {'name': 'base', 'growth': 1.0, 'other_income': None, 'rollover': True, 'province': None}
+
+
+class ExposureColumns:
+
+    def __init__(self, profiles):
+        self.profiles = list(profiles)
+        client = []
+        balance = []
+        registered = []
+        rollover = []
+        estate = []
+        liquid = []
+
+        for c, profile in enumerate(self.profiles):
+            for account in profile.get('accounts', []):
+                client.append(c)
+                balance.append(account.get('balance', 0) or 0)
+                registered.append(account.get('type') in REGISTERED)
+                rollover.append(spousal_rollover(account))
+                estate.append(passes_to_estate(account))
+                liquid.append(account.get('type') == 'non-registered')
+
+        self.client = np.array(client, dtype = np.int64)
+        self.balance = np.array(balance, dtype = np.float64)
+        self.registered = np.array(registered, dtype = bool)
+        self.rollover = np.array(rollover, dtype = bool)
+        self.estate = np.array(estate, dtype = bool)
+        self.liquid = np.array(liquid, dtype = bool)
+
+        self.province = np.array([province_code(p.get('province')) for p in self.profiles], dtype = np.int64)
+        # Estimated at the default province's rates because theirs is missing or unrecognised
+        self.assumed_province = np.array([not known_province(p.get('province')) for p in self.profiles], dtype = bool)
+        self.other_income = np.array([DEFAULT_OTHER_INCOME if p.get('annual_income') is None else p['annual_income'] for p in self.profiles], dtype = np.float64)
+
+    def per_client(self, values):
+        # values: (scenarios, accounts) -> (scenarios, clients)
+        n_clients = len(self.profiles)
+        n_scenarios = values.shape[0]
+        index = (np.arange(n_scenarios)[:, None] * n_clients + self.client[None, :]).ravel()
+        return np.bincount(index, weights = values.ravel(), minlength = n_scenarios * n_clients).reshape(n_scenarios, n_clients)
+
+
+def simulate(columns, scenarios = (BASE_SCENARIO,)):
+    # Returns {field: array of shape (scenarios, clients)}
+    scenarios = [dict(BASE_SCENARIO, **s) for s in scenarios]
+    n_clients = len(columns.profiles)
+
+    growth = np.array([s['growth'] for s in scenarios], dtype = np.float64)[:, None]
+    use_rollover = np.array([s['rollover'] for s in scenarios], dtype = bool)[:, None]
+    balance = np.floor(columns.balance[None, :] * growth)
+
+    deemed = balance * (columns.registered & ~(columns.rollover & use_rollover))
+    estate = balance * columns.estate
+    liquid = balance * columns.liquid
+
+    codes = np.stack([
+        np.full(n_clients, PROVINCE_CODES[province_name(s['province'])]) if s['province'] else columns.province
+        for s in scenarios
+    ])
+    other_income = np.stack([
+        np.full(n_clients, float(s['other_income'])) if s['other_income'] is not None else columns.other_income
+        for s in scenarios
+    ])
+
+    deemed = columns.per_client(deemed)
+    estate = columns.per_client(estate)
+    income_tax = TABLES.deemed_income_tax(deemed, codes, other_income)
+    probate = TABLES.probate_fee(estate, codes)
+    liquid = columns.per_client(liquid)
+    total = income_tax + probate
+    assumed_province = np.stack([
+        np.zeros(n_clients, dtype = bool) if s['province'] else columns.assumed_province
+        for s in scenarios
+    ])
+
+    return {
+        'deemed_income': deemed.astype(np.int64),
+        'income_tax': income_tax,
+        'estate_value': estate.astype(np.int64),
+        'probate': probate,
+        'total': total,
+        'liquid': liquid.astype(np.int64),
+        'shortfall': np.maximum(total - liquid.astype(np.int64), 0),
+        'assumed_province': assumed_province
+    }
+
+
+def simulate_book(profiles, scenarios = (BASE_SCENARIO,)):
+    return simulate(ExposureColumns(profiles), scenarios)
+
+
+def household_exposure(profile, scenario = BASE_SCENARIO):
+    result = simulate_book([profile], [scenario])
+    return {field: int(values[0, 0]) for field, values in result.items()}
+
+
+def parse_scenario(text):
+    # name:key=value,key=value — e.g. crash:growth=0.7 or widowed:rollover=false
+    name, _, settings = text.partition(':')
+    scenario = {'name': name}
+    for setting in filter(None, settings.split(',')):
+        key, _, value = setting.partition('=')
+        if key not in BASE_SCENARIO:
+            raise argparse.ArgumentTypeError(f"Unknown scenario setting: {key}")
+        if key == 'rollover':
+            scenario[key] = value.lower() in ['true', '1', 'yes']
+        elif key == 'province':
+            if not known_province(value):
+                raise argparse.ArgumentTypeError(f"Unknown province: {value}")
+            scenario[key] = value
+        else:
+            scenario[key] = float(value)
+    return scenario
+
+
+def load_profiles(path):
+    if path.endswith('.json'):
+        with open(path) as f:
+            return [w['client'] for w in json.load(f)['clients']]
+    with open_input(path) as f:
+        return [record['client'] for record, _, _ in iter_records(f)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Estate tax and probate exposure across a book under what-if scenarios')
+    parser.add_argument('book', help = 'clients.json or NDJSON (optionally .gz), one client per line')
+    parser.add_argument('--scenario', action = 'append', type = parse_scenario, default = [], help = 'name:key=value,... (growth, other_income, rollover, province)')
+    args = parser.parse_args()
+
+    profiles = load_profiles(args.book)
+    scenarios = [BASE_SCENARIO] + args.scenario
+
+    start = time.perf_counter()
+    result = simulate_book(profiles, scenarios)
+    elapsed = time.perf_counter() - start
+    print(f"  {len(profiles)} households x {len(scenarios)} scenarios in {elapsed:.2f}s\n")
+
+    for s, scenario in enumerate(scenarios):
+        short = int((result['shortfall'][s] > 0).sum())
+        print(f"  {scenario['name']:<16} income tax ${int(result['income_tax'][s].sum()):>16,}  probate ${int(result['probate'][s].sum()):>14,}  {short} households short of cash")
+
+    assumed = int(result['assumed_province'][0].sum())
+    if assumed:
+        print(f"\n  {assumed} households have no recognised province and were estimated at {DEFAULT_PROVINCE} rates")
+
+
+if __name__ == "__main__":
+    main()
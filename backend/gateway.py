@@ -0,0 +1,166 @@
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from metrics import counter, enable, histogram, span
+from service import load_api_key
+from web import ChunkedResponse, HTTPError, handle_metrics, send_error, send_response, server_port, start_server
+
+# Local gateway between the frontend and the Messages API. The API key is
+# read once at startup and upstream connections are pooled and kept alive.
+# Streaming responses are relayed chunk by chunk as they arrive, and
+# upstream status codes are passed through unchanged. Oversized requests
+# get a 413, and anything over the concurrency limit gets a 429 straight
+# away rather than queueing behind slow generations. A stream whose
+# upstream goes quiet for longer than the read timeout is ended with an
+# error event instead of holding its slot forever.
+
+PORT = 3001
+UPSTREAM_URL = 'https://api.anthropic.com'
+ANTHROPIC_VERSION = '2023-06-01'
+MAX_BODY_BYTES = 2 * 1024 * 1024
+MAX_CONCURRENT = 32
+# Longest gap allowed between upstream chunks (or before the headers)
+READ_TIMEOUT_SECONDS = 60.0
+
+# Upstream response headers worth passing on to the browser
+FORWARDED_HEADERS = ['request-id', 'retry-after']
+FORWARDED_PREFIXES = ['anthropic-ratelimit-']
+
+# The body is relayed untouched, so token counts are the caller's to record
+UPSTREAM_RESPONSES = counter('estate_gateway_responses_total', 'Upstream responses by status', ['status'])
+UPSTREAM_HEADERS_SECONDS = histogram('estate_gateway_upstream_headers_seconds', 'Time until upstream response headers')
+UPSTREAM_FIRST_BYTE_SECONDS = histogram('estate_gateway_upstream_first_byte_seconds', 'Time until the first streamed chunk')
+UPSTREAM_SECONDS = histogram('estate_gateway_upstream_seconds', 'Time until the upstream response has been relayed in full')
+
+
+def forwarded_headers(response):
+    return {
+        name: value for name, value in response.headers.items()
+        if name in FORWARDED_HEADERS or any(name.startswith(prefix) for prefix in FORWARDED_PREFIXES)
+    }
+
+
+class Gateway:
+
+    def __init__(self, api_key, upstream = UPSTREAM_URL, max_concurrent = MAX_CONCURRENT, max_body = MAX_BODY_BYTES,
+                 read_timeout = READ_TIMEOUT_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.max_body = max_body
+        self.in_flight = 0
+        self.http = httpx.AsyncClient(
+            base_url = upstream,
+            headers = {
+                'x-api-key': api_key,
+                'anthropic-version': ANTHROPIC_VERSION,
+                'content-type': 'application/json'
+            },
+            limits = httpx.Limits(max_connections = max_concurrent, max_keepalive_connections = max_concurrent),
+            # Long generations stream for minutes, so there is no overall
+            # limit; the read timeout applies to each wait for a chunk
+            timeout = httpx.Timeout(None, connect = 10.0, read = read_timeout)
+        )
+
+    async def handle(self, request, writer):
+        if await handle_metrics(request, writer):
+            return
+        if request.path.split('?')[0] != '/api/messages':
+            raise HTTPError(404)
+        if request.method != 'POST':
+            raise HTTPError(405)
+
+        if self.in_flight >= self.max_concurrent:
+            await send_error(writer, 429, 'Gateway is at its concurrency limit', 'rate_limit_error', {'Retry-After': '1'})
+            return
+
+        self.in_flight += 1
+        try:
+            with span('gateway.relay') as relayed:
+                await self.relay(request, writer, relayed)
+        finally:
+            self.in_flight -= 1
+
+    async def relay(self, request, writer, relayed = None):
+        # relayed: the request's span while telemetry is on, else None
+        start = time.perf_counter()
+        try:
+            upstream = await self.http.send(self.http.build_request('POST', '/v1/messages', content = request.body), stream = True)
+        except httpx.HTTPError as e:
+            if relayed:
+                UPSTREAM_RESPONSES.inc('error')
+            await send_error(writer, 502, f"Upstream request failed: {e}", 'gateway_error')
+            return
+
+        if relayed:
+            relayed.attributes['status'] = upstream.status_code
+            UPSTREAM_RESPONSES.inc(str(upstream.status_code))
+            UPSTREAM_HEADERS_SECONDS.observe(time.perf_counter() - start)
+
+        try:
+            content_type = upstream.headers.get('content-type', 'application/json')
+            headers = forwarded_headers(upstream)
+
+            if content_type.startswith('text/event-stream'):
+                response = ChunkedResponse(writer)
+                await response.start(upstream.status_code, headers, content_type)
+                first = relayed is not None
+                try:
+                    async for chunk in upstream.aiter_raw():
+                        if first:
+                            UPSTREAM_FIRST_BYTE_SECONDS.observe(time.perf_counter() - start)
+                            first = False
+                        await response.write(chunk)
+                except httpx.HTTPError as e:
+                    # The status is already sent; report it the way the API
+                    # reports errors mid-stream
+                    if relayed:
+                        UPSTREAM_RESPONSES.inc('error')
+                    error = {'type': 'error', 'error': {'type': 'gateway_error', 'message': f"Upstream stream failed: {e!r}"}}
+                    await response.write(f"\n\nevent: error\ndata: {json.dumps(error)}\n\n".encode('utf-8'))
+                await response.end()
+            else:
+                body = await upstream.aread()
+                await send_response(writer, upstream.status_code, body, headers, content_type)
+        finally:
+            await upstream.aclose()
+
+        if relayed:
+            UPSTREAM_SECONDS.observe(time.perf_counter() - start)
+
+    async def start(self, host = '127.0.0.1', port = PORT):
+        self.server = await start_server(self.handle, host, port, max_body = self.max_body)
+        self.port = server_port(self.server)
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        await self.http.aclose()
+
+
+async def serve(args):
+    if args.metrics:
+        enable()
+    gateway = await Gateway(load_api_key(), args.upstream, args.max_concurrent, args.max_body, args.read_timeout).start(args.host, args.port)
+    print(f"Gateway running on http://{args.host}:{gateway.port} -> {args.upstream}")
+    async with gateway.server:
+        await gateway.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Streaming gateway from the frontend to the Messages API')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = PORT)
+    parser.add_argument('--upstream', default = UPSTREAM_URL, help = 'e.g. a local mock_llm.py')
+    parser.add_argument('--max-concurrent', type = int, default = MAX_CONCURRENT)
+    parser.add_argument('--max-body', type = int, default = MAX_BODY_BYTES, help = 'Largest accepted request body, in bytes')
+    parser.add_argument('--read-timeout', type = float, default = READ_TIMEOUT_SECONDS, help = 'Longest wait for the next upstream chunk, in seconds')
+    parser.add_argument('--metrics', action = 'store_true', help = 'Record metrics and traces, served at /metrics and /traces')
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import json
+import re
+import time
+
+# Local pre-classifier for rule H1 — the client asking the assistant to
+# make a designation change itself. It runs before any model call; a hit is
+# answered straight away with the templated hard stop and the manual steps
+# for the account the message refers to.
+#
+# Compiled patterns find the requests: a request frame ("can you…", "I need
+# you to…", or an imperative at the start of a clause) followed by a verb
+# whose direct object is the designation or the designee — "change the
+# beneficiary", "remove my ex", "take Robert off my RRIF", "put my son down
+# as beneficiary", or "do it" / "fix it" in a message about designations.
+# An account named elsewhere in the clause is not enough ("move on to my
+# TFSA", "fix the formatting of your answer about my RRSP"). A small linear
+# model over lexical cues then weighs each hit, so a request that is really
+# a question ("would you change my beneficiary if you were me?") is left to
+# the model. Its weights are set by hand, not fitted to the corpus.
+
+HARD_STOP_RULE = 'H1'
+# Opening words of every hard-stop answer; memory pins turns that contain
+# it and the response cache never stores them
+HARD_STOP_MARKER = 'This is where I stop'
+
+LEADING = r"((hey|hi|ok|okay|so|please|just|now|then|go ahead and|go in and|take care of)[\s,]+)*"
+REQUEST = rf"(\b(can|could|would|will)\s+(you|u)\s+|\bi\s*(need|want|'d like|would like)\s+you\s+to\s+|(^|[,.;:!?—–]\s*|\s+and\s+)){LEADING}"
+
+CHANGES = r"(change|changing|update|updating|switch|swap|remove|removing|replace|delete|transfer|move|fix|edit|correct|process|get rid of|take(?=(\s+\S+){1,4}\s+(off|out of)\b))\b"
+ASSIGNS = r"(name|designate|put|set up|set|add|make)\b"
+DONE = r"(do (it|that|this)|make it (so|happen)|make (the|that|this|those|these) changes?|take care of (it|that|this))\b"
+
+ROLES = r"(beneficiar(y|ies)|successor|annuitant|holder|executor)"
+DESIGNATIONS = rf"({ROLES}|designations?)"
+ACCOUNTS = r"(rrsp|rrif|tfsa|fhsa|resp|accounts?|retirement (savings|income)|tax[- ]free savings|will(?!\s+(you|u|my|i|it|be)\b))"
+RELATIONS = (r"(ex|wife|husband|spouse|partner|common-law partner|girlfriend|boyfriend|gf|bf|fianc[eé]e?|son|daughter|"
+             r"stepson|stepdaughter|child|children|kids?|baby|mother|mom|father|dad|parents|brother|sister|siblings?|"
+             r"niece|nephew|grand(son|daughter|children|kids)|aunt|uncle|cousin|friend|estate)")
+# A person by relationship: "my ex", "my late wife", "my ex-husband"
+DESIGNEE = rf"((my|our)\s+((late|deceased|former|new|current)\s+)?{RELATIONS}\b|\bex-\w+)"
+DETERMINERS = r"((my|our|the|a|an|all|every|each|both|these|those|all of)\s+)*"
+# Words that end a verb's object before it reaches the designation
+# ("a list of my beneficiaries", "the accounts that have no beneficiary")
+OBJECT = r"((?!(of|for|about|on|to|in|with|without|from|that|which|who|have|has|no|so|and|but|if)\b)[\w'-]+\s+)"
+
+REQUESTED = re.compile(rf"{REQUEST}((?P<change>{CHANGES})|(?P<done>{DONE})|(?P<assign>{ASSIGNS}))")
+CLAUSE_END = re.compile(r"[.;!?]")
+
+# What a change verb must govern: the designation itself ("the beneficiary",
+# "my RRSP designations", "who gets my TFSA"), the person coming off or going
+# on ("my ex", "Robert from everything"), or the account when the clause
+# says who it should go to ("my TFSA so my husband is the successor holder")
+CHANGE_OBJECT = re.compile(
+    rf"^\s*{DETERMINERS}{OBJECT}{{0,2}}{DESIGNATIONS}\b"
+    rf"|^\s*who (gets|receives|inherits)\b"
+    rf"|^\s*{DESIGNEE}"
+    rf"|^\s*[\w'-]+\s+(from|off|out of)\s+{DETERMINERS}({ACCOUNTS}|everything)\b"
+)
+ACCOUNT_OBJECT = re.compile(rf"^\s*{DETERMINERS}{OBJECT}{{0,1}}{ACCOUNTS}\b")
+NAMES_DESIGNEE = re.compile(rf"\b{DESIGNATIONS}\b|\b(to|with|for)\s+{DESIGNEE}|\b{DESIGNEE}\s+(is|gets|as)\b")
+# An assigning verb needs its object placed in a role or on an account
+ASSIGN_OBJECT = re.compile(rf"^\s*{OBJECT}{{1,4}}((as|to be)\s+)?((a|an|the|my|our)\s+)?((new|primary|contingent|sole)\s+)*{ROLES}\b"
+                           rf"|^\s*{OBJECT}{{1,4}}(on|to|onto)\s+((my|the|all|every|each|both|of)\s+)*{ACCOUNTS}\b")
+# "fix it", "switch it to my partner", "change everything over to my wife"
+ANAPHOR = re.compile(r"^\s*(it|that|this|them|those)\s*(for (me|us)|now|right now|today|please|then)?\s*([,—–]|$)")
+ANAPHOR_TO = re.compile(rf"^\s*(it|that|this|them|everything)\s+(over\s+)?to\s+{DESIGNEE}")
+DONE_END = re.compile(r"^\s*(for (me|us)|now|right now|today|please|then)?\s*([,—–]|$)")
+FOR_ME = re.compile(r"\bfor (me|us)\b")
+# Only designations and designees make "fix it" about a designation
+CONTEXT = re.compile(rf"\b{DESIGNATIONS}\b|{DESIGNEE}")
+
+# The lexical model: a governed request starts at REQUEST_WEIGHT and is a
+# hard stop while the message stays at or above THRESHOLD
+REQUEST_WEIGHT = 3.0
+THRESHOLD = 2.5
+FEATURES = [
+    # What it would act on, and urgency
+    (0.5, re.compile(rf"\b{DESIGNATIONS}\b")),
+    (0.5, re.compile(DESIGNEE)),
+    (0.5, re.compile(r"\b(for me|right now|today|asap|right away|please)\b")),
+    # Asking for an opinion or an explanation rather than the change
+    (-2.0, re.compile(r"\b(if you were me|in my shoes|would you recommend|do you think|is it (a good idea|wise|worth))\b")),
+    (-1.5, re.compile(r"\b(explain|tell me|walk me|show me|what happens|what would happen|how do i|how would i|should i)\b")),
+    (-1.0, re.compile(r"\b(what if|suppose|hypothetically|in theory)\b"))
+]
+
+ACCOUNT_ALIASES = [
+    ('RRSP', re.compile(r"\b(rrsp|retirement savings)\b")),
+    ('RRIF', re.compile(r"\b(rrif|retirement income)\b")),
+    ('TFSA', re.compile(r"\btfsa|tax[- ]free savings\b")),
+    ('FHSA', re.compile(r"\bfhsa|first home\b")),
+    ('RESP', re.compile(r"\bresp|education savings\b")),
+    ('will', re.compile(r"\bwill\b(?!\s+(you|u|my)\b)"))
+]
+
+# Manual steps per account type, in relationship terms only (prompt rule 8)
+STEPS = {
+    'TFSA': [
+        "Contact Vesta (or log in) and request the TFSA beneficiary designation form.",
+        "If you want your spouse or common-law partner to take over the account, name them as successor holder — that keeps it tax-free.",
+        "Otherwise name the person you choose as beneficiary, and add a contingent beneficiary as a backup.",
+        "Sign and submit the form, then check the confirmation shows the right names."
+    ],
+    'RRSP': [
+        "Contact Vesta (or log in) and request the RRSP beneficiary designation form.",
+        "Name your spouse or common-law partner as successor annuitant if you want the account to roll over without immediate tax.",
+        "Name a primary and a contingent beneficiary, and remove anyone who should no longer receive the account.",
+        "Sign and submit the form, then check the confirmation shows the right names."
+    ],
+    'RRIF': [
+        "Contact Vesta (or log in) and request the RRIF successor annuitant and beneficiary form.",
+        "Name your spouse or common-law partner as successor annuitant if you want the payments to continue to them.",
+        "Name a primary and a contingent beneficiary to replace anyone who has passed away or should no longer receive it.",
+        "Sign and submit the form, then check the confirmation shows the right names."
+    ],
+    'FHSA': [
+        "Contact Vesta (or log in) and request the FHSA beneficiary designation form.",
+        "Name your spouse or common-law partner as successor holder, or name a beneficiary and a contingent beneficiary.",
+        "Sign and submit the form, then check the confirmation shows the right names."
+    ],
+    'RESP': [
+        "Contact Vesta to review the RESP subscriber and beneficiary details.",
+        "Ask about naming a joint or successor subscriber so the plan continues for your child if something happens to you.",
+        "Confirm the changes in writing."
+    ],
+    'will': [
+        "Book an appointment with an estate lawyer (or a notary in Quebec).",
+        "Bring a list of your accounts and current beneficiary designations so the will and the designations agree.",
+        "Sign the new will with the required witnesses — an unsigned draft has no effect."
+    ]
+}
+GENERAL_STEPS = [
+    "Contact Vesta (or log in) and request the beneficiary designation form for each account you want to update.",
+    "Name your spouse or common-law partner as successor holder or successor annuitant where that applies, and name primary and contingent beneficiaries.",
+    "Sign and submit each form, then check the confirmations show the right names.",
+    "Review your will with an estate lawyer so it matches your new designations."
+]
+QUEBEC_STEP = "Because you live in Quebec, confirm with a notary first — designations there are made through the contract or your will."
+
+
+class Intent:
+
+    __slots__ = ('rule', 'score', 'account_types')
+
+    def __init__(self, rule, score, account_types):
+        self.rule = rule
+        self.score = score
+        self.account_types = account_types
+
+    @property
+    def hard_stop(self):
+        return self.rule == HARD_STOP_RULE
+
+
+def normalize(text):
+    return ' '.join(text.casefold().replace('’', "'").split())
+
+
+def governed(match, text):
+    # The verb's clause, up to the next sentence break
+    tail = text[match.end():]
+    end = CLAUSE_END.search(tail)
+    tail = tail[:end.start()] if end else tail
+
+    if match.group('done'):
+        return bool(DONE_END.search(tail) or (tail.lstrip().startswith('so ') and CONTEXT.search(tail)))
+    if match.group('assign'):
+        return bool(ASSIGN_OBJECT.search(tail))
+    if ANAPHOR.search(tail):
+        return bool(FOR_ME.search(tail) or CONTEXT.search(text))
+    if ACCOUNT_OBJECT.search(tail):
+        return bool(NAMES_DESIGNEE.search(tail))
+    return bool(CHANGE_OBJECT.search(tail) or ANAPHOR_TO.search(tail))
+
+
+def score(text):
+    # REQUEST_WEIGHT for a governed request plus the lexical cues; 0.0 when
+    # nothing in the message asks for a designation change
+    text = normalize(text)
+    if not any(governed(match, text) for match in REQUESTED.finditer(text)):
+        return 0.0
+    return REQUEST_WEIGHT + sum(weight for weight, pattern in FEATURES if pattern.search(text))
+
+
+def referenced_accounts(text):
+    text = normalize(text)
+    return [account_type for account_type, pattern in ACCOUNT_ALIASES if pattern.search(text)]
+
+
+def classify(text):
+    s = score(text)
+    return Intent(HARD_STOP_RULE if s >= THRESHOLD else None, s, referenced_accounts(text))
+
+
+def is_hard_stop(text):
+    return score(text) >= THRESHOLD
+
+
+def hard_stop_response(intent, client = None):
+    accounts = (client or {}).get('accounts', [])
+    held = [a.get('type') for a in accounts]
+
+    account_types = [t for t in intent.account_types if t == 'will' or not held or t in held]
+    if not account_types:
+        # Nothing named — use the client's only registered account if there is one
+        registered = [t for t in held if t in STEPS]
+        account_types = registered[:1] if len(set(registered)) == 1 else []
+
+    lines = [
+        f"{HARD_STOP_MARKER}. Beneficiary designations are legal instructions that I'm not permitted to execute. "
+        "If a change were made incorrectly the consequences could be irreversible, so this decision needs to be yours, "
+        "confirmed through the proper process.",
+        "",
+        "Here is what you need to do yourself:"
+    ]
+
+    steps = []
+    if (client or {}).get('province', '').lower() in ['quebec', 'qc']:
+        steps.append(QUEBEC_STEP)
+    if account_types:
+        for account_type in account_types:
+            label = 'your will' if account_type == 'will' else f"your {account_type}"
+            steps += [f"({label}) {step}" if len(account_types) > 1 else step for step in STEPS[account_type]]
+    else:
+        steps += GENERAL_STEPS
+
+    lines += [f"{i}. {step}" for i, step in enumerate(steps, 1)]
+    return '\n'.join(lines)
+
+
+def evaluate(rows):
+    # rows: [{'text': ..., 'hard_stop': bool}]
+    tp = fp = fn = tn = 0
+    start = time.perf_counter()
+    for row in rows:
+        predicted = is_hard_stop(row['text'])
+        if predicted and row['hard_stop']:
+            tp += 1
+        elif predicted:
+            fp += 1
+        elif row['hard_stop']:
+            fn += 1
+        else:
+            tn += 1
+    elapsed = time.perf_counter() - start
+    return {
+        'messages': len(rows),
+        'precision': tp / (tp + fp) if tp + fp else 0.0,
+        'recall': tp / (tp + fn) if tp + fn else 0.0,
+        'false_positives': fp,
+        'false_negatives': fn,
+        'mean_us': elapsed / len(rows) * 1e6 if rows else 0.0
+    }
+
+
+def load_corpus(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Measure the hard-stop classifier on a labelled corpus')
+    parser.add_argument('corpus', help = 'JSONL with {"text": ..., "hard_stop": true|false} per line')
+    args = parser.parse_args()
+
+    rows = load_corpus(args.corpus)
+    result = evaluate(rows)
+    print(f"  {result['messages']} messages  precision {result['precision']:.3f}  recall {result['recall']:.3f}  {result['mean_us']:.1f}us/message")
+    for row in rows:
+        if is_hard_stop(row['text']) != row['hard_stop']:
+            print(f"  {'missed' if row['hard_stop'] else 'false positive'}: {row['text']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import copy
+
+from analysis import RULES, ClientIndex, analyze_estate_gaps
+
+# Re-analysis after a small profile edit. Each changed field is mapped to
+# the rules that read it (see the reads declared in the rule registry), only
+# those rules are re-evaluated, and their findings are spliced back into the
+# previous sorted list. The result is identical to a full re-run; whenever
+# that cannot be guaranteed cheaply we simply fall back to one.
+
+ACCOUNT_PHASE = 0
+CLIENT_PHASE = 1
+
+
+def parse_pointer(pointer):
+    if pointer == '':
+        return ()
+    if not pointer.startswith('/'):
+        raise ValueError(f"Invalid JSON pointer: {pointer}")
+    parts = []
+    for token in pointer[1:].split('/'):
+        token = token.replace('~1', '/').replace('~0', '~')
+        parts.append(int(token) if token.isdigit() else token)
+    return tuple(parts)
+
+
+def apply_patch(profile, patch):
+    # Supports the add / remove / replace operations of RFC 6902
+    profile = copy.deepcopy(profile)
+    changed = []
+
+    for op in patch:
+        path = parse_pointer(op['path'])
+        if not path:
+            raise ValueError("Patching the whole profile is not supported — pass new_profile instead")
+
+        parent = profile
+        for key in path[:-1]:
+            parent = parent[key]
+        key = path[-1]
+
+        if op['op'] == 'replace':
+            parent[key] = copy.deepcopy(op['value'])
+        elif op['op'] == 'add':
+            if isinstance(parent, list):
+                if key == '-':
+                    key = len(parent)
+                parent.insert(key, copy.deepcopy(op['value']))
+                # Later list items shifted, so the whole list changed
+                path = path[:-1]
+            else:
+                parent[key] = copy.deepcopy(op['value'])
+        elif op['op'] == 'remove':
+            del parent[key]
+            if isinstance(parent, list):
+                path = path[:-1]
+        else:
+            raise ValueError(f"Unsupported patch operation: {op['op']}")
+
+        changed.append(path)
+
+    return profile, changed
+
+
+def diff_paths(old, new, path = ()):
+    if isinstance(old, dict) and isinstance(new, dict):
+        changed = []
+        for key in old.keys() | new.keys():
+            if key not in old or key not in new:
+                changed.append(path + (key,))
+            else:
+                changed += diff_paths(old[key], new[key], path + (key,))
+        return changed
+
+    if isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        changed = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            changed += diff_paths(a, b, path + (i,))
+        return changed
+
+    return [] if old == new else [path]
+
+
+def account_shape(profile):
+    return [(a.get('type'), a.get('account_id')) for a in profile.get('accounts', [])]
+
+
+def paths_overlap(read, path, presence_only = False):
+    # One path is a prefix of the other; '*' in a read matches any list index.
+    # A presence-only read ignores changes nested below the field itself.
+    if presence_only and len(path) > len(read):
+        return False
+    for r, p in zip(read, path):
+        if r != '*' and r != p:
+            return False
+    return True
+
+
+def split_read(read):
+    presence_only = read.endswith('?')
+    return tuple(read.rstrip('?').split('.')), presence_only
+
+
+def read_hits(read, path, position = None):
+    read, presence_only = read
+    if read == ('as_of',) or not path:
+        return True
+    if read[0] == 'account':
+        # Only changes to the account being checked (or the whole list)
+        if path[0] != 'accounts':
+            return False
+        if len(path) == 1:
+            return True
+        return path[1] == position and paths_overlap(read[1:], path[2:], presence_only)
+    return paths_overlap(read, path, presence_only)
+
+
+def affected_units(changed, profile, dispatch):
+    # A unit is one rule evaluated on one account (or once per client).
+    # Returns {unit_key: (rule, account_or_None)}.
+    accounts = profile.get('accounts', [])
+    units = {}
+
+    for position, account in enumerate(accounts):
+        for order, r in enumerate(dispatch.get(account.get('type'), ())):
+            reads = [split_read(read) for read in r.reads]
+            if any(read_hits(read, path, position) for read in reads for path in changed):
+                units[(ACCOUNT_PHASE, position, order)] = (r, account)
+
+    for order, r in enumerate(dispatch.get('client', ())):
+        reads = [split_read(read) for read in r.reads]
+        if any(read_hits(read, path) for read in reads for path in changed):
+            units[(CLIENT_PHASE, 0, order)] = (r, None)
+
+    return units
+
+
+def attribute_findings(findings, profile, dispatch):
+    # Maps every previous finding back to the unit that produced it, or
+    # returns None when a finding cannot be tied to exactly one unit
+    accounts = profile.get('accounts', [])
+
+    client_orders = {r.rule_id: order for order, r in enumerate(dispatch.get('client', ()))}
+    type_orders = {}
+    for account_type, rules in dispatch.items():
+        if account_type != 'client':
+            type_orders[account_type] = {r.rule_id: order for order, r in enumerate(rules)}
+
+    keys = []
+    for f in findings:
+        if f['account_type'] == 'ALL':
+            order = client_orders.get(f['rule'])
+            if order is None:
+                return None
+            keys.append((CLIENT_PHASE, 0, order))
+            continue
+
+        order = type_orders.get(f['account_type'], {}).get(f['rule'])
+        candidates = [
+            position for position, a in enumerate(accounts)
+            if a.get('type') == f['account_type'] and (f['account_id'] is None or a.get('account_id') == f['account_id'])
+        ]
+        if order is None or len(candidates) != 1:
+            return None
+        keys.append((ACCOUNT_PHASE, candidates[0], order))
+
+    return keys
+
+
+def reanalyze(previous_profile, previous_findings, new_profile = None, patch = None, only = None, skip = None, as_of = None, compact = False):
+    if patch is not None:
+        new_profile, changed = apply_patch(previous_profile, patch)
+    else:
+        changed = diff_paths(previous_profile, new_profile)
+
+    # Added, removed or re-typed accounts change the dispatch itself
+    if account_shape(previous_profile) != account_shape(new_profile):
+        return analyze_estate_gaps(new_profile, only, skip, as_of, compact)
+
+    dispatch = RULES.compile(only, skip)
+    keys = attribute_findings(previous_findings, previous_profile, dispatch)
+    if keys is None:
+        return analyze_estate_gaps(new_profile, only, skip, as_of, compact)
+
+    units = affected_units(changed, new_profile, dispatch)
+    if not units:
+        return list(previous_findings)
+
+    index = ClientIndex(new_profile, as_of)
+    severity_order = index.pack.severity_order
+
+    merged = [
+        (severity_order.get(f['severity'], 99), key, seq, f)
+        for seq, (key, f) in enumerate(zip(keys, previous_findings))
+        if key not in units
+    ]
+
+    for key, (r, account) in units.items():
+        if account is None:
+            fresh = RULES.run((r,), new_profile, index)
+        else:
+            fresh = RULES.run((r,), account, new_profile, index)
+        if not compact:
+            fresh = [f.to_dict() for f in fresh]
+        for seq, f in enumerate(fresh):
+            merged.append((severity_order.get(f['severity'], 99), key, seq, f))
+
+    # Equivalent to the full engine's stable severity sort over findings in
+    # account-then-client rule order
+    merged.sort(key = lambda m: m[:3])
+    return [m[3] for m in merged]
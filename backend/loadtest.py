@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+
+import httpx
+
+from benchmark import percentile
+from mock_llm import MockLLM
+from response_cache import ResponseCache
+from service import ChatService, load_book, make_llm
+from web import server_port, start_server
+
+# Load test for the chat path. The chat service runs in this process
+# against a mock Messages API (mock_llm.py, or any server at --llm-url),
+# and simulated users replay the scripted conversations in docs/queries.md
+# over HTTP, one session per conversation, as the frontend would. Each
+# persona in clients.json is replayed the same number of times.
+#
+# Latency percentiles are over turns the model answered; hard stops and
+# cached answers never wait on it and are only counted. Prompt size is
+# the total input tokens the model was sent, averaged by turn number.
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), '..', 'docs', 'queries.md')
+
+# Metrics where a bigger number is a regression; turns_per_sec is the
+# one where a smaller number is
+HIGHER_IS_WORSE = ['turn_p50_ms', 'turn_p95_ms', 'turn_p99_ms', 'ttft_p95_ms', 'error_rate']
+DEFAULT_TOLERANCE = 0.10
+
+# For personas that docs/queries.md has no script for
+DEFAULT_SCRIPT = [
+    "Is there anything in my estate plan I should be worried about?",
+    "What should I fix first?"
+]
+
+HEADING = re.compile(r'^\*\*With .*\((\w+)\):\*\*')
+
+
+def load_scripts(path = QUERIES_PATH):
+    # {profile ID: [user turns]} from '**With Name (P001):**' headings
+    # followed by 'You: ...' lines; '← notes' after a line are dropped
+    scripts = {}
+    turns = None
+    with open(path) as f:
+        for line in f:
+            heading = HEADING.match(line)
+            if heading:
+                turns = scripts.setdefault(heading.group(1), [])
+            elif line.startswith('You:') and turns is not None:
+                turns.append(line[len('You:'):].split('←')[0].strip())
+    return scripts
+
+
+def conversations(book, scripts, rounds):
+    # (client index, profile ID, turns), every persona once per round
+    personas = [(i, w.get('_profile_id'), scripts.get(w.get('_profile_id'), DEFAULT_SCRIPT)) for i, w in enumerate(book)]
+    return personas * rounds
+
+
+async def send_turn(http, session_id, text):
+    start = time.perf_counter()
+    first_token = None
+    usage = None
+    status = None
+    event = None
+
+    async with http.stream('POST', f'/sessions/{session_id}/messages', json = {'content': text}) as response:
+        if response.status_code != 200:
+            status = response.status_code
+        async for line in response.aiter_lines():
+            if line.startswith('event: '):
+                event = line[len('event: '):]
+            elif line.startswith('data: '):
+                if event == 'delta' and first_token is None:
+                    first_token = time.perf_counter() - start
+                elif event == 'done':
+                    usage = json.loads(line[len('data: '):])['usage']
+                elif event == 'error':
+                    status = json.loads(line[len('data: '):])['status']
+
+    if usage is None:
+        outcome = 'error'
+    elif usage['hard_stop']:
+        outcome = 'hard_stop'
+    elif usage['cached_response']:
+        outcome = 'cached'
+    else:
+        outcome = 'model'
+
+    return {
+        'outcome': outcome,
+        'status': status,
+        'seconds': time.perf_counter() - start,
+        'first_token': first_token,
+        'input_tokens': usage['input_tokens'] if usage else 0,
+        'output_tokens': usage['output_tokens'] if usage else 0
+    }
+
+
+async def replay(http, client_index, profile_id, turns):
+    created = await http.post('/sessions', json = {'client_index': client_index})
+    created.raise_for_status()
+    session_id = created.json()['session_id']
+
+    results = []
+    try:
+        for n, text in enumerate(turns, 1):
+            result = await send_turn(http, session_id, text)
+            results.append(dict(result, turn = n, profile_id = profile_id))
+    finally:
+        await http.delete(f'/sessions/{session_id}')
+    return results
+
+
+async def run_users(base_url, plan, users):
+    # `users` simulated users work through the conversations in plan order
+    queue = asyncio.Queue()
+    for conversation in plan:
+        queue.put_nowait(conversation)
+    results = []
+
+    async def user(http):
+        while not queue.empty():
+            results.extend(await replay(http, *queue.get_nowait()))
+
+    limits = httpx.Limits(max_connections = users, max_keepalive_connections = users)
+    async with httpx.AsyncClient(base_url = base_url, limits = limits, timeout = 120) as http:
+        await asyncio.gather(*[user(http) for _ in range(users)])
+    return results
+
+
+def summarize(results, seconds):
+    answered = [r for r in results if r['outcome'] == 'model']
+    latencies = [r['seconds'] * 1000 for r in answered]
+    first_tokens = [r['first_token'] * 1000 for r in answered if r['first_token'] is not None]
+
+    outcomes = {}
+    for r in results:
+        outcomes[r['outcome']] = outcomes.get(r['outcome'], 0) + 1
+
+    by_turn = {}
+    for r in answered:
+        by_turn.setdefault(r['turn'], []).append(r['input_tokens'])
+
+    return {
+        'turns': len(results),
+        'outcomes': outcomes,
+        'error_rate': outcomes.get('error', 0) / len(results) if results else 0.0,
+        'seconds': seconds,
+        'turns_per_sec': (len(results) - outcomes.get('error', 0)) / seconds if seconds else 0.0,
+        'output_tokens_per_sec': sum(r['output_tokens'] for r in answered) / seconds if seconds else 0.0,
+        'turn_p50_ms': percentile(latencies, 50),
+        'turn_p95_ms': percentile(latencies, 95),
+        'turn_p99_ms': percentile(latencies, 99),
+        'ttft_p50_ms': percentile(first_tokens, 50),
+        'ttft_p95_ms': percentile(first_tokens, 95),
+        'ttft_p99_ms': percentile(first_tokens, 99),
+        # Turn number -> mean input tokens sent to the model
+        'prompt_tokens_by_turn': {str(n): sum(sizes) / len(sizes) for n, sizes in sorted(by_turn.items())}
+    }
+
+
+async def run_load(users = 5, rounds = 4, first_token_delay = 0.2, token_delay = 0.01, reply_words = 40, jitter = 0.0,
+                   error_rate = 0.0, error_status = 529, retries = 2, response_cache = True, seed = 0,
+                   llm_url = None, queries = QUERIES_PATH, book = None):
+    book = book or load_book()
+    plan = conversations(book, load_scripts(queries), rounds)
+
+    mock = None
+    if llm_url is None:
+        mock = await MockLLM(first_token_delay, token_delay, reply_words, jitter, error_rate, error_status, seed).start()
+        llm_url = mock.base_url
+
+    llm = make_llm(os.environ.get('ANTHROPIC_API_KEY', 'mock'), llm_url).with_options(max_retries = retries)
+    service = ChatService(llm, book, response_cache = ResponseCache() if response_cache else None)
+    server = await start_server(service.handle)
+    try:
+        start = time.perf_counter()
+        results = await run_users(f"http://127.0.0.1:{server_port(server)}", plan, users)
+        seconds = time.perf_counter() - start
+    finally:
+        server.close()
+        await server.wait_closed()
+        await llm.close()
+        if mock:
+            await mock.close()
+
+    report = {
+        # Two reports are only comparable when these match
+        'config': {
+            'users': users,
+            'rounds': rounds,
+            'personas': len(book),
+            'first_token_delay': first_token_delay,
+            'token_delay': token_delay,
+            'reply_words': reply_words,
+            'jitter': jitter,
+            'error_rate': error_rate,
+            'error_status': error_status,
+            'retries': retries,
+            'response_cache': response_cache,
+            'mock': mock is not None
+        },
+        **summarize(results, seconds)
+    }
+    if mock:
+        report['upstream'] = dict(mock.stats(), errors = mock.errors)
+    return report
+
+
+def compare(report, baseline, tolerance = DEFAULT_TOLERANCE):
+    # Returns one line per metric that got worse by more than the tolerance
+    regressions = []
+    if report['config'] != baseline.get('config'):
+        regressions.append(f"config differs from the baseline's ({baseline.get('config')}) — rerun with the same knobs")
+        return regressions
+
+    if report['turns_per_sec'] < baseline['turns_per_sec'] * (1 - tolerance):
+        regressions.append(f"turns_per_sec {report['turns_per_sec']:,.1f} vs baseline {baseline['turns_per_sec']:,.1f}")
+
+    for metric in HIGHER_IS_WORSE:
+        if report[metric] > baseline[metric] * (1 + tolerance):
+            regressions.append(f"{metric} {report[metric]:,.3f} vs baseline {baseline[metric]:,.3f}")
+
+    return regressions
+
+
+def print_report(report):
+    config = report['config']
+    outcomes = ', '.join(f"{n} {outcome}" for outcome, n in sorted(report['outcomes'].items()))
+    print(f"  {config['users']} users, {report['turns']} turns in {report['seconds']:.2f}s ({outcomes})")
+    print(f"  {report['turns_per_sec']:,.1f} turns/sec, {report['output_tokens_per_sec']:,.0f} output tokens/sec, {report['error_rate']:.1%} errors")
+    print(f"  turn latency p50 {report['turn_p50_ms']:,.0f}ms  p95 {report['turn_p95_ms']:,.0f}ms  p99 {report['turn_p99_ms']:,.0f}ms")
+    print(f"  first token  p50 {report['ttft_p50_ms']:,.0f}ms  p95 {report['ttft_p95_ms']:,.0f}ms  p99 {report['ttft_p99_ms']:,.0f}ms")
+    print("  prompt size by turn:")
+    for turn, tokens in report['prompt_tokens_by_turn'].items():
+        print(f"    turn {turn:<3} {tokens:>9,.0f} input tokens")
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Replay scripted conversations against the chat service and a mock model')
+    parser.add_argument('--users', type = int, default = 5, help = 'Conversations in flight at once')
+    parser.add_argument('--rounds', type = int, default = 4, help = 'Times each persona is replayed')
+    parser.add_argument('--first-token-delay', type = float, default = 0.2)
+    parser.add_argument('--token-delay', type = float, default = 0.01)
+    parser.add_argument('--reply-words', type = int, default = 40)
+    parser.add_argument('--jitter', type = float, default = 0.0, help = 'Up to this many seconds added at random to the first-token delay')
+    parser.add_argument('--error-rate', type = float, default = 0.0, help = 'Share of model requests the mock fails')
+    parser.add_argument('--error-status', type = int, default = 529)
+    parser.add_argument('--retries', type = int, default = 2, help = 'API client retries per model request')
+    parser.add_argument('--no-response-cache', action = 'store_true')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--llm-url', default = None, help = 'Use this Messages API instead of starting a mock')
+    parser.add_argument('--queries', default = QUERIES_PATH)
+    parser.add_argument('--save', default = None, help = 'Write the report here as the new baseline')
+    parser.add_argument('--baseline', default = None, help = 'Fail if the run regresses against this report')
+    parser.add_argument('--tolerance', type = float, default = DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(
+        args.users, args.rounds, args.first_token_delay, args.token_delay, args.reply_words, args.jitter,
+        args.error_rate, args.error_status, args.retries, not args.no_response_cache, args.seed, args.llm_url, args.queries
+    ))
+    print_report(report)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok = True)
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent = 2)
+        print(f"  baseline saved to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"  REGRESSION: {line}")
+        if regressions:
+            sys.exit(1)
+        print("  no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import re
+
+from hardstop import HARD_STOP_MARKER
+from prompt import estimate_tokens
+
+# Conversation history under a token budget. The most recent turns are
+# always sent verbatim; when the verbatim history outgrows the budget the
+# oldest turns are folded into a running summary, which is itself bounded,
+# so a long conversation costs about as much per turn as a short one.
+# Turns that got a hard-stop response, or that name a CRITICAL finding by
+# its rule ID and account type ("R3 … RRSP"), are pinned and not folded.
+# Only the newest few stay pinned; older ones fold like any other turn.
+
+DEFAULT_TOKEN_BUDGET = 4000
+DEFAULT_SUMMARY_BUDGET = 600
+DEFAULT_KEEP_RECENT = 4
+DEFAULT_MAX_PINNED = 4
+
+SUMMARY_PREFIX = 'Summary of our conversation so far:'
+SUMMARY_ACK = 'Understood — I have that context.'
+
+SENTENCE_END = re.compile(r'(?<=[.!?])\s')
+
+
+def first_sentence(text, limit):
+    sentence = SENTENCE_END.split(text.strip(), 1)[0]
+    return sentence if len(sentence) <= limit else sentence[:limit - 1].rstrip() + '…'
+
+
+def summarize_turn(user, assistant):
+    # Extractive and free: what was asked and the gist of the answer. Any
+    # callable with the same signature (an LLM call, say) can replace it.
+    return f"- Client asked: {first_sentence(user, 160)} Assistant: {first_sentence(assistant, 200)}"
+
+
+class Turn:
+
+    __slots__ = ('user', 'assistant', 'tokens', 'pinned')
+
+    def __init__(self, user, assistant, pinned):
+        self.user = user
+        self.assistant = assistant
+        self.tokens = estimate_tokens(user) + estimate_tokens(assistant)
+        self.pinned = pinned
+
+
+class ConversationMemory:
+
+    def __init__(self, findings = (), token_budget = DEFAULT_TOKEN_BUDGET, keep_recent = DEFAULT_KEEP_RECENT, summary_budget = DEFAULT_SUMMARY_BUDGET,
+                 max_pinned = DEFAULT_MAX_PINNED, summarizer = summarize_turn):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.summary_budget = summary_budget
+        self.max_pinned = max_pinned
+        self.summarizer = summarizer
+
+        # (rule ID, account type) patterns; a cross-account finding is
+        # identified by its rule ID alone
+        self.critical = []
+        for f in findings:
+            if f['severity'] != 'CRITICAL':
+                continue
+            rule = re.compile(rf"\b{re.escape(f['rule'])}\b", re.IGNORECASE)
+            account_type = f.get('account_type', 'ALL')
+            account = None if account_type == 'ALL' else re.compile(rf"\b{re.escape(account_type)}\b", re.IGNORECASE)
+            self.critical.append((rule, account))
+
+        self.turns = []
+        self.summary = []
+        self.total_turns = 0
+        self.summarized_turns = 0
+
+    def is_pinned(self, user, assistant):
+        if HARD_STOP_MARKER in assistant:
+            return True
+        text = f"{user}\n{assistant}"
+        return any(rule.search(text) and (account is None or account.search(text)) for rule, account in self.critical)
+
+    def verbatim_tokens(self):
+        return sum(t.tokens for t in self.turns)
+
+    def summary_tokens(self):
+        return estimate_tokens('\n'.join(self.summary)) if self.summary else 0
+
+    def add_turn(self, user, assistant):
+        self.turns.append(Turn(user, assistant, self.is_pinned(user, assistant)))
+        self.total_turns += 1
+
+        # Past the cap the oldest pinned turn becomes foldable again
+        pinned = [t for t in self.turns if t.pinned]
+        for turn in pinned[:max(len(pinned) - self.max_pinned, 0)]:
+            turn.pinned = False
+
+        self.fold()
+        return self.stats()
+
+    def fold(self):
+        # Oldest unpinned turns outside the recent window go first
+        while self.verbatim_tokens() > self.token_budget:
+            candidates = [i for i, t in enumerate(self.turns[:-self.keep_recent or None]) if not t.pinned]
+            if not candidates:
+                break
+            turn = self.turns.pop(candidates[0])
+            self.summary.append(self.summarizer(turn.user, turn.assistant))
+            self.summarized_turns += 1
+
+        # The summary rolls too: its oldest lines fall off past its budget
+        while len(self.summary) > 1 and self.summary_tokens() > self.summary_budget:
+            self.summary.pop(0)
+
+    def messages(self, user = None):
+        # The API message list for the next turn, ending with the new
+        # question when one is given
+        messages = []
+        if self.summary:
+            messages.append({'role': 'user', 'content': SUMMARY_PREFIX + '\n' + '\n'.join(self.summary)})
+            messages.append({'role': 'assistant', 'content': SUMMARY_ACK})
+        for t in self.turns:
+            messages.append({'role': 'user', 'content': t.user})
+            messages.append({'role': 'assistant', 'content': t.assistant})
+        if user is not None:
+            messages.append({'role': 'user', 'content': user})
+        return messages
+
+    def stats(self):
+        return {
+            'turns': self.total_turns,
+            'verbatim_turns': len(self.turns),
+            'pinned_turns': sum(1 for t in self.turns if t.pinned),
+            'summarized_turns': self.summarized_turns,
+            'history_tokens': self.verbatim_tokens(),
+            'summary_tokens': self.summary_tokens()
+        }
@@ -0,0 +1,228 @@
+import contextvars
+import os
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from time import perf_counter, time
+
+# Counters, histograms and trace spans, exported in the Prometheus text
+# format. Everything is off until enable() is called (the services do so
+# with --metrics); while it is off the analysis engine checks one flag per
+# client and records nothing, so the hot path costs what it did before.
+#
+# Values live in this process only. Bulk workers in other processes are not
+# aggregated; scrape the services. Serving them over HTTP is web.py's job
+# (handle_metrics, serve_metrics), so the rule engine never loads the
+# HTTP layer.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+MAX_SPANS = 2000
+
+# Seconds; the default Prometheus buckets suit model calls and requests
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# One rule on one account takes microseconds
+RULE_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+# A whole client takes tens to hundreds of microseconds
+ANALYSIS_BUCKETS = (2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 1e-2, 0.1)
+
+
+class Telemetry:
+
+    def __init__(self):
+        self.enabled = False
+        self.spans = deque(maxlen = MAX_SPANS)
+        # Called with True/False when telemetry is switched on or off
+        self.hooks = []
+
+
+TELEMETRY = Telemetry()
+
+
+def enable(on = True):
+    TELEMETRY.enabled = on
+    for hook in TELEMETRY.hooks:
+        hook(on)
+
+
+def on_toggle(hook):
+    TELEMETRY.hooks.append(hook)
+    return hook
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def label_text(names, values, extra = ''):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labels = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # label values -> count
+        self.values = {}
+
+    def inc(self, *labels):
+        self.values[labels] = self.values.get(labels, 0) + 1
+
+    def add(self, amount, *labels):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self.values.get(labels, 0)
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{label_text(self.labels, labels)} {number(value)}"
+
+
+class Histogram:
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels = (), buckets = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [count per bucket (the last is +Inf), sum]
+        self.values = {}
+
+    def observe(self, value, *labels):
+        state = self.values.get(labels)
+        if state is None:
+            state = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+
+    def count(self, *labels):
+        state = self.values.get(labels)
+        return sum(state[0]) if state else 0
+
+    def samples(self):
+        for labels, (counts, total) in sorted(self.values.items()):
+            cumulative = 0
+            for upper, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                le = f'le="{number(upper)}"'
+                yield f"{self.name}_bucket{label_text(self.labels, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{label_text(self.labels, labels)} {number(total)}"
+            yield f"{self.name}_count{label_text(self.labels, labels)} {cumulative}"
+
+
+class Registry:
+
+    def __init__(self):
+        self.metrics = {}
+
+    def add(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.values.clear()
+        TELEMETRY.spans.clear()
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labels = ()):
+    return REGISTRY.add(Counter(name, help, labels))
+
+
+def histogram(name, help, labels = (), buckets = DEFAULT_BUCKETS):
+    return REGISTRY.add(Histogram(name, help, labels, buckets))
+
+
+SPAN_SECONDS = histogram('estate_span_seconds', 'Duration of traced operations', ['span'])
+
+
+# ── Traces ──────────────────────────────────────────────────────
+
+CURRENT_SPAN = contextvars.ContextVar('current_span', default = None)
+
+
+class Span:
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'started', 'seconds', 'attributes')
+
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else None
+        self.started = time()
+        self.seconds = None
+        self.attributes = attributes
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'started': self.started,
+            'seconds': self.seconds,
+            'attributes': self.attributes
+        }
+
+
+@contextmanager
+def span(name, parent = None, **attributes):
+    # Times the block as a child of `parent` (or of the enclosing span).
+    # Yields None and records nothing while telemetry is off.
+    if not TELEMETRY.enabled:
+        yield None
+        return
+
+    current = Span(name, parent or CURRENT_SPAN.get(), attributes)
+    token = CURRENT_SPAN.set(current)
+    start = perf_counter()
+    try:
+        yield current
+    except BaseException as e:
+        current.attributes['error'] = type(e).__name__
+        raise
+    finally:
+        current.seconds = perf_counter() - start
+        try:
+            CURRENT_SPAN.reset(token)
+        except ValueError:
+            # An async generator finalised from another context
+            pass
+        TELEMETRY.spans.append(current)
+        SPAN_SECONDS.observe(current.seconds, name)
+
+
+def traces(trace_id = None):
+    spans = list(TELEMETRY.spans)
+    if trace_id:
+        spans = [s for s in spans if s.trace_id == trace_id]
+    return [s.to_dict() for s in spans]
@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+
+from prompt import estimate_tokens
+from web import ChunkedResponse, HTTPError, send_error, send_json, server_port, start_server
+
+# A local stand-in for the Anthropic Messages API, for tests and load tests
+# that must not touch the network. It speaks the same JSON and SSE formats,
+# streams a deterministic reply word by word with configurable latency, and
+# reports cache reads for any system prompt it has already seen. A model
+# named 'mock-error-<status>' answers with that status instead, and
+# error_rate fails that share of requests at random (seeded) with
+# error_status, the way an overloaded API does.
+
+
+def message_text(message):
+    content = message.get('content', '')
+    if isinstance(content, str):
+        return content
+    return ''.join(block.get('text', '') for block in content if block.get('type') == 'text')
+
+
+def sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode('utf-8')
+
+
+class MockLLM:
+
+    def __init__(self, first_token_delay = 0.0, token_delay = 0.0, reply_words = 0, jitter = 0.0, error_rate = 0.0, error_status = 529, seed = 0):
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        # Extra filler words appended to every reply, to size responses
+        self.reply_words = reply_words
+        # Up to this many seconds are added at random to each first-token delay
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.ids = itertools.count(1)
+        self.seen_prefixes = set()
+        self.server = None
+
+        self.requests = 0
+        self.errors = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def reply(self, body):
+        messages = body.get('messages', [])
+        turn = sum(1 for m in messages if m.get('role') == 'user')
+        last = message_text(messages[-1]) if messages else ''
+        words = f"Mock reply {turn} to: {last}".split(' ')
+        words += ['estate'] * self.reply_words
+        return [word if i == 0 else ' ' + word for i, word in enumerate(words)]
+
+    def usage(self, body, pieces):
+        system_tokens = estimate_tokens(body.get('system', ''))
+        message_tokens = estimate_tokens(body.get('messages', []))
+        prefix = hashlib.sha256(json.dumps(body.get('system', ''), sort_keys = True).encode('utf-8')).hexdigest()
+        cached = prefix in self.seen_prefixes
+        self.seen_prefixes.add(prefix)
+        return {
+            'input_tokens': message_tokens,
+            'cache_creation_input_tokens': 0 if cached else system_tokens,
+            'cache_read_input_tokens': system_tokens if cached else 0,
+            'output_tokens': len(pieces)
+        }
+
+    def message(self, body, pieces, usage):
+        return {
+            'id': f"msg_mock_{next(self.ids)}",
+            'type': 'message',
+            'role': 'assistant',
+            'model': body.get('model', 'mock'),
+            'content': [{'type': 'text', 'text': ''.join(pieces)}] if pieces is not None else [],
+            'stop_reason': 'end_turn' if pieces is not None else None,
+            'stop_sequence': None,
+            'usage': usage
+        }
+
+    async def handle(self, request, writer):
+        if request.method != 'POST' or request.path.split('?')[0] != '/v1/messages':
+            raise HTTPError(404)
+
+        if not request.headers.get('x-api-key'):
+            await send_error(writer, 401, 'x-api-key header is required', 'authentication_error')
+            return
+
+        body = request.json()
+        model = body.get('model', '')
+        if model.startswith('mock-error-'):
+            status = int(model.rsplit('-', 1)[1])
+            await send_error(writer, status, f"Mock {status}", 'mock_error')
+            return
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.errors += 1
+            await send_error(writer, self.error_status, f"Injected {self.error_status}", 'overloaded_error')
+            return
+
+        self.requests += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            pieces = self.reply(body)
+            usage = self.usage(body, pieces)
+            first_token_delay = self.first_token_delay + (self.random.uniform(0, self.jitter) if self.jitter else 0.0)
+            if body.get('stream'):
+                await self.stream(writer, body, pieces, usage, first_token_delay)
+            else:
+                await asyncio.sleep(first_token_delay + self.token_delay * len(pieces))
+                await send_json(writer, 200, self.message(body, pieces, usage))
+        finally:
+            self.in_flight -= 1
+
+    async def stream(self, writer, body, pieces, usage, first_token_delay = 0.0):
+        response = ChunkedResponse(writer)
+        await response.start()
+
+        start_usage = dict(usage, output_tokens = 1)
+        await response.write(sse('message_start', {'type': 'message_start', 'message': self.message(body, None, start_usage)}))
+        await response.write(sse('content_block_start', {'type': 'content_block_start', 'index': 0, 'content_block': {'type': 'text', 'text': ''}}))
+
+        await asyncio.sleep(first_token_delay)
+        for piece in pieces:
+            await response.write(sse('content_block_delta', {'type': 'content_block_delta', 'index': 0, 'delta': {'type': 'text_delta', 'text': piece}}))
+            if self.token_delay:
+                await asyncio.sleep(self.token_delay)
+
+        await response.write(sse('content_block_stop', {'type': 'content_block_stop', 'index': 0}))
+        await response.write(sse('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn', 'stop_sequence': None}, 'usage': {'output_tokens': usage['output_tokens']}}))
+        await response.write(sse('message_stop', {'type': 'message_stop'}))
+        await response.end()
+
+    async def start(self, host = '127.0.0.1', port = 0):
+        self.server = await start_server(self.handle, host, port, on_connect = self.connected)
+        self.port = server_port(self.server)
+        self.base_url = f"http://{host}:{self.port}"
+        return self
+
+    def connected(self):
+        # Counted to show whether callers reuse connections
+        self.connections += 1
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    def stats(self):
+        return {
+            'requests': self.requests,
+            'connections': self.connections,
+            'peak_in_flight': self.peak_in_flight
+        }
+
+
+async def serve(args):
+    mock = await MockLLM(args.first_token_delay, args.token_delay, args.reply_words, args.jitter, args.error_rate, args.error_status, args.seed).start(args.host, args.port)
+    print(f"Mock LLM running on {mock.base_url}")
+    async with mock.server:
+        await mock.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Local mock of the Anthropic Messages API')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8090)
+    parser.add_argument('--first-token-delay', type = float, default = 0.2, help = 'Seconds before the first token')
+    parser.add_argument('--token-delay', type = float, default = 0.01, help = 'Seconds between tokens')
+    parser.add_argument('--reply-words', type = int, default = 40, help = 'Filler words added to each reply')
+    parser.add_argument('--jitter', type = float, default = 0.0, help = 'Up to this many seconds added at random to the first-token delay')
+    parser.add_argument('--error-rate', type = float, default = 0.0, help = 'Share of requests to fail, 0 to 1')
+    parser.add_argument('--error-status', type = int, default = 529, help = 'Status returned for injected failures')
+    parser.add_argument('--seed', type = int, default = 0)
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+from analysis import normalize_name
+from incremental import apply_patch
+
+# Every person named anywhere in the book — designees on accounts, spouses,
+# partners and children — indexed by normalised name. Looking a person up is
+# one hash lookup that lands directly on the references to them, so
+# recording a death (or a divorce) touches exactly the designations that name
+# them, in every household, without scanning profiles. Each event is applied
+# as a JSON patch per affected household and those households are marked
+# for re-analysis; the patches can be handed to incremental.reanalyze.
+#
+# A name alone does not identify a person: two households can each name a
+# different John Smith. A death is only propagated to references that are
+# corroborated, by a matching date of birth or by being the person the
+# reporting household names in that relationship. References that match on
+# name only are left untouched and queued in `review` for a person to check.
+
+DESIGNATION_SLOTS = ('successor_holder', 'successor_annuitant', 'beneficiary_primary', 'beneficiary_contingent')
+PERSON_FIELDS = ('spouse', 'current_partner', 'partner')
+
+
+def date_of_birth(person):
+    return person.get('date_of_birth') or person.get('dob')
+
+
+def json_pointer(path):
+    return '/' + '/'.join(str(p).replace('~', '~0').replace('/', '~1') for p in path)
+
+
+class Reference:
+
+    __slots__ = ('client_id', 'path', 'relationship', 'dob')
+
+    def __init__(self, client_id, path, relationship, dob):
+        self.client_id = client_id
+        self.path = path
+        self.relationship = relationship
+        self.dob = dob
+
+    @property
+    def is_designation(self):
+        return self.path[0] == 'accounts'
+
+    def __repr__(self):
+        return f"Reference({self.client_id!r}, {json_pointer(self.path)!r}, {self.relationship!r})"
+
+
+def person_references(client_id, profile):
+    # Yields (normalised name, Reference) for every named person in a profile
+    for i, account in enumerate(profile.get('accounts', [])):
+        for slot in DESIGNATION_SLOTS:
+            person = account.get(slot)
+            if isinstance(person, dict) and normalize_name(person.get('name')):
+                yield normalize_name(person['name']), Reference(client_id, ('accounts', i, slot), person.get('relationship'), date_of_birth(person))
+
+    for field in PERSON_FIELDS:
+        person = profile.get(field)
+        if isinstance(person, dict) and normalize_name(person.get('name')):
+            yield normalize_name(person['name']), Reference(client_id, (field,), person.get('relationship', field), date_of_birth(person))
+
+    for i, child in enumerate(profile.get('children', [])):
+        if normalize_name(child.get('name')):
+            yield normalize_name(child['name']), Reference(client_id, ('children', i), 'child', date_of_birth(child))
+
+
+class PersonIndex:
+
+    def __init__(self):
+        self.profiles = {}
+        # normalised name -> [Reference]
+        self.by_name = {}
+        # client_id -> [(normalised name, Reference)], for removal
+        self.by_client = {}
+        # Households changed by an event since the last drain
+        self.dirty = set()
+        # (name, [Reference]) that matched a death on name only
+        self.review = []
+
+    def add_household(self, client_id, profile):
+        if client_id in self.profiles:
+            self.remove_household(client_id)
+        self.profiles[client_id] = profile
+        entries = list(person_references(client_id, profile))
+        for key, ref in entries:
+            self.by_name.setdefault(key, []).append(ref)
+        self.by_client[client_id] = entries
+
+    def remove_household(self, client_id):
+        self.profiles.pop(client_id, None)
+        for key, ref in self.by_client.pop(client_id, []):
+            refs = self.by_name[key]
+            refs.remove(ref)
+            if not refs:
+                del self.by_name[key]
+
+    def lookup(self, name, dob = None):
+        # References with an unknown date of birth match any dob
+        refs = self.by_name.get(normalize_name(name), [])
+        if dob is None:
+            return list(refs)
+        return [ref for ref in refs if ref.dob is None or ref.dob == dob]
+
+    def match(self, name, dob = None, client_id = None, relationship = None):
+        # (confirmed, candidates). client_id and relationship together name
+        # the person as the reporting household knows them; their date of
+        # birth, if recorded, then corroborates references elsewhere.
+        refs = self.by_name.get(normalize_name(name), [])
+        anchored = [
+            ref for ref in refs
+            if client_id is not None and relationship is not None
+            and ref.client_id == client_id and ref.relationship == relationship
+            and (dob is None or ref.dob is None or ref.dob == dob)
+        ]
+        if dob is None:
+            dob = next((ref.dob for ref in anchored if ref.dob), None)
+
+        confirmed = list(anchored)
+        candidates = []
+        for ref in refs:
+            if ref in anchored:
+                continue
+            if dob is not None and ref.dob == dob:
+                confirmed.append(ref)
+            elif dob is None or ref.dob is None:
+                candidates.append(ref)
+        return confirmed, candidates
+
+    def apply_event(self, patches):
+        # patches: {client_id: [JSON patch ops]}
+        for client_id, patch in patches.items():
+            profile, _ = apply_patch(self.profiles[client_id], patch)
+            self.add_household(client_id, profile)
+            self.dirty.add(client_id)
+        return patches
+
+    def death_patches(self, name, dob = None, client_id = None, relationship = None):
+        # Patches for the confirmed designations; name-only matches go to review
+        confirmed, candidates = self.match(name, dob, client_id, relationship)
+        patches = {}
+        for ref in confirmed:
+            if ref.is_designation:
+                patches.setdefault(ref.client_id, []).append(
+                    {'op': 'add', 'path': json_pointer(ref.path + ('is_currently_alive',)), 'value': False}
+                )
+        candidates = [ref for ref in candidates if ref.is_designation]
+        if candidates:
+            self.review.append((name, candidates))
+        return patches
+
+    def record_death(self, name, dob = None, client_id = None, relationship = None):
+        # Every designation confirmed to name this person, in every
+        # household, now names someone who has died. Returns the patches
+        # applied per household.
+        return self.apply_event(self.death_patches(name, dob, client_id, relationship))
+
+    def divorce_patches(self, client_id, name = None):
+        # The client's designations naming their former spouse, and their
+        # marital status. Without a name, the profile's spouse is used.
+        profile = self.profiles[client_id]
+        if name is None:
+            name = (profile.get('spouse') or {}).get('name')
+        key = normalize_name(name)
+
+        patch = [
+            {'op': 'add', 'path': json_pointer(ref.path + ('is_currently_spouse',)), 'value': False}
+            for k, ref in self.by_client.get(client_id, [])
+            if k == key and ref.is_designation
+        ]
+        patch.append({'op': 'add', 'path': '/marital_status', 'value': 'divorced'})
+        return {client_id: patch}
+
+    def record_divorce(self, client_id, name = None):
+        return self.apply_event(self.divorce_patches(client_id, name))
+
+    def drain_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+
+def index_book(wrappers):
+    index = PersonIndex()
+    for i, wrapper in enumerate(wrappers):
+        index.add_household(wrapper.get('_profile_id', i), wrapper['client'])
+    return index
@@ -0,0 +1,383 @@
+import argparse
+import datetime
+import json
+import os
+import time
+from urllib.parse import quote
+
+from analysis import RULE_PACK, analyze_estate_gaps
+from benchmark import percentile
+from incremental import reanalyze
+from persons import DESIGNATION_SLOTS, index_book, json_pointer
+from stream import read_checkpoint, write_checkpoint
+
+# Re-analysis driven by an append-only log of account and life events.
+# Events are applied to the in-memory book as soon as they are read, but a
+# household is only re-analysed once its burst of events has gone quiet for
+# `window` seconds (or has been open for `max_delay`), so five edits made in
+# one sitting cost one incremental re-run. Ready households are flushed in
+# micro-batches.
+#
+# Each flushed household is written to the state directory together with the
+# offset of the last event it reflects; that per-household offset is its
+# checkpoint. The log-wide checkpoint only advances past events whose
+# households have all been flushed, and on restart an event is skipped for
+# any household whose stored offset is already past it — so a crash between
+# the two writes never applies an event twice.
+
+DEFAULT_WINDOW = 2.0
+DEFAULT_MAX_DELAY = 10.0
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_INTERVAL = 0.5
+CHECKPOINT_FILE = 'checkpoint.json'
+
+EVENT_TYPES = {}
+
+
+def event_type(name):
+    def register(fn):
+        EVENT_TYPES[name] = fn
+        return fn
+    return register
+
+
+def event_date(event):
+    return event.get('date') or datetime.date.fromtimestamp(event['at']).isoformat()
+
+
+def account_position(profile, account_id):
+    for position, account in enumerate(profile.get('accounts', [])):
+        if account.get('account_id') == account_id:
+            return position
+    raise ValueError(f"No account {account_id}")
+
+
+# Each handler turns an event into {client_id: JSON patch} against the
+# current state of the book.
+
+@event_type('designation_updated')
+def designation_updated(index, event):
+    # {client_id, account_id, slot, person} — person null clears the slot
+    if event['slot'] not in DESIGNATION_SLOTS:
+        raise ValueError(f"Unknown designation slot: {event['slot']}")
+    profile = index.profiles[event['client_id']]
+    path = ('accounts', account_position(profile, event['account_id']), event['slot'])
+    return {event['client_id']: [{'op': 'add', 'path': json_pointer(path), 'value': event.get('person')}]}
+
+
+@event_type('beneficiary_died')
+def beneficiary_died(index, event):
+    # {name, dob?, client_id?, relationship?} — reaches every household
+    # whose reference is corroborated; name-only matches go to index.review
+    return index.death_patches(event['name'], event.get('dob'), event.get('client_id'), event.get('relationship'))
+
+
+@event_type('married')
+def married(index, event):
+    # {client_id, spouse, date?}
+    spouse = dict({'relationship': 'spouse'}, **event['spouse'])
+    return {event['client_id']: [
+        {'op': 'add', 'path': '/marital_status', 'value': 'married'},
+        {'op': 'add', 'path': '/marriage_date', 'value': event_date(event)},
+        {'op': 'add', 'path': '/spouse', 'value': spouse}
+    ]}
+
+
+@event_type('divorced')
+def divorced(index, event):
+    # {client_id, name?, date?} — name defaults to the profile's spouse
+    patches = index.divorce_patches(event['client_id'], event.get('name'))
+    patches[event['client_id']].append({'op': 'add', 'path': '/divorce_finalized', 'value': event_date(event)})
+    return patches
+
+
+@event_type('child_born')
+def child_born(index, event):
+    # {client_id, child: {name, ...}, date?}
+    child = dict({'birth_date': event_date(event), 'age_months': 0, 'is_minor': True}, **event['child'])
+    if 'children' not in index.profiles[event['client_id']]:
+        return {event['client_id']: [{'op': 'add', 'path': '/children', 'value': [child]}]}
+    return {event['client_id']: [{'op': 'add', 'path': '/children/-', 'value': child}]}
+
+
+@event_type('will_updated')
+def will_updated(index, event):
+    # {client_id, date?, executor?}
+    patch = [
+        {'op': 'add', 'path': '/has_will', 'value': True},
+        {'op': 'add', 'path': '/will_last_updated', 'value': event_date(event)}
+    ]
+    if 'executor' in event:
+        patch.append({'op': 'add', 'path': '/will_executor', 'value': event['executor']})
+    return {event['client_id']: patch}
+
+
+@event_type('patch')
+def raw_patch(index, event):
+    # {client_id, patch} — any other edit, as RFC 6902 operations
+    return {event['client_id']: event['patch']}
+
+
+class EventLog:
+    # An NDJSON file standing in for a durable queue. Offsets are byte
+    # positions; an event's id is the offset just past its line.
+
+    def __init__(self, path):
+        self.path = path
+
+    def append(self, event):
+        event = dict(event)
+        event.setdefault('at', time.time())
+        if event.get('type') not in EVENT_TYPES:
+            raise ValueError(f"Unknown event type: {event.get('type')}")
+        line = (json.dumps(event, separators = (',', ':')) + '\n').encode('utf-8')
+        with open(self.path, 'ab') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+            return f.tell()
+
+    def read(self, offset = 0):
+        # Yields (event, start, end) for every complete line from offset. A
+        # line without its newline is still being written and is left for
+        # the next read.
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    return
+                start, offset = offset, offset + len(raw)
+                if raw.strip():
+                    yield json.loads(raw), start, offset
+
+
+class Burst:
+
+    __slots__ = ('start', 'end', 'events', 'first_seen', 'last_seen', 'oldest_at')
+
+    def __init__(self, start, now, at):
+        self.start = start
+        self.end = start
+        self.events = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.oldest_at = at
+
+    def ready(self, now, window, max_delay):
+        return now - self.last_seen >= window or now - self.first_seen >= max_delay
+
+
+class StateStore:
+    # One file per household: its profile, findings and the offset of the
+    # last event they reflect
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok = True)
+
+    def path(self, client_id):
+        return os.path.join(self.directory, quote(str(client_id), safe = '') + '.json')
+
+    def load(self):
+        states = {}
+        for name in os.listdir(self.directory):
+            if name.endswith('.json') and name != CHECKPOINT_FILE:
+                with open(os.path.join(self.directory, name)) as f:
+                    state = json.load(f)
+                states[state['client_id']] = state
+        return states
+
+    def save(self, client_id, profile, findings, offset, rule_pack):
+        write_checkpoint(self.path(client_id), {
+            'client_id': client_id,
+            'offset':    offset,
+            'rule_pack': rule_pack,
+            'profile':   profile,
+            'findings':  findings
+        })
+
+
+class Pipeline:
+
+    def __init__(self, wrappers, log_path, state_dir, window = DEFAULT_WINDOW, max_delay = DEFAULT_MAX_DELAY, batch_size = DEFAULT_BATCH_SIZE, as_of = None, sink = None):
+        self.log = EventLog(log_path)
+        self.store = StateStore(state_dir)
+        self.checkpoint_path = os.path.join(state_dir, CHECKPOINT_FILE)
+        self.window = window
+        self.max_delay = max_delay
+        self.batch_size = batch_size
+        self.as_of = as_of
+        # Called as sink(client_id, profile, findings) after each flush
+        self.sink = sink
+
+        self.index = index_book(wrappers)
+        # client_id -> (profile as last analysed, its findings or None,
+        # identity of the rule pack they were produced under)
+        self.analyzed = {client_id: (profile, None, None) for client_id, profile in self.index.profiles.items()}
+        # client_id -> offset of the last event reflected in stored findings
+        self.offsets = {}
+        for client_id, state in self.store.load().items():
+            self.index.add_household(client_id, state['profile'])
+            self.analyzed[client_id] = (state['profile'], state['findings'], state.get('rule_pack'))
+            self.offsets[client_id] = state['offset']
+
+        checkpoint = read_checkpoint(self.checkpoint_path)
+        if checkpoint and checkpoint.get('log') != os.path.abspath(log_path):
+            raise ValueError(f"Checkpoint {self.checkpoint_path} belongs to {checkpoint.get('log')}, not {log_path}")
+        self.offset = checkpoint['offset'] if checkpoint else 0
+
+        self.pending = {}
+        self.rejected = []
+        self.latencies = []
+
+    def ingest(self, now = None):
+        now = time.monotonic() if now is None else now
+        count = 0
+        for event, start, end in self.log.read(self.offset):
+            self.offset = end
+            count += 1
+            try:
+                patches = EVENT_TYPES[event['type']](self.index, event)
+                # Households already flushed past this event saw it before a restart
+                patches = {client_id: patch for client_id, patch in patches.items() if self.offsets.get(client_id, -1) < end}
+                self.index.apply_event(patches)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                self.rejected.append((end, event, f"{type(e).__name__}: {e}"))
+                continue
+
+            for client_id in patches:
+                burst = self.pending.get(client_id)
+                if burst is None:
+                    burst = self.pending[client_id] = Burst(start, now, event.get('at'))
+                burst.end = end
+                burst.events += 1
+                burst.last_seen = now
+
+        self.index.drain_dirty()
+        return count
+
+    def ready(self, now = None, force = False):
+        now = time.monotonic() if now is None else now
+        ready = [
+            client_id for client_id, burst in self.pending.items()
+            if force or burst.ready(now, self.window, self.max_delay)
+        ]
+        ready.sort(key = lambda client_id: self.pending[client_id].first_seen)
+        return ready[:self.batch_size]
+
+    def flush(self, client_ids):
+        pack = RULE_PACK.reload_if_changed()
+        for client_id in client_ids:
+            burst = self.pending.pop(client_id)
+            profile = self.index.profiles[client_id]
+            previous_profile, previous_findings, previous_pack = self.analyzed[client_id]
+            # Findings from another rule pack cannot be patched incrementally
+            if previous_findings is None or previous_pack != pack.identity:
+                findings = analyze_estate_gaps(profile, as_of = self.as_of)
+            else:
+                findings = reanalyze(previous_profile, previous_findings, new_profile = profile, as_of = self.as_of)
+
+            self.store.save(client_id, profile, findings, burst.end, pack.identity)
+            self.analyzed[client_id] = (profile, findings, pack.identity)
+            self.offsets[client_id] = burst.end
+            if burst.oldest_at is not None:
+                self.latencies.append(time.time() - burst.oldest_at)
+            if self.sink:
+                self.sink(client_id, profile, findings)
+
+        self.write_checkpoint()
+        return client_ids
+
+    def write_checkpoint(self):
+        # Everything before the oldest unflushed burst has been fully applied
+        committed = min([burst.start for burst in self.pending.values()], default = self.offset)
+        write_checkpoint(self.checkpoint_path, {'log': os.path.abspath(self.log.path), 'offset': committed})
+
+    def poll(self, now = None, force = False):
+        # One step: read new events, then flush one micro-batch of quiet
+        # households. Returns the client ids flushed.
+        self.ingest(now)
+        ready = self.ready(now, force)
+        return self.flush(ready) if ready else []
+
+    def drain(self):
+        # Flushes everything pending, regardless of windows
+        flushed = []
+        while True:
+            batch = self.poll(force = True)
+            if not batch:
+                return flushed
+            flushed += batch
+
+    def findings(self, client_id):
+        return self.analyzed[client_id][1]
+
+
+def load_wrappers(path):
+    with open(path) as f:
+        return json.load(f)['clients']
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Re-analyse households as account and life events arrive')
+    commands = parser.add_subparsers(dest = 'command', required = True)
+
+    emit = commands.add_parser('emit', help = 'Append an event to the log')
+    emit.add_argument('log')
+    emit.add_argument('event', help = f"JSON object; type is one of {', '.join(EVENT_TYPES)}")
+
+    run = commands.add_parser('run', help = 'Consume the log and keep findings current')
+    run.add_argument('log')
+    run.add_argument('--book', default = os.path.join(os.path.dirname(__file__), 'config', 'clients.json'))
+    run.add_argument('--state', default = 'pipeline_state', help = 'Directory for per-household findings and checkpoints')
+    run.add_argument('--window', type = float, default = DEFAULT_WINDOW, help = 'Seconds a household must be quiet before re-analysis')
+    run.add_argument('--max-delay', type = float, default = DEFAULT_MAX_DELAY)
+    run.add_argument('--batch-size', type = int, default = DEFAULT_BATCH_SIZE)
+    run.add_argument('--interval', type = float, default = DEFAULT_INTERVAL, help = 'Seconds between polls of the log')
+    run.add_argument('--once', action = 'store_true', help = 'Process what is in the log and exit')
+    run.add_argument('--as-of', default = None, help = 'Evaluate date-based rules as of YYYY-MM-DD (default: today)')
+    args = parser.parse_args()
+
+    if args.command == 'emit':
+        try:
+            offset = EventLog(args.log).append(json.loads(args.event))
+        except ValueError as e:
+            parser.error(str(e))
+        print(f"  appended at offset {offset}")
+        return
+
+    pipeline = Pipeline(load_wrappers(args.book), args.log, args.state, args.window, args.max_delay, args.batch_size, args.as_of)
+
+    def report(flushed, elapsed):
+        recent = pipeline.latencies[-len(flushed):]
+        print(f"  {len(flushed)} households re-analysed in {elapsed * 1000:.1f}ms — event to findings p50 {percentile(recent, 50):.2f}s, max {max(recent, default = 0.0):.2f}s")
+
+    if args.once:
+        start = time.perf_counter()
+        flushed = pipeline.drain()
+        if flushed:
+            report(flushed, time.perf_counter() - start)
+    else:
+        print(f"  following {args.log} (window {args.window}s) — Ctrl+C to stop")
+        try:
+            while True:
+                start = time.perf_counter()
+                flushed = pipeline.poll()
+                if flushed:
+                    report(flushed, time.perf_counter() - start)
+                else:
+                    time.sleep(args.interval)
+        except KeyboardInterrupt:
+            pass
+
+    for offset, event, reason in pipeline.rejected:
+        print(f"  rejected event at {offset} ({event.get('type')}): {reason}")
+    for name, refs in pipeline.index.review:
+        households = ', '.join(sorted({str(ref.client_id) for ref in refs}))
+        print(f"  death of {name} not applied to name-only matches in {households} — review")
+
+
+if __name__ == "__main__":
+    main()
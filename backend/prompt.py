@@ -0,0 +1,133 @@
+import json
+from functools import lru_cache
+
+from cache import canonical_json
+
+# The system prompt is sent as two blocks so the provider can cache it:
+# a prefix that is byte-identical for every client and every turn, then a
+# per-client block that only changes when the profile or the findings do.
+# Both carry a cache breakpoint; the conversation gets a third on its last
+# message so each turn re-reads the previous turns from cache. Prompts
+# shorter than the model's minimum cacheable length are simply not cached.
+
+CACHE_CONTROL = {'type': 'ephemeral'}
+
+STATIC_PROMPT = """
+You are an estate planning assistant for Vesta.
+You help clients understand what happens to their accounts when they
+die and identify gaps in their current setup.
+
+You have access to this client's actual account data and a list of
+issues our analysis engine has already found. Both follow these
+instructions, after CURRENT CLIENT PROFILE and FINDINGS FROM ANALYSIS ENGINE.
+
+YOUR RULES — follow these absolutely, no exceptions:
+
+1. NEVER execute or confirm any account changes. You are read-only.
+
+2. NEVER give legal advice. Always frame sensitive points as
+   "you should confirm this with an estate lawyer."
+
+3. HARD STOP RULE — if the client asks you to make any change,
+   update any designation, or take any action on their account,
+   respond with exactly this structure:
+   "This is where I stop. [explain why this decision must be theirs]
+   Here is what you need to do yourself: [specific steps]"
+
+4. Explain everything as if the client has no financial background.
+   Never use jargon without immediately explaining it in plain English.
+
+5. Be warm and human — this topic is emotionally heavy. The client
+   may be thinking about their own death or a recent loss. Lead with
+   empathy before facts.
+
+6. Always prioritize CRITICAL findings first in your responses.
+   Do not bury the most urgent issue at the bottom.
+
+7. Never make up information. If you are uncertain, say so and
+   recommend they speak with a Vesta advisor.
+
+8. NEVER mention the names of any person other than the client themselves.
+   Always refer to people by their relationship only — "your spouse",
+   "your ex-spouse", "your child", "your partner", "your brother".
+   Never say "Robert" or "Tom" or any other person's name.
+
+When the client first messages you, briefly acknowledge what you can
+see in their situation and ask what they would like to understand first.
+Do not dump all findings at once — let the conversation guide the depth.
+"""
+
+
+def estimate_tokens(value):
+    # Roughly four characters per token — close enough for budgeting and
+    # load figures, and needs no tokenizer
+    text = value if isinstance(value, str) else json.dumps(value, separators = (',', ':'))
+    return max(1, len(text) // 4)
+
+
+def findings_text(findings):
+    text = ""
+    for f in findings:
+        text += f"""
+- [{f['severity']}] Rule {f['rule']}: {f['issue']}
+  Consequence: {f['consequence']}
+  Action: {f['action']}
+"""
+    return text
+
+
+@lru_cache(maxsize = 256)
+def client_block(client_json, findings_json):
+    # Keyed on the canonical serialisations, so an unchanged profile and
+    # findings list reuse the exact same string (and the same cache entry
+    # on the provider's side)
+    return f"""
+CURRENT CLIENT PROFILE:
+{client_json}
+
+FINDINGS FROM ANALYSIS ENGINE:
+{findings_text(json.loads(findings_json))}"""
+
+
+def build_system_prompt(client, findings):
+    return [
+        {'type': 'text', 'text': STATIC_PROMPT, 'cache_control': CACHE_CONTROL},
+        {'type': 'text', 'text': client_block(canonical_json(client), canonical_json(findings)), 'cache_control': CACHE_CONTROL}
+    ]
+
+
+def with_cache_breakpoint(messages):
+    # Marks the newest message so the next turn reads the whole history
+    # from cache; earlier messages are left as plain strings
+    if not messages:
+        return messages
+    last = messages[-1]
+    content = last['content']
+    if isinstance(content, str):
+        content = [{'type': 'text', 'text': content}]
+    content = content[:-1] + [dict(content[-1], cache_control = CACHE_CONTROL)]
+    return messages[:-1] + [dict(last, content = content)]
+
+
+def turn_usage(usage):
+    # Cached versus uncached input for one response
+    cache_read = getattr(usage, 'cache_read_input_tokens', 0) or 0
+    cache_write = getattr(usage, 'cache_creation_input_tokens', 0) or 0
+    uncached = getattr(usage, 'input_tokens', 0) or 0
+    total = cache_read + cache_write + uncached
+    return {
+        'input_tokens': total,
+        'uncached_input_tokens': uncached,
+        'cache_write_tokens': cache_write,
+        'cache_read_tokens': cache_read,
+        'output_tokens': getattr(usage, 'output_tokens', 0) or 0,
+        'cached_ratio': cache_read / total if total else 0.0
+    }
+
+
+def format_usage(turn):
+    return (
+        f"[tokens] input {turn['input_tokens']:,} "
+        f"(cache read {turn['cache_read_tokens']:,}, cache write {turn['cache_write_tokens']:,}, uncached {turn['uncached_input_tokens']:,}) "
+        f"· output {turn['output_tokens']:,} · {turn['cached_ratio']:.0%} cached"
+    )
@@ -0,0 +1,123 @@
+import hashlib
+import re
+import string
+import time
+from collections import OrderedDict
+
+from hardstop import HARD_STOP_MARKER, is_hard_stop
+
+# Answers to recurring first-turn questions, shared between clients whose
+# findings look the same. The key is the normalised question plus a
+# fingerprint of the findings built only from rule IDs, severities, account
+# types, issue and consequence text — which name relationships, never
+# people. The consequence text carries each finding's dollar figures, so
+# clients only share answers when their tax estimates match too. Answers
+# that quote anything specific to one client (a person's name, an account
+# balance) are never stored, and hard-stop intents are never cached.
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 5000
+
+# Openers that do not change what is being asked
+FILLER = re.compile(r"^((hi|hey|hello|ok|okay|so|um|well|please|thanks)\b[\s,]*)+")
+PUNCTUATION = str.maketrans('', '', string.punctuation.replace("'", ''))
+
+
+def normalize_question(text):
+    text = ' '.join(text.casefold().translate(PUNCTUATION).split())
+    return FILLER.sub('', text).strip()
+
+
+def findings_fingerprint(findings):
+    items = sorted((f['rule'], f['severity'], f['account_type'], f['issue'], f['consequence']) for f in findings)
+    return hashlib.sha256(repr(items).encode('utf-8')).hexdigest()
+
+
+def client_specifics(client):
+    # People's names and balances that must never appear in a shared answer
+    names = set()
+
+    def collect(obj):
+        if isinstance(obj, dict):
+            if isinstance(obj.get('name'), str):
+                names.add(obj['name'])
+            for value in obj.values():
+                collect(value)
+        elif isinstance(obj, list):
+            for value in obj:
+                collect(value)
+
+    collect(client)
+    parts = {part for name in names for part in name.split() if len(part) > 2}
+    balances = {f"{a['balance']:,}" for a in client.get('accounts', []) if isinstance(a.get('balance'), int)}
+    return parts | balances
+
+
+class ResponseCache:
+
+    def __init__(self, ttl = DEFAULT_TTL_SECONDS, max_entries = DEFAULT_MAX_ENTRIES, clock = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+        self.rejected = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def key(self, question, fingerprint):
+        return f"{fingerprint}|{normalize_question(question)}"
+
+    def get(self, question, fingerprint):
+        if is_hard_stop(question):
+            self.bypasses += 1
+            return None
+
+        key = self.key(question, fingerprint)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0] <= self.clock():
+            del self.entries[key]
+            self.expirations += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, question, fingerprint, answer, client = None):
+        if is_hard_stop(question) or HARD_STOP_MARKER in answer:
+            return False
+        if client is not None and any(specific in answer for specific in client_specifics(client)):
+            self.rejected += 1
+            return False
+
+        key = self.key(question, fingerprint)
+        self.entries[key] = (self.clock() + self.ttl, answer)
+        self.entries.move_to_end(key)
+        self.stores += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last = False)
+            self.evictions += 1
+        return True
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypasses': self.bypasses,
+            'stores': self.stores,
+            'rejected': self.rejected,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import json
+import os
+import threading
+
+from tax import ALIASES, PROVINCE_NAMES, province_name
+
+# The numbers the rules compare against live in a versioned rule pack
+# (config/rule_pack.json) rather than in the rules: pack-wide defaults plus
+# per-province overrides, and the order findings are sorted by severity.
+# A pack is validated and compiled once at load into one Thresholds record
+# per province, so a rule's lookup is a dict hit on the client's province.
+#
+# The active pack can be replaced while a service is running. A new pack is
+# read, validated and compiled in full before a single reference swap makes
+# it current; an analysis picks up the pack once when it starts and keeps
+# it to the end, so a swap never changes thresholds halfway through a
+# client. A pack that fails validation is never swapped in.
+#
+# Anything cached from a pack's findings is keyed on its identity — the
+# version string plus a hash of the compiled thresholds and severity order
+# — so an edit that changes the numbers but not the version still
+# invalidates it.
+
+DEFAULT_PATH = os.path.join(os.path.dirname(__file__), 'config', 'rule_pack.json')
+
+# threshold -> (accepted types, lowest allowed value)
+THRESHOLDS = {
+    'civil_law':                  ((bool,), None),
+    'rrif_liquidity_min_balance': ((int, float), 0),
+    'will_outdated_years':        ((int,), 1),
+    'cohabitation_months':        ((int,), 0),
+    'newborn_months':             ((int,), 0)
+}
+
+
+class RulePackError(ValueError):
+    pass
+
+
+class Thresholds:
+
+    __slots__ = tuple(THRESHOLDS)
+
+    def __init__(self, values):
+        for key in THRESHOLDS:
+            setattr(self, key, values[key])
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in THRESHOLDS}
+
+
+def check_thresholds(values, where, complete):
+    unknown = set(values) - set(THRESHOLDS)
+    if unknown:
+        raise RulePackError(f"{where}: unknown thresholds {', '.join(sorted(unknown))}")
+    if complete:
+        missing = set(THRESHOLDS) - set(values)
+        if missing:
+            raise RulePackError(f"{where}: missing thresholds {', '.join(sorted(missing))}")
+
+    for key, value in values.items():
+        types, minimum = THRESHOLDS[key]
+        # bool is an int subclass; only civil_law takes one
+        if not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            raise RulePackError(f"{where}: {key} must be {' or '.join(t.__name__ for t in types)}, not {value!r}")
+        if minimum is not None and value < minimum:
+            raise RulePackError(f"{where}: {key} must be at least {minimum}, not {value!r}")
+
+
+class RulePack:
+
+    def __init__(self, document, severities = ()):
+        # severities: every severity the finding templates use; each must
+        # have a place in the pack's severity_order
+        if not isinstance(document, dict):
+            raise RulePackError("Rule pack must be a JSON object")
+
+        version = document.get('version')
+        if not isinstance(version, str) or not version.strip():
+            raise RulePackError("Rule pack needs a non-empty version string")
+        self.version = version
+
+        order = document.get('severity_order')
+        if not isinstance(order, list) or len(set(order)) != len(order or ()):
+            raise RulePackError("severity_order must be a list of distinct severities")
+        missing = set(severities) - set(order)
+        if missing:
+            raise RulePackError(f"severity_order is missing {', '.join(sorted(missing))}")
+        self.severity_order = {severity: rank for rank, severity in enumerate(order)}
+
+        defaults = document.get('defaults', {})
+        check_thresholds(defaults, 'defaults', complete = True)
+
+        overrides = {}
+        for name, values in document.get('provinces', {}).items():
+            canonical = ALIASES.get(name.strip().lower())
+            if canonical is None:
+                raise RulePackError(f"provinces: unknown province {name!r}")
+            if canonical in overrides:
+                raise RulePackError(f"provinces: {canonical} is listed twice")
+            check_thresholds(values, f"provinces.{name}", complete = False)
+            overrides[canonical] = values
+
+        self.provinces = {name: Thresholds(dict(defaults, **overrides.get(name, {}))) for name in PROVINCE_NAMES}
+        # Column per threshold in province-code order, for the vectorized engine
+        self.columns = {key: [getattr(self.provinces[name], key) for name in PROVINCE_NAMES] for key in THRESHOLDS}
+
+        compiled = json.dumps({'severity_order': order, 'columns': self.columns}, sort_keys = True, separators = (',', ':'))
+        self.identity = f"{version}+{hashlib.sha256(compiled.encode('utf-8')).hexdigest()[:12]}"
+
+    def for_province(self, province):
+        return self.provinces[province_name(province)]
+
+
+def load_pack(path, severities = ()):
+    try:
+        with open(path) as f:
+            document = json.load(f)
+    except json.JSONDecodeError as e:
+        raise RulePackError(f"{path}: {e}") from e
+    return RulePack(document, severities)
+
+
+class RulePackHolder:
+    # Holds the current pack and swaps in a new one when the file changes
+
+    def __init__(self, path = DEFAULT_PATH, severities = ()):
+        self.path = path
+        self.severities = frozenset(severities)
+        self.lock = threading.Lock()
+        self.mtime = os.stat(path).st_mtime_ns
+        self.current = load_pack(path, self.severities)
+        # Why the last reload was refused, if it was
+        self.error = None
+
+    def reload(self, path = None):
+        # Raises RulePackError and keeps the current pack if the new one is invalid
+        with self.lock:
+            path = path or self.path
+            mtime = os.stat(path).st_mtime_ns
+            pack = load_pack(path, self.severities)
+            self.path, self.mtime, self.current, self.error = path, mtime, pack, None
+            return pack
+
+    def reload_if_changed(self):
+        # For running services: a broken edit is reported and ignored
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+            if mtime != self.mtime:
+                # A broken file is only read once, not on every call
+                self.mtime = mtime
+                self.reload()
+        except (OSError, RulePackError) as e:
+            self.error = str(e)
+        return self.current
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Validate a rule pack and show the thresholds it compiles to')
+    parser.add_argument('path', nargs = '?', default = DEFAULT_PATH)
+    args = parser.parse_args()
+
+    from analysis import FINDING_TEMPLATES
+    try:
+        pack = load_pack(args.path, {t['severity'] for t in FINDING_TEMPLATES.values()})
+    except RulePackError as e:
+        parser.exit(1, f"  invalid rule pack: {e}\n")
+
+    print(f"  rule pack {pack.version} ({pack.identity})")
+    for name, thresholds in pack.provinces.items():
+        values = '  '.join(f"{key}={value}" for key, value in thresholds.to_dict().items())
+        print(f"  {name:<26} {values}")
+
+
+if __name__ == "__main__":
+    main()
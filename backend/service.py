@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+import traceback
+import uuid
+
+import anthropic
+import httpx
+
+from analysis import RULE_PACK, analyze_estate_gaps
+from hardstop import classify, hard_stop_response
+from memory import ConversationMemory
+from metrics import TELEMETRY, counter, enable, histogram, span
+from prompt import build_system_prompt, turn_usage, with_cache_breakpoint
+from response_cache import ResponseCache, findings_fingerprint
+from web import ChunkedResponse, HTTPError, handle_metrics, send_json, send_response, server_port, start_server
+
+# Multi-session chat over HTTP. Every session keeps its own client profile,
+# findings, system prompt and bounded conversation memory; all of them share one async API
+# client whose keep-alive connection pool is reused across turns. Replies
+# are streamed back as server-sent events while the model generates them.
+
+MODEL = 'claude-haiku-4-5'
+MAX_TOKENS = 1024
+MAX_CONNECTIONS = 100
+SESSION_TTL_SECONDS = 30 * 60
+MAX_SESSIONS = 10000
+
+CONFIG_DIR = os.path.join(os.path.dirname(__file__), 'config')
+API_KEY_PATH = os.path.join(CONFIG_DIR, 'api.txt')
+CLIENTS_PATH = os.path.join(CONFIG_DIR, 'clients.json')
+
+CHAT_TURNS = counter('estate_chat_turns_total', 'Chat turns by how they were answered', ['outcome'])
+LLM_SECONDS = histogram('estate_llm_seconds', 'messages.create latency, request to final message', ['model'])
+LLM_FIRST_TOKEN_SECONDS = histogram('estate_llm_first_token_seconds', 'Time to the first streamed token', ['model'])
+LLM_TOKENS = counter('estate_llm_tokens_total', 'Model tokens by kind', ['model', 'kind'])
+
+
+def load_api_key(path = API_KEY_PATH):
+    key = os.environ.get('ANTHROPIC_API_KEY')
+    if key:
+        return key.strip()
+    with open(path) as f:
+        return f.read().strip()
+
+
+def make_llm(api_key, base_url = None, max_connections = MAX_CONNECTIONS):
+    # One of these per process — its httpx pool keeps upstream connections
+    # open between turns instead of paying a TLS handshake per message
+    limits = httpx.Limits(max_connections = max_connections, max_keepalive_connections = max_connections)
+    return anthropic.AsyncAnthropic(
+        api_key = api_key,
+        base_url = base_url,
+        http_client = anthropic.DefaultAsyncHttpxClient(limits = limits)
+    )
+
+
+def record_llm_call(model, seconds, first_token, usage):
+    LLM_SECONDS.observe(seconds, model)
+    if first_token is not None:
+        LLM_FIRST_TOKEN_SECONDS.observe(first_token, model)
+    for kind in ('uncached_input', 'cache_read', 'cache_write', 'output'):
+        LLM_TOKENS.add(usage[f'{kind}_tokens'], model, kind)
+
+
+class Session:
+
+    def __init__(self, session_id, client, findings, trace = None):
+        self.id = session_id
+        self.client = client
+        self.findings = findings
+        # The span the session was opened under; each turn is traced as its child
+        self.trace = trace
+        with span('prompt.build', parent = trace):
+            self.system_prompt = build_system_prompt(client, findings)
+        self.memory = ConversationMemory(findings)
+        self.fingerprint = findings_fingerprint(findings)
+        self.usage = []
+        # One turn at a time per session; other sessions are unaffected
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+    async def reply(self, llm, text, model = MODEL, max_tokens = MAX_TOKENS, cache = None):
+        # Yields the assistant's text as it streams in. The turn is only
+        # added to memory once the reply has fully arrived. Requests to make
+        # a change get the templated hard stop without calling the model,
+        # and opening questions may be answered from the shared response cache.
+        async with self.lock:
+            self.last_used = time.monotonic()
+            first_turn = self.memory.total_turns == 0
+
+            with span('chat.turn', parent = self.trace) as turn:
+                intent = classify(text)
+                if intent.hard_stop:
+                    answer = hard_stop_response(intent, self.client)
+                    yield answer
+                    memory = self.memory.add_turn(text, answer)
+                    self.usage.append(dict(turn_usage(None), cached_response = False, hard_stop = True, memory = memory))
+                    if turn:
+                        CHAT_TURNS.inc('hard_stop')
+                    return
+
+                cached = cache.get(text, self.fingerprint) if cache and first_turn else None
+                if cached is not None:
+                    yield cached
+                    memory = self.memory.add_turn(text, cached)
+                    self.usage.append(dict(turn_usage(None), cached_response = True, hard_stop = False, memory = memory))
+                    if turn:
+                        CHAT_TURNS.inc('cached')
+                    return
+
+                messages = with_cache_breakpoint(self.memory.messages(text))
+                pieces = []
+
+                with span('llm.call', model = model) as call:
+                    start = time.perf_counter()
+                    first_token = None
+                    async with llm.messages.stream(model = model, max_tokens = max_tokens, system = self.system_prompt, messages = messages) as stream:
+                        async for delta in stream.text_stream:
+                            if first_token is None:
+                                first_token = time.perf_counter() - start
+                            pieces.append(delta)
+                            yield delta
+                        final = await stream.get_final_message()
+                    seconds = time.perf_counter() - start
+
+                answer = ''.join(pieces)
+                if cache and first_turn:
+                    cache.put(text, self.fingerprint, answer, self.client)
+                memory = self.memory.add_turn(text, answer)
+                usage = turn_usage(final.usage)
+                self.usage.append(dict(usage, cached_response = False, hard_stop = False, memory = memory))
+                self.last_used = time.monotonic()
+                if call:
+                    call.attributes['first_token_seconds'] = first_token
+                    record_llm_call(model, seconds, first_token, usage)
+                    CHAT_TURNS.inc('model')
+
+
+class ChatService:
+
+    def __init__(self, llm, book = None, model = MODEL, session_ttl = SESSION_TTL_SECONDS, max_sessions = MAX_SESSIONS, response_cache = None):
+        self.llm = llm
+        self.response_cache = response_cache
+        # clients.json wrappers that sessions can be opened against by index
+        self.book = book or []
+        self.model = model
+        self.session_ttl = session_ttl
+        self.max_sessions = max_sessions
+        self.sessions = {}
+
+    def expire_sessions(self):
+        cutoff = time.monotonic() - self.session_ttl
+        for session_id in [s.id for s in self.sessions.values() if s.last_used < cutoff and not s.lock.locked()]:
+            del self.sessions[session_id]
+
+    def create_session(self, client):
+        self.expire_sessions()
+        if len(self.sessions) >= self.max_sessions:
+            raise HTTPError(503, 'Too many open sessions')
+        # A new session sees rule pack edits; open sessions keep their findings
+        RULE_PACK.reload_if_changed()
+        with span('session.open') as opened:
+            session = Session(uuid.uuid4().hex, client, analyze_estate_gaps(client), opened)
+        self.sessions[session.id] = session
+        return session
+
+    def get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HTTPError(404, f"No session {session_id}")
+        return session
+
+    def client_from_request(self, body):
+        if 'profile' in body:
+            return body['profile']
+        index = body.get('client_index', 0)
+        if not isinstance(index, int) or not 0 <= index < len(self.book):
+            raise HTTPError(400, f"client_index must be between 0 and {len(self.book) - 1}")
+        return self.book[index]['client']
+
+    async def handle(self, request, writer):
+        parts = [p for p in request.path.split('?')[0].split('/') if p]
+
+        if await handle_metrics(request, writer):
+            return
+
+        if parts == ['health'] and request.method == 'GET':
+            health = {'status': 'ok', 'sessions': len(self.sessions)}
+            if self.response_cache:
+                health['response_cache'] = self.response_cache.stats()
+            await send_json(writer, 200, health)
+
+        elif parts == ['sessions'] and request.method == 'POST':
+            session = self.create_session(self.client_from_request(request.json()))
+            await send_json(writer, 201, {'session_id': session.id, 'name': session.client.get('name'), 'findings': session.findings})
+
+        elif len(parts) == 2 and parts[0] == 'sessions' and request.method == 'GET':
+            session = self.get_session(parts[1])
+            await send_json(writer, 200, {'session_id': session.id, 'history': session.memory.messages(), 'usage': session.usage})
+
+        elif len(parts) == 2 and parts[0] == 'sessions' and request.method == 'DELETE':
+            self.sessions.pop(parts[1], None)
+            await send_response(writer, 204)
+
+        elif len(parts) == 3 and parts[0] == 'sessions' and parts[2] == 'messages' and request.method == 'POST':
+            session = self.get_session(parts[1])
+            text = request.json().get('content', '').strip()
+            if not text:
+                raise HTTPError(400, 'content is required')
+            await self.stream_reply(session, text, writer)
+
+        else:
+            raise HTTPError(404)
+
+    async def stream_reply(self, session, text, writer):
+        response = ChunkedResponse(writer)
+        await response.start()
+        try:
+            async for delta in session.reply(self.llm, text, self.model, cache = self.response_cache):
+                await response.event('delta', {'text': delta})
+            await response.event('done', {'usage': session.usage[-1]})
+        except anthropic.APIStatusError as e:
+            if TELEMETRY.enabled:
+                CHAT_TURNS.inc('error')
+            await response.event('error', {'status': e.status_code, 'message': e.message})
+        except anthropic.APIConnectionError as e:
+            if TELEMETRY.enabled:
+                CHAT_TURNS.inc('error')
+            await response.event('error', {'status': 502, 'message': str(e)})
+        except ConnectionError:
+            # The client has gone; there is no one to tell
+            raise
+        except Exception:
+            # The 200 and the stream are already out, so a failure is an
+            # event in it; the details stay in the server's log
+            traceback.print_exc()
+            if TELEMETRY.enabled:
+                CHAT_TURNS.inc('error')
+            await response.event('error', {'status': 500, 'message': 'Internal error'})
+        await response.end()
+
+
+def load_book(path = CLIENTS_PATH):
+    with open(path) as f:
+        return json.load(f)['clients']
+
+
+async def serve(args):
+    if args.metrics:
+        enable()
+    api_key = load_api_key() if not args.base_url else os.environ.get('ANTHROPIC_API_KEY', 'mock')
+    cache = None if args.no_response_cache else ResponseCache()
+    service = ChatService(make_llm(api_key, args.base_url, args.max_connections), load_book(), args.model, response_cache = cache)
+    server = await start_server(service.handle, args.host, args.port)
+    print(f"Chat service running on http://{args.host}:{server_port(server)}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Multi-session estate planning chat service')
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8080)
+    parser.add_argument('--base-url', default = None, help = 'API base URL, e.g. a local mock_llm.py')
+    parser.add_argument('--model', default = MODEL)
+    parser.add_argument('--max-connections', type = int, default = MAX_CONNECTIONS)
+    parser.add_argument('--no-response-cache', action = 'store_true', help = 'Send every question to the model')
+    parser.add_argument('--metrics', action = 'store_true', help = 'Record metrics and traces, served at /metrics and /traces')
+    asyncio.run(serve(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import gzip
+import json
+import os
+import time
+from collections import deque
+
+from analysis import compact_templates, to_date
+from bulk import DEFAULT_CHUNK_SIZE, iter_shards, print_shard_stats
+
+
+def open_input(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def read_checkpoint(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_checkpoint(path, checkpoint):
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def iter_records(f, offset = 0, line_number = 0):
+    # Yields (wrapper, offset_after_line, line_number) for each non-blank line.
+    # A line is either a bare client profile or a clients.json style wrapper.
+    for raw in f:
+        offset += len(raw)
+        line_number += 1
+        raw = raw.strip()
+        if not raw:
+            continue
+        record = json.loads(raw)
+        if 'client' not in record:
+            record = {'client': record}
+        yield record, offset, line_number
+
+
+def write_lines(out, lines, gzipped):
+    payload = ''.join(lines).encode('utf-8')
+    if gzipped:
+        # Each flush is its own gzip member — concatenated members are a valid
+        # gzip stream, and the raw offset after a member is a safe resume point
+        with gzip.GzipFile(fileobj = out, mode = 'wb') as member:
+            member.write(payload)
+    else:
+        out.write(payload)
+    out.flush()
+    os.fsync(out.fileno())
+
+
+def stream_book(input_path, output_path, checkpoint_path = None, workers = None, chunk_size = DEFAULT_CHUNK_SIZE, engine = 'scalar', cache_dir = None, as_of = None, compact = False):
+    checkpoint = read_checkpoint(checkpoint_path)
+    if checkpoint and checkpoint.get('input') != os.path.abspath(input_path):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('input')}, not {input_path}")
+
+    # A resumed run keeps the date the first one started with
+    if checkpoint and checkpoint.get('as_of'):
+        if as_of is not None and to_date(as_of).isoformat() != checkpoint['as_of']:
+            raise ValueError(f"Checkpoint {checkpoint_path} was started as of {checkpoint['as_of']}, not {to_date(as_of).isoformat()}")
+        as_of = checkpoint['as_of']
+    as_of = to_date(as_of)
+
+    input_offset = checkpoint['input_offset'] if checkpoint else 0
+    output_offset = checkpoint['output_offset'] if checkpoint else 0
+    lines_done = checkpoint['lines'] if checkpoint else 0
+
+    gzipped = output_path.endswith('.gz')
+    pending = deque()
+    shard_stats = []
+
+    with open_input(input_path) as f_in, open(output_path, 'ab') as out:
+        # Anything past the last checkpoint was written by the crashed run
+        out.truncate(output_offset)
+        out.seek(output_offset)
+        f_in.seek(input_offset)
+
+        if compact and output_offset == 0:
+            # Compact rows reference templates written once at the top
+            write_lines(out, [json.dumps({'format': 'compact-v1', 'templates': compact_templates()}, separators = (',', ':')) + '\n'], gzipped)
+
+        def profiles():
+            for record, offset, line_number in iter_records(f_in, input_offset, lines_done):
+                pending.append((record, offset, line_number))
+                yield record['client']
+
+        for results, stats in iter_shards(profiles(), workers, chunk_size, engine, cache_dir, as_of, compact):
+            lines = []
+            for findings in results:
+                record, offset, line_number = pending.popleft()
+                if compact:
+                    findings = [f.to_compact() for f in findings]
+                lines.append(json.dumps({
+                    'line':      line_number,
+                    'client_id': record.get('_profile_id', line_number),
+                    'name':      record['client'].get('name'),
+                    'scenario':  record.get('_scenario'),
+                    'findings':  findings
+                }, separators = (',', ':')) + '\n')
+
+            write_lines(out, lines, gzipped)
+            shard_stats.append(stats)
+
+            if checkpoint_path:
+                write_checkpoint(checkpoint_path, {
+                    'input':         os.path.abspath(input_path),
+                    'as_of':         as_of.isoformat(),
+                    'lines':         line_number,
+                    'input_offset':  offset,
+                    'output_offset': out.tell()
+                })
+
+    return shard_stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Stream NDJSON client profiles through the analysis engine')
+    parser.add_argument('input', help = 'NDJSON (or .ndjson.gz) file, one client profile per line')
+    parser.add_argument('output', help = 'NDJSON (or .ndjson.gz) findings file, one client per line')
+    parser.add_argument('--checkpoint', default = None, help = 'Offsets file — rerun with the same path to resume')
+    parser.add_argument('--workers', type = int, default = None)
+    parser.add_argument('--chunk-size', type = int, default = DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--engine', choices = ['scalar', 'vectorized'], default = 'scalar')
+    parser.add_argument('--cache-dir', default = None, help = 'Reuse findings for unchanged profiles across runs')
+    parser.add_argument('--as-of', default = None, help = 'Evaluate date-based rules as of YYYY-MM-DD (default: today)')
+    parser.add_argument('--compact', action = 'store_true', help = 'Write templates once and findings by reference')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    shard_stats = stream_book(args.input, args.output, args.checkpoint, args.workers, args.chunk_size, args.engine, args.cache_dir, args.as_of, args.compact)
+    print_shard_stats(shard_stats, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
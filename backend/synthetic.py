@@ -0,0 +1,298 @@
+import argparse
+import copy
+import gzip
+import json
+import os
+import random
+import re
+from datetime import date, timedelta
+
+from analysis import parse_date
+
+CLIENTS_PATH = os.path.join(os.path.dirname(__file__), 'config', 'clients.json')
+
+# The hand-written profiles describe the world as of early 2026 (Noah
+# Okonkwo is 7 months old), so generated books are anchored to the same day
+REFERENCE_DATE = date(2026, 2, 15)
+
+FIRST_NAMES = [
+    'Olivia', 'Liam', 'Emma', 'Noah', 'Charlotte', 'William', 'Amelia', 'Benjamin', 'Sophia', 'Lucas',
+    'Chloe', 'Ethan', 'Zoe', 'Mateo', 'Maya', 'Arjun', 'Mei', 'Omar', 'Fatima', 'Hiroshi',
+    'Isabelle', 'Gabriel', 'Nadia', 'Samuel', 'Leah', 'Kwame', 'Ana', 'Daniel', 'Grace', 'Raj'
+]
+LAST_NAMES = [
+    'Smith', 'Tremblay', 'Martin', 'Roy', 'Wilson', 'Patel', 'Nguyen', 'Chen', 'Singh', 'Brown',
+    'Gagnon', 'MacDonald', 'Kim', 'Lee', 'Campbell', 'Okafor', 'Haddad', 'Santos', 'Kowalczyk', 'Ali'
+]
+
+# Roughly the population split — Quebec is rare enough that Q1 stays rare
+PROVINCES = [
+    ('Ontario', 39), ('British Columbia', 14), ('Alberta', 12), ('Manitoba', 4),
+    ('Saskatchewan', 3), ('Nova Scotia', 3), ('New Brunswick', 2), ('Quebec', 3)
+]
+
+ACCOUNT_TYPES = [('TFSA', 30), ('RRSP', 30), ('RRIF', 8), ('FHSA', 10), ('RESP', 7), ('non-registered', 15)]
+
+# Who a cloned account names, and how often the slot is simply left empty
+DESIGNEES = [
+    (None, 35), ('spouse', 20), ('child', 10), ('mother', 6), ('father', 4),
+    ('brother', 5), ('sister', 4), ('friend', 3), ('ex-spouse', 8), ('deceased', 5)
+]
+
+LIFE_EVENTS = ('marriage', 'divorce', 'new_child', 'designee_death', 'common_law', 'will_update')
+
+SLOTS_BY_TYPE = {
+    'TFSA':           ['successor_holder', 'beneficiary_primary', 'beneficiary_contingent'],
+    'RRSP':           ['successor_annuitant', 'beneficiary_primary', 'beneficiary_contingent'],
+    'RRIF':           ['successor_annuitant', 'beneficiary_primary', 'beneficiary_contingent'],
+    'FHSA':           ['beneficiary_primary', 'beneficiary_contingent'],
+    'RESP':           ['beneficiary_primary'],
+    'non-registered': ['beneficiary_primary']
+}
+
+DATE_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+
+def load_scenarios(path = CLIENTS_PATH):
+    with open(path) as f:
+        return json.load(f)['clients']
+
+
+def weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def iso(d):
+    return d.isoformat()
+
+
+def shift_dates(obj, days, as_of):
+    # Moves every YYYY-MM-DD string by the same offset, never past as_of
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            obj[key] = shift_dates(value, days, as_of)
+    elif isinstance(obj, list):
+        for i, value in enumerate(obj):
+            obj[i] = shift_dates(value, days, as_of)
+    elif isinstance(obj, str) and DATE_PATTERN.match(obj):
+        return iso(min(parse_date(obj) + timedelta(days = days), as_of))
+    return obj
+
+
+class ProfileGenerator:
+    # Produces an endless, seeded stream of profiles shaped like the five
+    # clients.json scenarios. Each profile starts from one scenario, gets a
+    # new identity, shifted dates and rescaled balances, is resized to the
+    # requested number of accounts and children, and then goes through a few
+    # life events that — like the scenarios themselves — leave the account
+    # designations untouched.
+
+    def __init__(self, seed = 0, accounts = (1, 6), children = (0, 3), events = (0, 2), as_of = REFERENCE_DATE, scenarios = None):
+        self.seed = seed
+        self.accounts = accounts
+        self.children = children
+        self.events = events
+        self.as_of = as_of
+        self.scenarios = scenarios or load_scenarios()
+
+        # Every hand-written account, by type, to clone new accounts from
+        self.account_pool = {}
+        for wrapper in self.scenarios:
+            for account in wrapper['client'].get('accounts', []):
+                self.account_pool.setdefault(account['type'], []).append(account)
+
+    def profile(self, n):
+        # Profile n is the same for a given seed no matter how many are drawn
+        rng = random.Random(f"{self.seed}:{n}")
+        wrapper = rng.choice(self.scenarios)
+        client = copy.deepcopy(wrapper['client'])
+        profile_id = f"S{n:07d}"
+
+        last_name = rng.choice(LAST_NAMES)
+        client['name'] = f"{rng.choice(FIRST_NAMES)} {last_name}"
+        client['age'] = max(19, client.get('age', 40) + rng.randint(-5, 5))
+        client['province'] = weighted(rng, PROVINCES)
+        shift_dates(client, -rng.randint(0, 3 * 365), self.as_of)
+
+        for key in ('spouse', 'current_partner', 'partner'):
+            if client.get(key):
+                client[key]['name'] = f"{rng.choice(FIRST_NAMES)} {last_name}"
+
+        self.resize_children(rng, client, last_name)
+        self.resize_accounts(rng, client, profile_id)
+
+        events = [rng.choice(LIFE_EVENTS) for _ in range(rng.randint(*self.events))]
+        for event in events:
+            getattr(self, f"event_{event}")(rng, client, last_name)
+
+        return {
+            '_profile_id': profile_id,
+            '_scenario': wrapper.get('_scenario'),
+            '_events': events,
+            'client': client
+        }
+
+    def generate(self, count, start = 0):
+        for n in range(start, start + count):
+            yield self.profile(n)
+
+    # ── Household ───────────────────────────────────────────────
+
+    def new_child(self, rng, last_name, age_months = None):
+        if age_months is None:
+            age_months = rng.randint(0, 40 * 12)
+        birth = self.as_of - timedelta(days = age_months * 30)
+        child = {
+            'name': f"{rng.choice(FIRST_NAMES)} {last_name}",
+            'age': age_months // 12,
+            'is_minor': age_months < 18 * 12,
+            'birth_date': iso(birth)
+        }
+        if age_months < 24:
+            child['age_months'] = age_months
+        return child
+
+    def resize_children(self, rng, client, last_name):
+        children = client.get('children', [])
+        target = rng.randint(*self.children)
+        del children[target:]
+        while len(children) < target:
+            children.append(self.new_child(rng, last_name))
+        client['children'] = children
+
+    def designee(self, rng, client, designated):
+        kind = weighted(rng, DESIGNEES)
+        if kind is None:
+            return None
+
+        person = {'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", 'relationship': kind, 'designated': designated}
+        if kind == 'spouse' and client.get('spouse'):
+            person['name'] = client['spouse']['name']
+            person['is_currently_spouse'] = True
+        elif kind == 'child' and client.get('children'):
+            child = rng.choice(client['children'])
+            person['name'] = child['name']
+            person['is_minor'] = child.get('is_minor', False)
+        elif kind == 'ex-spouse':
+            person['is_currently_spouse'] = False
+        elif kind == 'deceased':
+            person['relationship'] = rng.choice(['spouse - deceased', 'mother', 'father', 'brother - deceased'])
+            person['is_currently_alive'] = False
+            person['death_date'] = iso(parse_date(designated) + timedelta(days = rng.randint(30, 3000)))
+        return person
+
+    # ── Accounts ────────────────────────────────────────────────
+
+    def resize_accounts(self, rng, client, profile_id):
+        accounts = client.get('accounts', [])
+        target = rng.randint(*self.accounts)
+        rng.shuffle(accounts)
+        del accounts[target:]
+
+        while len(accounts) < target:
+            account_type = weighted(rng, ACCOUNT_TYPES)
+            account = copy.deepcopy(rng.choice(self.account_pool.get(account_type) or [{'type': account_type}]))
+            opened = self.as_of - timedelta(days = rng.randint(90, 20 * 365))
+            account['opened'] = iso(opened)
+            for slot in SLOTS_BY_TYPE[account_type]:
+                account[slot] = self.designee(rng, client, iso(opened))
+            accounts.append(account)
+
+        for i, account in enumerate(accounts):
+            account['account_id'] = f"SYN-{account['type']}-{profile_id}-{i + 1}"
+            # Log-normal, so most balances are modest and a few are large
+            account['balance'] = int(max(0, account.get('balance', 20000)) * rng.lognormvariate(0, 0.6))
+        client['accounts'] = accounts
+
+    def designations(self, client):
+        for account in client['accounts']:
+            for slot in SLOTS_BY_TYPE.get(account.get('type'), []):
+                if account.get(slot):
+                    yield account[slot]
+
+    # ── Life events ─────────────────────────────────────────────
+
+    def recent(self, rng, max_days = 3 * 365):
+        return iso(self.as_of - timedelta(days = rng.randint(1, max_days)))
+
+    def event_marriage(self, rng, client, last_name):
+        client['marital_status'] = 'married'
+        client['marriage_date'] = self.recent(rng)
+        client['spouse'] = {'name': f"{rng.choice(FIRST_NAMES)} {last_name}", 'relationship': 'spouse', 'common_law_start': None}
+        client.pop('current_partner', None)
+        client.pop('partner', None)
+
+    def event_divorce(self, rng, client, last_name):
+        if client.get('marital_status') != 'married':
+            return
+        client['marital_status'] = 'divorced'
+        client['divorce_finalized'] = self.recent(rng)
+        client.pop('spouse', None)
+        client.pop('marriage_date', None)
+        for person in self.designations(client):
+            if person.get('relationship') == 'spouse':
+                person['relationship'] = 'ex-spouse'
+                person['is_currently_spouse'] = False
+
+    def event_new_child(self, rng, client, last_name):
+        client.setdefault('children', []).append(self.new_child(rng, last_name, age_months = rng.randint(0, 11)))
+
+    def event_designee_death(self, rng, client, last_name):
+        people = list(self.designations(client))
+        if people:
+            person = rng.choice(people)
+            person['is_currently_alive'] = False
+            person['death_date'] = self.recent(rng)
+
+    def event_common_law(self, rng, client, last_name):
+        if client.get('marital_status') == 'married':
+            return
+        start = self.as_of - timedelta(days = rng.randint(60, 4 * 365))
+        client['current_partner'] = {
+            'name': f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            'relationship': 'common-law',
+            'cohabitation_start': iso(start),
+            'months_together': (self.as_of - start).days // 30
+        }
+
+    def event_will_update(self, rng, client, last_name):
+        client['has_will'] = True
+        client['will_last_updated'] = self.recent(rng, max_days = 15 * 365)
+
+
+def generate_book(count, seed = 0, **knobs):
+    return list(ProfileGenerator(seed, **knobs).generate(count))
+
+
+def write_book(path, wrappers):
+    # .json writes a clients.json style file; .ndjson / .ndjson.gz one
+    # profile per line for stream.py
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump({'clients': list(wrappers)}, f)
+        return
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt') as f:
+        for wrapper in wrappers:
+            f.write(json.dumps(wrapper, separators = (',', ':')) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description = 'Generate a synthetic client book from the clients.json scenarios')
+    parser.add_argument('count', type = int)
+    parser.add_argument('output', help = '.json (clients.json layout) or .ndjson / .ndjson.gz')
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--accounts', type = int, nargs = 2, default = (1, 6), metavar = ('MIN', 'MAX'))
+    parser.add_argument('--children', type = int, nargs = 2, default = (0, 3), metavar = ('MIN', 'MAX'))
+    parser.add_argument('--events', type = int, nargs = 2, default = (0, 2), metavar = ('MIN', 'MAX'), help = 'Life events applied per profile')
+    args = parser.parse_args()
+
+    generator = ProfileGenerator(args.seed, args.accounts, args.children, args.events)
+    write_book(args.output, generator.generate(args.count))
+    print(f"  {args.count:,} profiles written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
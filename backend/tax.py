@@ -0,0 +1,252 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+# Income tax and probate tables for estimating what a death costs an
+# estate. Rates are the 2025 federal, provincial and territorial brackets. Each
+# jurisdiction's basic personal amount is folded in as a leading 0% bracket,
+# which is exact for the lowest-rate credit. Provincial surtaxes and the
+# smaller credits are left out. These are estimates for findings text, not
+# a tax return.
+#
+# Every calculator has a scalar form (used by the rules one account at a
+# time) and an array form (used by the vectorized engine and the exposure
+# simulator). Both apply the brackets in the same order with the same
+# float operations, so they agree to the dollar.
+
+FEDERAL_BRACKETS = [(0, 0.0), (16129, 0.15), (57375, 0.205), (114750, 0.26), (177882, 0.29), (253414, 0.33)]
+
+# brackets: (threshold, marginal rate). probate: flat fee tiers
+# (value up to, fee) and marginal rates over a threshold, added together.
+PROVINCES = {
+    'Ontario': {
+        'brackets': [(0, 0.0), (12747, 0.0505), (52886, 0.0915), (105775, 0.1116), (150000, 0.1216), (220000, 0.1316)],
+        'probate': {'tiers': [], 'rates': [(50000, 0.015)]}
+    },
+    'British Columbia': {
+        'brackets': [(0, 0.0), (12932, 0.0506), (49279, 0.077), (98560, 0.105), (113158, 0.1229), (137407, 0.147), (186306, 0.168), (259829, 0.205)],
+        'probate': {'tiers': [], 'rates': [(25000, 0.006), (50000, 0.014)]}
+    },
+    'Alberta': {
+        'brackets': [(0, 0.0), (22323, 0.08), (60000, 0.10), (151234, 0.12), (181481, 0.13), (241974, 0.14), (362961, 0.15)],
+        'probate': {'tiers': [(10000, 35), (25000, 135), (125000, 275), (250000, 400), (math.inf, 525)], 'rates': []}
+    },
+    'Saskatchewan': {
+        'brackets': [(0, 0.0), (19491, 0.105), (53463, 0.125), (152750, 0.145)],
+        'probate': {'tiers': [], 'rates': [(0, 0.007)]}
+    },
+    'Manitoba': {
+        'brackets': [(0, 0.0), (15780, 0.108), (47000, 0.1275), (100000, 0.174)],
+        'probate': {'tiers': [], 'rates': []}
+    },
+    'Quebec': {
+        'brackets': [(0, 0.0), (18571, 0.14), (53255, 0.19), (106495, 0.24), (129590, 0.2575)],
+        # Notarial wills need no probate
+        'probate': {'tiers': [], 'rates': []},
+        # Quebec residents get 16.5% off their federal tax
+        'federal_abatement': 0.165
+    },
+    'New Brunswick': {
+        'brackets': [(0, 0.0), (13396, 0.094), (51306, 0.14), (102614, 0.16), (190060, 0.195)],
+        'probate': {'tiers': [(5000, 25), (10000, 50), (15000, 75), (20000, 100)], 'rates': [(20000, 0.005)]}
+    },
+    'Nova Scotia': {
+        'brackets': [(0, 0.0), (11744, 0.0879), (30507, 0.1495), (61015, 0.1667), (95883, 0.175), (154650, 0.21)],
+        'probate': {'tiers': [(10000, 85.60), (25000, 215.20), (50000, 358.15), (math.inf, 1002.65)], 'rates': [(100000, 0.01695)]}
+    },
+    'Prince Edward Island': {
+        'brackets': [(0, 0.0), (14250, 0.095), (33328, 0.1347), (64656, 0.166), (105000, 0.1762), (140000, 0.19)],
+        'probate': {'tiers': [(10000, 50), (25000, 100), (50000, 200), (math.inf, 400)], 'rates': [(100000, 0.004)]}
+    },
+    'Newfoundland and Labrador': {
+        'brackets': [(0, 0.0), (11067, 0.087), (44192, 0.145), (88382, 0.158), (157792, 0.178), (220910, 0.198), (282214, 0.208), (564429, 0.213), (1128858, 0.218)],
+        'probate': {'tiers': [(math.inf, 60)], 'rates': [(1000, 0.006)]}
+    },
+    'Yukon': {
+        'brackets': [(0, 0.0), (16129, 0.064), (57375, 0.09), (114750, 0.109), (177882, 0.128), (500000, 0.15)],
+        'probate': {'tiers': [(25000, 0), (math.inf, 140)], 'rates': []}
+    },
+    'Northwest Territories': {
+        'brackets': [(0, 0.0), (17842, 0.059), (51964, 0.086), (103930, 0.122), (168967, 0.1405)],
+        'probate': {'tiers': [(10000, 30), (25000, 110), (125000, 215), (250000, 325), (math.inf, 435)], 'rates': []}
+    },
+    'Nunavut': {
+        'brackets': [(0, 0.0), (19274, 0.04), (55801, 0.07), (111602, 0.09), (181439, 0.115)],
+        'probate': {'tiers': [(10000, 25), (25000, 100), (125000, 200), (250000, 300), (math.inf, 400)], 'rates': []}
+    }
+}
+
+ALIASES = {
+    'on': 'Ontario', 'bc': 'British Columbia', 'ab': 'Alberta', 'sk': 'Saskatchewan', 'mb': 'Manitoba',
+    'qc': 'Quebec', 'nb': 'New Brunswick', 'ns': 'Nova Scotia', 'pe': 'Prince Edward Island', 'pei': 'Prince Edward Island',
+    'nl': 'Newfoundland and Labrador', 'newfoundland': 'Newfoundland and Labrador',
+    'yt': 'Yukon', 'nt': 'Northwest Territories', 'nwt': 'Northwest Territories', 'nu': 'Nunavut'
+}
+ALIASES.update({name.lower(): name for name in PROVINCES})
+
+# Profiles without a recognised province are estimated as Ontario, the
+# most common province in the book. Anything shown to a client says so
+# (province_label), and exposure reports count them.
+DEFAULT_PROVINCE = 'Ontario'
+ASSUMED_LABEL = f"{DEFAULT_PROVINCE} (assumed, as the province on file is not recognised)"
+
+# Other income on the final return when a profile has no annual_income —
+# without it the basic personal amount would swallow small accounts whole
+DEFAULT_OTHER_INCOME = 50000
+
+PROVINCE_NAMES = list(PROVINCES)
+PROVINCE_CODES = {name: code for code, name in enumerate(PROVINCE_NAMES)}
+
+
+@lru_cache(maxsize = 256)
+def province_name(province):
+    return ALIASES.get((province or '').strip().lower(), DEFAULT_PROVINCE)
+
+
+def known_province(province):
+    return (province or '').strip().lower() in ALIASES
+
+
+def province_label(province):
+    # The province a figure was worked out for, as findings text shows it
+    return province_name(province) if known_province(province) else ASSUMED_LABEL
+
+
+def province_code(province):
+    return PROVINCE_CODES[province_name(province)]
+
+
+def spans(brackets):
+    # (threshold, width, rate) per bracket; the top bracket is unbounded
+    uppers = [threshold for threshold, _ in brackets[1:]] + [math.inf]
+    return [(threshold, upper - threshold, rate) for (threshold, rate), upper in zip(brackets, uppers)]
+
+
+FEDERAL_SPANS = spans(FEDERAL_BRACKETS)
+PROVINCIAL_SPANS = {name: spans(p['brackets']) for name, p in PROVINCES.items()}
+PROBATE_SPANS = {name: spans([(0, 0.0)] + p['probate']['rates']) for name, p in PROVINCES.items()}
+
+
+def marginal(amount, brackets):
+    # Brackets above the amount would only add 0.0, so stopping early gives
+    # the same float as the array form, which adds them all
+    total = 0.0
+    for threshold, width, rate in brackets:
+        if amount <= threshold:
+            break
+        total += rate * min(amount - threshold, width)
+    return total
+
+
+@lru_cache(maxsize = 4096)
+def income_tax(income, province):
+    name = province_name(province)
+    federal = marginal(income, FEDERAL_SPANS) * (1.0 - PROVINCES[name].get('federal_abatement', 0.0))
+    return federal + marginal(income, PROVINCIAL_SPANS[name])
+
+
+def deemed_income_tax(amount, province, other_income = DEFAULT_OTHER_INCOME):
+    # Tax on registered money deemed income at death, stacked on top of
+    # whatever else is on the final return
+    return int(income_tax(other_income + amount, province) - income_tax(other_income, province))
+
+
+def probate_fee(value, province):
+    name = province_name(province)
+    if value <= 0:
+        return 0
+    fee = 0.0
+    for upper, tier_fee in PROVINCES[name]['probate']['tiers']:
+        if value <= upper:
+            fee = float(tier_fee)
+            break
+    return int(fee + marginal(value, PROBATE_SPANS[name]))
+
+
+# Which of those apply to an account at death. A living current spouse or
+# common-law partner named as successor annuitant or primary beneficiary
+# gets a tax-deferred rollover, so nothing is deemed income. An account
+# with a living designee passes outside the estate and skips probate;
+# non-registered accounts always go through it.
+
+SPOUSAL = ('spouse', 'common-law')
+DESIGNEE_SLOTS = ('successor_holder', 'successor_annuitant', 'beneficiary_primary', 'beneficiary_contingent')
+
+
+def living(person):
+    return isinstance(person, dict) and person.get('is_currently_alive') is not False
+
+
+def spousal_rollover(account):
+    for slot in ('successor_annuitant', 'beneficiary_primary'):
+        person = account.get(slot)
+        if living(person) and person.get('relationship') in SPOUSAL and person.get('is_currently_spouse') is not False:
+            return True
+    return False
+
+
+def passes_to_estate(account):
+    if account.get('type') == 'non-registered':
+        return True
+    return not any(living(account.get(slot)) for slot in DESIGNEE_SLOTS)
+
+
+class TaxTables:
+    # Every jurisdiction's brackets padded to the same width, so a rate can
+    # be looked up for a whole column of province codes at once. Padding
+    # brackets have zero width and add nothing.
+
+    def __init__(self):
+        self.federal = self.pad([FEDERAL_BRACKETS])
+        self.provincial = self.pad([PROVINCES[name]['brackets'] for name in PROVINCE_NAMES])
+        self.abatement = np.array([PROVINCES[name].get('federal_abatement', 0.0) for name in PROVINCE_NAMES])
+        self.probate_rates = self.pad([[(0, 0.0)] + PROVINCES[name]['probate']['rates'] for name in PROVINCE_NAMES])
+
+        width = max(len(PROVINCES[name]['probate']['tiers']) for name in PROVINCE_NAMES)
+        self.tier_uppers = np.full((len(PROVINCE_NAMES), width), -1.0)
+        self.tier_fees = np.zeros((len(PROVINCE_NAMES), width))
+        for code, name in enumerate(PROVINCE_NAMES):
+            for i, (upper, fee) in enumerate(PROVINCES[name]['probate']['tiers']):
+                self.tier_uppers[code, i] = upper
+                self.tier_fees[code, i] = fee
+
+    @staticmethod
+    def pad(schedules):
+        width = max(len(brackets) for brackets in schedules)
+        thresholds = np.zeros((len(schedules), width))
+        spans = np.zeros((len(schedules), width))
+        rates = np.zeros((len(schedules), width))
+        for row, brackets in enumerate(schedules):
+            for i, (threshold, rate) in enumerate(brackets):
+                upper = brackets[i + 1][0] if i + 1 < len(brackets) else math.inf
+                thresholds[row, i] = threshold
+                spans[row, i] = upper - threshold
+                rates[row, i] = rate
+        return thresholds, spans, rates
+
+    @staticmethod
+    def marginal(amount, table, codes):
+        thresholds, spans, rates = table
+        total = np.zeros(np.shape(amount))
+        for i in range(thresholds.shape[1]):
+            total += rates[codes, i] * np.minimum(np.maximum(amount - thresholds[codes, i], 0.0), spans[codes, i])
+        return total
+
+    def income_tax(self, income, codes):
+        federal = self.marginal(income, self.federal, np.zeros_like(codes)) * (1.0 - self.abatement[codes])
+        return federal + self.marginal(income, self.provincial, codes)
+
+    def deemed_income_tax(self, amount, codes, other_income):
+        return (self.income_tax(other_income + amount, codes) - self.income_tax(other_income, codes)).astype(np.int64)
+
+    def probate_fee(self, value, codes):
+        # The first tier the value fits under sets the flat fee
+        fits = value[..., None] <= self.tier_uppers[codes]
+        first = np.where(fits.any(axis = -1), fits.argmax(axis = -1), -1)
+        fee = np.where(first >= 0, np.take_along_axis(self.tier_fees[codes], np.maximum(first, 0)[..., None], axis = -1)[..., 0], 0.0)
+        fee = fee + self.marginal(value, self.probate_rates, codes)
+        return np.where(value > 0, fee, 0.0).astype(np.int64)
+
+
+TABLES = TaxTables()
@@ -0,0 +1,96 @@
+from datetime import timedelta
+
+from analysis import (
+    DAYS_PER_MONTH,
+    DAYS_PER_YEAR,
+    RULES,
+    ClientIndex,
+    parse_date,
+    rule_pack,
+    to_date
+)
+
+# Only L0 (will age) and L5 (months of cohabitation) depend on the calendar.
+# Their thresholds are whole-day counts from a known start date, so the day
+# each one flips can be computed directly instead of re-running the engine
+# day by day.
+
+
+def time_boundaries(client, pack = None):
+    # (rule_id, first date the threshold is met)
+    boundaries = []
+    thresholds = (pack or rule_pack()).for_province(client.get('province'))
+
+    will_last_updated = client.get('will_last_updated')
+    if will_last_updated:
+        boundaries.append(('L0', parse_date(will_last_updated) + timedelta(days = thresholds.will_outdated_years * DAYS_PER_YEAR)))
+
+    partner = client.get('current_partner')
+    if partner and partner.get('cohabitation_start'):
+        boundaries.append(('L5', parse_date(partner['cohabitation_start']) + timedelta(days = thresholds.cohabitation_months * DAYS_PER_MONTH)))
+
+    return boundaries
+
+
+def next_change(client, as_of = None, pack = None):
+    # First day after as_of on which L0 or L5 can give different findings:
+    # the threshold date while it is still ahead, then each day the year or
+    # month count in the finding goes up. None when nothing depends on the date
+    as_of = to_date(as_of)
+    thresholds = (pack or rule_pack()).for_province(client.get('province'))
+    counters = []
+
+    will_last_updated = client.get('will_last_updated')
+    if will_last_updated:
+        counters.append((parse_date(will_last_updated), DAYS_PER_YEAR, thresholds.will_outdated_years))
+
+    partner = client.get('current_partner')
+    if partner and partner.get('cohabitation_start'):
+        counters.append((parse_date(partner['cohabitation_start']), DAYS_PER_MONTH, thresholds.cohabitation_months))
+
+    changes = []
+    for start, unit, threshold in counters:
+        count = (as_of - start).days // unit
+        changes.append(start + timedelta(days = max(count + 1, threshold) * unit))
+    return min(changes) if changes else None
+
+
+def project_timeline(client, as_of = None, horizon_days = None):
+    as_of = to_date(as_of)
+    dispatch = RULES.compile()
+    events = []
+
+    pack = rule_pack()
+    for rule_id, flip_date in time_boundaries(client, pack):
+        if flip_date <= as_of:
+            continue
+        if horizon_days is not None and (flip_date - as_of).days > horizon_days:
+            continue
+
+        # Evaluating the rule either side of the boundary confirms it really
+        # flips — its other conditions (e.g. partner not named) do not depend
+        # on the date
+        rules = tuple(r for r in dispatch.get('client', ()) if r.rule_id == rule_id)
+        before = RULES.run(rules, client, ClientIndex(client, flip_date - timedelta(days = 1), pack))
+        after = RULES.run(rules, client, ClientIndex(client, flip_date, pack))
+        findings = [f for f in after if f not in before]
+
+        for finding in findings:
+            events.append({
+                'date': flip_date.isoformat(),
+                'rule': rule_id,
+                'finding': finding.to_dict()
+            })
+
+    events.sort(key = lambda e: e['date'])
+    return events
+
+
+def project_book(profiles, as_of = None, horizon_days = 365):
+    # Outreach schedule for a whole book — (client position, event), by date
+    schedule = []
+    for position, client in enumerate(profiles):
+        for event in project_timeline(client, as_of, horizon_days):
+            schedule.append((position, event))
+    schedule.sort(key = lambda item: item[1]['date'])
+    return schedule
@@ -0,0 +1,361 @@
+import numpy as np
+
+from analysis import (
+    CHILD_RELATIONSHIPS,
+    DAYS_PER_MONTH,
+    DAYS_PER_YEAR,
+    NON_SPOUSE_RELATIONSHIPS,
+    FINDING_TEMPLATES,
+    make_finding,
+    normalize_name,
+    parse_date,
+    other_income,
+    rule_pack,
+    safe_get,
+    to_date
+)
+from tax import TABLES, passes_to_estate, province_code, province_label, spousal_rollover
+
+# Columnar twin of analyze_estate_gaps. A whole book is loaded into NumPy
+# columns once, every rule becomes a boolean mask over all accounts (or all
+# households) at once, and Python only runs per finding that actually fires.
+
+TYPE_CODES = {'TFSA': 1, 'RRSP': 2, 'RRIF': 3, 'FHSA': 4, 'non-registered': 5}
+
+SLOTS = ['successor_holder', 'successor_annuitant', 'beneficiary_primary', 'beneficiary_contingent']
+
+# Tri-state flags — rules only fire on an explicit False
+UNKNOWN = -1
+FALSE = 0
+TRUE = 1
+
+# Per-client order keys reproduce the scalar engine's pre-sort sequence:
+# Q1, then each account's rules in account order, then life events, then
+# cross-account checks.
+PROVINCE_ORDER = -1
+ACCOUNT_RULE_STRIDE = 32
+HOUSEHOLD_ORDER = 1 << 40
+
+
+def tri_state(value):
+    if value is True:
+        return TRUE
+    if value is False:
+        return FALSE
+    return UNKNOWN
+
+
+class SlotColumns:
+
+    def __init__(self, present, relationship, alive, spouse):
+        self.present = np.array(present, dtype = bool)
+        self.relationship = np.array(relationship, dtype = np.int32)
+        self.alive = np.array(alive, dtype = np.int8)
+        self.spouse = np.array(spouse, dtype = np.int8)
+
+
+class BookColumns:
+
+    def __init__(self, profiles, as_of = None, pack = None):
+        self.profiles = list(profiles)
+        self.accounts = []
+        self.relationship_codes = {}
+        self.pack = pack or rule_pack()
+        newborn_months = self.pack.columns['newborn_months']
+
+        as_of = to_date(as_of)
+
+        # Columns are gathered as plain lists and converted once at the end —
+        # per-element writes into NumPy arrays are far slower than list appends
+        client = []
+        position = []
+        account_type = []
+        balance = []
+        slot_lists = {slot: ([], [], [], []) for slot in SLOTS}
+        beneficiary_named = []
+        beneficiary_minor = []
+        rollover = []
+        estate = []
+
+        offsets = [0]
+        province = []
+        income = []
+        marital_status = []
+        has_marriage_date = []
+        has_newborn = []
+        has_will = []
+        partner_months = []
+        will_years = []
+        self.non_registered_totals = []
+
+        for c, profile in enumerate(self.profiles):
+            code = province_code(profile.get('province'))
+            province.append(code)
+            income.append(other_income(profile))
+            marital_status.append(profile.get('marital_status'))
+            has_marriage_date.append(bool(profile.get('marriage_date')))
+            has_will.append(bool(profile.get('has_will', False)))
+
+            children = profile.get('children', [])
+            has_newborn.append(any(
+                child.get('age_months') is not None and child.get('age_months') <= newborn_months[code]
+                for child in children
+            ))
+            minor_names = {normalize_name(child.get('name')) for child in children if child.get('is_minor') is True}
+
+            months = -1
+            partner = profile.get('current_partner')
+            if partner:
+                months = partner.get('months_living_together', 0) or 0
+                if partner.get('cohabitation_start'):
+                    months = (as_of - parse_date(partner['cohabitation_start'])).days // DAYS_PER_MONTH
+            partner_months.append(months)
+
+            years = -1
+            if profile.get('will_last_updated'):
+                years = (as_of - parse_date(profile['will_last_updated'])).days // DAYS_PER_YEAR
+            will_years.append(years)
+
+            non_registered_total = 0
+            accounts = profile.get('accounts', [])
+            for i, account in enumerate(accounts):
+                self.accounts.append(account)
+                client.append(c)
+                position.append(i)
+                account_type.append(TYPE_CODES.get(account.get('type'), 0))
+                balance.append(account.get('balance', 0) or 0)
+
+                if account.get('type') == 'non-registered':
+                    non_registered_total += account.get('balance', 0)
+
+                for slot, (present, relationship, alive, spouse) in slot_lists.items():
+                    person = account.get(slot)
+                    present.append(person is not None)
+                    if isinstance(person, dict):
+                        relationship.append(self.relationship_code(person.get('relationship')))
+                        alive.append(tri_state(person.get('is_currently_alive')))
+                        spouse.append(tri_state(person.get('is_currently_spouse')))
+                    else:
+                        relationship.append(-1)
+                        alive.append(UNKNOWN)
+                        spouse.append(UNKNOWN)
+
+                beneficiary_name = safe_get(account, 'beneficiary_primary', 'name')
+                beneficiary_named.append(beneficiary_name is not None)
+                beneficiary_minor.append(normalize_name(beneficiary_name) in minor_names)
+                rollover.append(spousal_rollover(account))
+                estate.append(passes_to_estate(account))
+
+            offsets.append(offsets[-1] + len(accounts))
+            self.non_registered_totals.append(non_registered_total)
+
+        # Account columns
+        self.client = np.array(client, dtype = np.int64)
+        self.position = np.array(position, dtype = np.int64)
+        self.type = np.array(account_type, dtype = np.int8)
+        self.balance = np.array(balance, dtype = np.float64)
+        self.slots = {slot: SlotColumns(*lists) for slot, lists in slot_lists.items()}
+        self.beneficiary_named = np.array(beneficiary_named, dtype = bool)
+        self.beneficiary_minor = np.array(beneficiary_minor, dtype = bool)
+        self.designated = (
+            self.slots['successor_holder'].present |
+            self.slots['successor_annuitant'].present |
+            self.slots['beneficiary_primary'].present
+        )
+
+        # Household columns
+        self.offsets = np.array(offsets, dtype = np.int64)
+        self.is_married = np.array([m == 'married' for m in marital_status], dtype = bool)
+        self.is_divorced = np.array([m == 'divorced' for m in marital_status], dtype = bool)
+        self.has_marriage_date = np.array(has_marriage_date, dtype = bool)
+        self.has_newborn = np.array(has_newborn, dtype = bool)
+        self.has_will = np.array(has_will, dtype = bool)
+        self.partner_months = np.array(partner_months, dtype = np.int64)
+        self.will_years = np.array(will_years, dtype = np.int64)
+        self.non_registered = np.array(self.non_registered_totals, dtype = np.float64)
+        self.province = np.array(province, dtype = np.int64)
+        # The rule pack's thresholds for each household's province
+        self.civil_law = np.array(self.pack.columns['civil_law'], dtype = bool)[self.province]
+        self.cohabitation_months = np.array(self.pack.columns['cohabitation_months'], dtype = np.int64)[self.province]
+        self.will_outdated_years = np.array(self.pack.columns['will_outdated_years'], dtype = np.int64)[self.province]
+        self.rrif_min_balance = np.array(self.pack.columns['rrif_liquidity_min_balance'], dtype = np.float64)[self.province]
+        self.other_income = np.array(income, dtype = np.float64)
+
+        # Tax if each account were deemed income at death (nothing on a
+        # spousal rollover), and its probate if it passes through the estate —
+        # the same figures the scalar rules compute one at a time
+        codes = self.province[self.client]
+        self.deemed_tax = np.where(rollover, 0, TABLES.deemed_income_tax(self.balance, codes, self.other_income[self.client]))
+        self.probate = np.where(estate, TABLES.probate_fee(self.balance, codes), 0)
+
+    def relationship_code(self, relationship):
+        if relationship is None:
+            return -1
+        return self.relationship_codes.setdefault(relationship, len(self.relationship_codes))
+
+    def codes_for(self, relationships):
+        return [self.relationship_codes[r] for r in relationships if r in self.relationship_codes]
+
+    def per_client_any(self, mask):
+        return np.bincount(self.client[mask], minlength = len(self.profiles)) > 0
+
+    def per_client_count(self, mask):
+        return np.bincount(self.client[mask], minlength = len(self.profiles))
+
+
+def account_rule_masks(book):
+    sh = book.slots['successor_holder']
+    sa = book.slots['successor_annuitant']
+    bp = book.slots['beneficiary_primary']
+    bc = book.slots['beneficiary_contingent']
+
+    spouse = book.codes_for(['spouse'])
+    bp_is_spouse = np.isin(bp.relationship, spouse)
+    bp_is_non_spouse = np.isin(bp.relationship, book.codes_for(NON_SPOUSE_RELATIONSHIPS))
+    married = book.is_married[book.client]
+    minor = book.beneficiary_named & book.beneficiary_minor
+    no_contingent = bp.present & ~bc.present
+
+    tfsa = book.type == TYPE_CODES['TFSA']
+    rrsp = book.type == TYPE_CODES['RRSP']
+    rrif = book.type == TYPE_CODES['RRIF']
+
+    # Listed in the order the scalar check_* functions evaluate them
+    return [
+        ('T1', tfsa & ~sh.present & bp.present),
+        ('T3', tfsa & (sh.spouse == FALSE)),
+        ('T6-successor', tfsa & (sh.alive == FALSE)),
+        ('T6-beneficiary', tfsa & (bp.alive == FALSE)),
+        ('T2', tfsa & married & bp_is_spouse & ~sh.present),
+        ('T5', tfsa & minor),
+        ('C6-TFSA', tfsa & no_contingent),
+
+        ('R1-RRSP', rrsp & ~sa.present & ~bp.present),
+        ('R2', rrsp & married & bp_is_spouse & ~sa.present),
+        ('R3-RRSP-annuitant', rrsp & (sa.spouse == FALSE)),
+        ('R3-RRSP-beneficiary', rrsp & (bp.spouse == FALSE)),
+        ('R6-RRSP-beneficiary', rrsp & (bp.alive == FALSE)),
+        ('R4', rrsp & bp_is_non_spouse & (book.balance > 0)),
+        ('R5', rrsp & minor),
+        ('C6-RRSP', rrsp & no_contingent),
+
+        ('R1-RRIF', rrif & ~sa.present & ~bp.present),
+        ('R6-RRIF-annuitant', rrif & (sa.alive == FALSE)),
+        ('R6-RRIF-beneficiary', rrif & (bp.alive == FALSE)),
+        ('R3-RRIF-annuitant', rrif & (sa.spouse == FALSE)),
+        ('R7', rrif & (book.balance > book.rrif_min_balance[book.client]) & (book.non_registered[book.client] < book.deemed_tax + book.probate)),
+        ('C6-RRIF', rrif & no_contingent)
+    ]
+
+
+def household_rule_masks(book):
+    designation_slots = [book.slots[s] for s in ['successor_holder', 'successor_annuitant', 'beneficiary_primary']]
+    beneficiary_slots = [book.slots[s] for s in ['beneficiary_primary', 'beneficiary_contingent']]
+
+    def any_slot_names(slots, relationships):
+        codes = book.codes_for(relationships)
+        mask = np.zeros(len(book.accounts), dtype = bool)
+        for columns in slots:
+            mask |= np.isin(columns.relationship, codes)
+        return book.per_client_any(mask)
+
+    names_ex = np.zeros(len(book.accounts), dtype = bool)
+    for columns in designation_slots:
+        names_ex |= columns.spouse == FALSE
+
+    n_accounts = np.diff(book.offsets)
+    n_designated = book.per_client_count(book.designated)
+
+    return [
+        ('L1', book.is_married & book.has_marriage_date & ~any_slot_names(designation_slots, ['spouse'])),
+        ('L2', book.is_divorced & book.per_client_any(names_ex)),
+        ('L3', book.has_newborn & ~any_slot_names(beneficiary_slots, CHILD_RELATIONSHIPS)),
+        ('L5', (book.partner_months >= book.cohabitation_months) & ~any_slot_names(designation_slots, ['common-law'])),
+        ('L0-no-will', ~book.has_will),
+        ('L0-outdated', book.will_years >= book.will_outdated_years),
+        ('C5', (n_designated == 0) & (n_accounts > 0)),
+        ('C2', (n_designated > 0) & (n_designated < n_accounts))
+    ]
+
+
+def finding_params(book, template_id, client, row):
+    if template_id in ('R1-RRSP', 'R1-RRIF'):
+        return {'balance': book.accounts[row].get('balance', 0), 'tax': int(book.deemed_tax[row])}
+    if template_id == 'R4':
+        account = book.accounts[row]
+        return {
+            'relationship': safe_get(account, 'beneficiary_primary', 'relationship'),
+            'balance': account.get('balance', 0),
+            'tax': int(book.deemed_tax[row])
+        }
+    if template_id == 'R7':
+        return {
+            'balance': book.accounts[row].get('balance', 0),
+            'province': province_label(book.profiles[client].get('province')),
+            'tax': int(book.deemed_tax[row] + book.probate[row]),
+            'non_registered_balance': book.non_registered_totals[client]
+        }
+    if template_id == 'L5':
+        return {'months': int(book.partner_months[client])}
+    if template_id == 'L0-outdated':
+        return {'years': int(book.will_years[client])}
+    if template_id == 'C2':
+        start, end = book.offsets[client], book.offsets[client + 1]
+        return {'types': ', '.join(
+            book.accounts[i].get('type') for i in range(start, end) if not book.designated[i]
+        )}
+    return {}
+
+
+def analyze_book_vectorized(profiles, as_of = None, compact = False):
+    book = BookColumns(profiles, as_of)
+
+    hit_templates = []
+    template_ids = []
+    clients = []
+    orders = []
+    rows = []
+
+    def collect(template_id, client, order, row):
+        template_ids.append(np.full(len(client), len(hit_templates), dtype = np.int32))
+        hit_templates.append(template_id)
+        clients.append(client)
+        orders.append(order)
+        rows.append(row)
+
+    q1 = np.flatnonzero(book.civil_law)
+    collect('Q1', q1, np.full(len(q1), PROVINCE_ORDER, dtype = np.int64), np.full(len(q1), -1))
+
+    for rule_order, (template_id, mask) in enumerate(account_rule_masks(book)):
+        hit_rows = np.flatnonzero(mask)
+        collect(template_id, book.client[hit_rows], book.position[hit_rows] * ACCOUNT_RULE_STRIDE + rule_order, hit_rows)
+
+    for rule_order, (template_id, mask) in enumerate(household_rule_masks(book)):
+        hit_clients = np.flatnonzero(mask)
+        collect(template_id, hit_clients, np.full(len(hit_clients), HOUSEHOLD_ORDER + rule_order, dtype = np.int64), np.full(len(hit_clients), -1))
+
+    template_ids = np.concatenate(template_ids)
+    clients = np.concatenate(clients)
+    orders = np.concatenate(orders)
+    rows = np.concatenate(rows)
+
+    severity_rank = np.array([book.pack.severity_order.get(FINDING_TEMPLATES[t]['severity'], 99) for t in hit_templates])
+    ranks = severity_rank[template_ids]
+
+    # Same result as the scalar engine's stable severity sort per client
+    sequence = np.lexsort((orders, ranks, clients))
+
+    results = [[] for _ in book.profiles]
+    for i in sequence:
+        template_id = hit_templates[template_ids[i]]
+        client = int(clients[i])
+        row = int(rows[i])
+
+        account_id = None
+        if row >= 0:
+            account_id = book.accounts[row].get('account_id')
+
+        finding = make_finding(template_id, account_id, **finding_params(book, template_id, client, row))
+        results[client].append(finding if compact else finding.to_dict())
+
+    return results
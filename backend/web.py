@@ -0,0 +1,221 @@
+import asyncio
+import json
+import traceback
+import weakref
+
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, enable, traces
+
+# A small HTTP/1.1 layer on asyncio streams for the chat service, the
+# gateway and the mock LLM. Keep-alive, Content-Length request bodies and
+# chunked responses (used for server-sent events) are all that is needed.
+# Every server can also answer /metrics and /traces from metrics.py.
+
+MAX_HEADER_BYTES = 64 * 1024
+
+REASONS = {
+    200: 'OK', 201: 'Created', 204: 'No Content', 304: 'Not Modified', 400: 'Bad Request',
+    404: 'Not Found', 405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large',
+    401: 'Unauthorized', 429: 'Too Many Requests', 500: 'Internal Server Error', 502: 'Bad Gateway', 503: 'Service Unavailable'
+}
+
+# Writers whose current response already has its status line on the wire
+STARTED = weakref.WeakSet()
+
+CORS_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, DELETE, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, x-api-key, anthropic-version, If-None-Match'
+}
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status, message = None):
+        super().__init__(message or REASONS.get(status, ''))
+        self.status = status
+        self.message = message or REASONS.get(status, '')
+
+
+class Request:
+
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        try:
+            return json.loads(self.body or b'{}')
+        except ValueError:
+            raise HTTPError(400, 'Request body is not valid JSON')
+
+    @property
+    def keep_alive(self):
+        return self.headers.get('connection', '').lower() != 'close'
+
+
+async def read_request(reader, max_body = None):
+    # Returns None when the client closed the connection between requests
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, 'Request headers too large')
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, path, _ = lines[0].split(' ', 2)
+    except ValueError:
+        raise HTTPError(400, 'Malformed request line')
+
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get('content-length', 0) or 0)
+    if max_body is not None and length > max_body:
+        raise HTTPError(413, f"Request body larger than {max_body} bytes")
+    body = await reader.readexactly(length) if length else b''
+
+    return Request(method, path, headers, body)
+
+
+def format_head(status, headers):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+async def send_response(writer, status, body = b'', headers = None, content_type = 'application/json'):
+    if not isinstance(body, bytes):
+        body = json.dumps(body).encode('utf-8')
+    headers = dict(CORS_HEADERS, **(headers or {}))
+    if body or status not in (204, 304):
+        headers.setdefault('Content-Type', content_type)
+    headers['Content-Length'] = str(len(body))
+    STARTED.add(writer)
+    writer.write(format_head(status, headers) + body)
+    await writer.drain()
+
+
+async def send_json(writer, status, payload, headers = None):
+    await send_response(writer, status, json.dumps(payload).encode('utf-8'), headers)
+
+
+async def send_error(writer, status, message, error_type = 'http_error', headers = None):
+    # Same shape as the Messages API's errors, so callers can treat both alike
+    await send_json(writer, status, {'type': 'error', 'error': {'type': error_type, 'message': message}}, headers)
+
+
+class ChunkedResponse:
+    # Streams a body with chunked transfer encoding so the connection can be
+    # kept alive without knowing the length up front
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    async def start(self, status = 200, headers = None, content_type = 'text/event-stream'):
+        headers = dict(CORS_HEADERS, **(headers or {}))
+        headers.setdefault('Content-Type', content_type)
+        headers['Cache-Control'] = 'no-cache'
+        headers['Transfer-Encoding'] = 'chunked'
+        STARTED.add(self.writer)
+        self.writer.write(format_head(status, headers))
+        await self.writer.drain()
+
+    async def write(self, data):
+        if data:
+            self.writer.write(f"{len(data):x}\r\n".encode('latin-1') + data + b'\r\n')
+            await self.writer.drain()
+
+    async def event(self, event, payload):
+        await self.write(f"event: {event}\ndata: {json.dumps(payload)}\n\n".encode('utf-8'))
+
+    async def end(self):
+        self.writer.write(b'0\r\n\r\n')
+        await self.writer.drain()
+
+
+async def handle_connection(handler, reader, writer, max_body = None):
+    # Serves requests on one connection until the client closes it
+    try:
+        while True:
+            try:
+                request = await read_request(reader, max_body)
+                if request is None:
+                    break
+                STARTED.discard(writer)
+                if request.method == 'OPTIONS':
+                    await send_response(writer, 204)
+                    continue
+                await handler(request, writer)
+            except HTTPError as e:
+                await send_error(writer, e.status, e.message)
+                # The unread body is still on the wire, so the connection
+                # cannot be reused
+                if e.status == 413:
+                    break
+                continue
+            except (ConnectionError, asyncio.IncompleteReadError):
+                raise
+            except Exception:
+                # A 500 can only be sent if nothing of the response is out
+                # yet; either way the connection is given up on. The details
+                # go to the server's log, not the client.
+                traceback.print_exc()
+                if writer not in STARTED:
+                    await send_error(writer, 500, 'Internal server error', 'internal_error')
+                break
+            if not request.keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def start_server(handler, host = '127.0.0.1', port = 0, max_body = None, on_connect = None):
+    async def connected(reader, writer):
+        if on_connect:
+            on_connect()
+        try:
+            await handle_connection(handler, reader, writer, max_body)
+        except asyncio.CancelledError:
+            # Idle keep-alive connections are cancelled at shutdown
+            writer.close()
+
+    return await asyncio.start_server(connected, host, port, limit = MAX_HEADER_BYTES)
+
+
+def server_port(server):
+    return server.sockets[0].getsockname()[1]
+
+
+async def handle_metrics(request, writer):
+    # Serves /metrics and /traces[?trace=<id>]; returns False for any other path
+    path, _, query = request.path.partition('?')
+    if request.method != 'GET':
+        return False
+    if path == '/metrics':
+        await send_response(writer, 200, REGISTRY.render().encode('utf-8'), content_type = METRICS_CONTENT_TYPE)
+        return True
+    if path == '/traces':
+        params = dict(p.partition('=')[::2] for p in query.split('&') if p)
+        await send_json(writer, 200, traces(params.get('trace')))
+        return True
+    return False
+
+
+async def serve_metrics(host = '127.0.0.1', port = 0):
+    # A metrics-only server, for processes that have no HTTP server of their own
+    async def handler(request, writer):
+        if not await handle_metrics(request, writer):
+            raise HTTPError(404)
+
+    enable()
+    server = await start_server(handler, host, port)
+    return server, server_port(server)
@@ -1,20 +1,16 @@
 // ═══════════════════════════════════════════════════════════
 // CLIENT DATA
-// Paste your full clients.json content into this variable
+// One household at a time from the client API (backend/api.py).
+// The browser revalidates with the ETag, so switching back to a
+// client already seen costs a 304.
 // ═══════════════════════════════════════════════════════════
 
-let CLIENTS_DATA = null;
+const CLIENT_API_URL = 'http://localhost:3002';
 
-async function loadClientsJSON() {
-  const [clientsRes, findingsRes] = await Promise.all([
-    fetch('../backend/config/clients.json'),
-    fetch('../docs/findings.json')
-  ]);
-
-  CLIENTS_DATA = await clientsRes.json();
-  FINDINGS_DATA = await findingsRes.json();
-
-  loadClient(activeClientIndex);
+async function fetchClient(index) {
+  const response = await fetch(`${CLIENT_API_URL}/clients/${index}`);
+  if (!response.ok) throw new Error(`Could not load client ${index} (${response.status})`);
+  return response.json();
 }
 
 
@@ -26,7 +22,6 @@ let activeClientIndex   = 1;
 let activeClient        = null;
 let clientFindings      = [];
 let conversationHistory = [];
-let FINDINGS_DATA       = null; 
 let API_KEY             = null;
 
 
@@ -445,7 +440,7 @@ async function sendMessage() {
 
   showTyping();
 
-  // ── API CONNECTION GOES HERE IN NEXT STEP ──
+  // ── Streamed through the local gateway (backend/gateway.py) ──
 	try {
 		const response = await fetch('http://localhost:3001/api/messages', {
 		  method: 'POST',
@@ -455,21 +450,33 @@ async function sendMessage() {
 		  body: JSON.stringify({
 			model: 'claude-opus-4-5',
 			max_tokens: 1024,
+			stream: true,
 			system: buildSystemPrompt(activeClient, clientFindings),
 			messages: conversationHistory
 		  })
 		});
 
-		const data = await response.json();
-		hideTyping();
-
-		if (data.error) {
-		  renderMessage('assistant', `Error: ${data.error.message}`);
+		if (!response.ok) {
+		  const data = await response.json().catch(() => ({}));
+		  hideTyping();
+		  renderMessage('assistant', `Error: ${data.error ? data.error.message : response.status}`);
 		  document.getElementById('sendBtn').disabled = false;
 		  return;
 		}
 
-		const reply = data.content[0].text;
+		let bubble = null;
+		const reply = await readMessageStream(response, text => {
+		  if (!bubble) {
+			hideTyping();
+			bubble = renderStreamingMessage();
+		  }
+		  bubble.innerHTML = text.replace(/\n/g, '<br/>');
+		  document.getElementById('messagesArea').scrollTop = document.getElementById('messagesArea').scrollHeight;
+		});
+
+		// Re-render the finished reply so hard stops get their styling
+		hideTyping();
+		if (bubble) bubble.closest('.message').remove();
 		conversationHistory.push({ role: 'assistant', content: reply });
 		renderMessage('assistant', reply);
 
@@ -484,6 +491,57 @@ async function sendMessage() {
 	  document.getElementById('sendBtn').disabled = false;
 }
 
+function renderStreamingMessage() {
+  const area = document.getElementById('messagesArea');
+
+  const div = document.createElement('div');
+  div.className = 'message assistant';
+  div.innerHTML = `
+    <div class="msg-avatar assistant">AI</div>
+    <div class="msg-body">
+      <div class="msg-role">Assistant</div>
+      <div class="msg-bubble"></div>
+    </div>
+  `;
+
+  area.appendChild(div);
+  area.scrollTop = area.scrollHeight;
+  return div.querySelector('.msg-bubble');
+}
+
+// Reads a Messages API event stream, calling onText with the reply so far
+// every time a new piece of text arrives
+async function readMessageStream(response, onText) {
+  const reader  = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let text   = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+
+    for (const event of events) {
+      const dataLine = event.split('\n').find(line => line.startsWith('data: '));
+      if (!dataLine) continue;
+      const data = JSON.parse(dataLine.slice(6));
+
+      if (data.type === 'content_block_delta' && data.delta.type === 'text_delta') {
+        text += data.delta.text;
+        onText(text);
+      } else if (data.type === 'error') {
+        throw new Error(data.error.message);
+      }
+    }
+  }
+
+  return text;
+}
+
 // ═══════════════════════════════════════════════════════════
 // SWITCH CLIENT
 // ═══════════════════════════════════════════════════════════
@@ -493,9 +551,13 @@ function switchClient() {
   loadClient(activeClientIndex);
 }
 
-function loadClient(index) {
-  activeClient     = CLIENTS_DATA.clients[index].client;
-  clientFindings   = FINDINGS_DATA[index].findings;
+async function loadClient(index) {
+  const data = await fetchClient(index);
+  // Ignore a slow response for a client the user has already switched away from
+  if (index !== activeClientIndex) return;
+
+  activeClient     = data.client;
+  clientFindings   = data.findings;
   conversationHistory = [];
 
   // Update topbar
@@ -548,4 +610,4 @@ function fillHint(el) {
 // INIT — load default client on page open
 // ═══════════════════════════════════════════════════════════
 
-loadClientsJSON();
+loadClient(activeClientIndex);
@@ -1,66 +0,0 @@
-const http = require('http');
-const https = require('https');
-const fs = require('fs');
-
-const PORT = 3001;
-
-const server = http.createServer((req, res) => {
-
-  // Allow requests from your local frontend
-  res.setHeader('Access-Control-Allow-Origin', '*');
-  res.setHeader('Access-Control-Allow-Methods', 'POST, OPTIONS');
-  res.setHeader('Access-Control-Allow-Headers', 'Content-Type, x-api-key, anthropic-version');
-
-  // Handle preflight
-  if (req.method === 'OPTIONS') {
-    res.writeHead(204);
-    res.end();
-    return;
-  }
-
-  if (req.method === 'POST' && req.url === '/api/messages') {
-    let body = '';
-
-    req.on('data', chunk => { body += chunk; });
-
-    req.on('end', () => {
-      // Read API key from file
-      const apiKey = fs.readFileSync('./backend/config/api.txt', 'utf8').trim();
-
-      const options = {
-        hostname: 'api.anthropic.com',
-        path: '/v1/messages',
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-          'x-api-key': apiKey,
-          'anthropic-version': '2023-06-01'
-        }
-      };
-
-      const proxyReq = https.request(options, (proxyRes) => {
-        let data = '';
-        proxyRes.on('data', chunk => { data += chunk; });
-        proxyRes.on('end', () => {
-          res.writeHead(200, { 'Content-Type': 'application/json' });
-          res.end(data);
-        });
-      });
-
-      proxyReq.on('error', (err) => {
-        res.writeHead(500);
-        res.end(JSON.stringify({ error: err.message }));
-      });
-
-      proxyReq.write(body);
-      proxyReq.end();
-    });
-  } else {
-    res.writeHead(404);
-    res.end();
-  }
-});
-
-server.listen(PORT, () => {
-  console.log(`Proxy running on http://localhost:${PORT}`);
-});
\ No newline at end of file
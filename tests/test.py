@@ -1,34 +1,35 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
 
-from backend.analysis import analyze_estate_gaps
+from bulk import analyze_book
 import json
 
 with open('backend/config/clients.json') as f:
     data = json.load(f)
 
-for client in data['clients']:
+results, _ = analyze_book([c['client'] for c in data['clients']], workers = 1)
+
+all_results = []
+
+for client_wrapper, findings in zip(data['clients'], results):
+    client = client_wrapper['client']
+
     print(f"\n{'='*50}")
-    print(f"  {client['client']['name']} — {client['_scenario']}")
+    print(f"  {client['name']} — {client_wrapper['_scenario']}")
     print(f"{'='*50}")
-    results = analyze_estate_gaps(client['client'])
-    for f in results:
+    for f in findings:
         print(f"  [{f['severity']}] {f['rule']} — {f['issue']}")
-        
-all_results = []
-
-for client_wrapper in data['clients']:
-    client  = client_wrapper['client']
-    results = analyze_estate_gaps(client)
 
     all_results.append({
-        'name':     client['name'],
-        'scenario': client_wrapper['_scenario'],
-        'findings': results
+        'client_id': client_wrapper['_profile_id'],
+        'name':      client['name'],
+        'scenario':  client_wrapper['_scenario'],
+        'findings':  findings
     })
 
 with open('docs/findings.json', 'w') as f:
     json.dump(all_results, f, indent = 2)
 
-print("findings.json written successfully")
\ No newline at end of file
+print("findings.json written successfully")
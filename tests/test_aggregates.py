@@ -0,0 +1,77 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from aggregates import GROUPINGS, aggregate_book
+from analysis import analyze_estate_gaps
+from incremental import reanalyze
+from synthetic import REFERENCE_DATE, generate_book
+from tax import PROVINCE_NAMES
+import copy
+import time
+
+
+def test_incremental_updates_match_a_full_rebuild():
+    book = generate_book(300, seed = 5)
+    aggregates = aggregate_book(book, REFERENCE_DATE)
+
+    # An ex-spouse lands on some RRSPs, a few other clients are removed
+    edited = copy.deepcopy(book)
+    for wrapper in edited[:40]:
+        client = wrapper['client']
+        for i, account in enumerate(client['accounts']):
+            if account['type'] == 'RRSP':
+                before = copy.deepcopy(client)
+                previous = analyze_estate_gaps(before, as_of = REFERENCE_DATE)
+                account['beneficiary_primary'] = {'name': 'Pat Former', 'relationship': 'ex-spouse', 'is_currently_spouse': False, 'is_currently_alive': True}
+                findings = reanalyze(before, previous, new_profile = client, as_of = REFERENCE_DATE)
+                aggregates.update(wrapper['_profile_id'], client, findings)
+                break
+    for wrapper in edited[-10:]:
+        aggregates.remove(wrapper['_profile_id'])
+
+    rebuilt = aggregate_book(edited[:-10], REFERENCE_DATE)
+    assert aggregates.tables == rebuilt.tables
+    assert aggregates.households == 290
+
+    assert aggregates.query(rule = 'R3', account_type = 'RRSP')['households'] > 0
+    # The empty grouping counts every household with at least one finding
+    assert aggregates.query()['households'] == sum(1 for w in edited[:-10] if analyze_estate_gaps(w['client'], as_of = REFERENCE_DATE))
+
+    for wrapper in edited[:-10]:
+        aggregates.remove(wrapper['_profile_id'])
+    assert all(not table for table in aggregates.tables.values())
+
+
+def test_reads_are_lookups():
+    aggregates = aggregate_book(generate_book(500, seed = 2), REFERENCE_DATE)
+    queries = [{'severity': 'CRITICAL', 'province': p} for p in ('Ontario', 'Quebec', 'Alberta')] + [{'rule': 'R3', 'account_type': 'RRSP'}]
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        for q in queries:
+            aggregates.query(**q)
+    elapsed = (time.perf_counter() - start) / (1000 * len(queries))
+
+    assert elapsed < 1e-3
+    by_province = aggregates.table('severity', 'province')
+    assert sum(row['findings'] for row in by_province.values()) == aggregates.query()['findings']
+    assert len(GROUPINGS) == 16
+
+
+def test_province_spellings_share_a_row():
+    book = generate_book(60, seed = 3)
+    spellings = ['ON', 'ontario', ' Ontario ', 'Ontario']
+    for i, wrapper in enumerate(book):
+        if wrapper['client'].get('province') in ('Ontario', 'ON'):
+            wrapper['client']['province'] = spellings[i % len(spellings)]
+    book[0]['client']['province'] = 'Atlantis'
+
+    aggregates = aggregate_book(book, REFERENCE_DATE)
+    provinces = {key[0] for key in aggregates.table('province')}
+    assert provinces <= set(PROVINCE_NAMES) | {'Unknown'}
+    assert 'Unknown' in provinces
+    assert aggregates.query(province = 'ON') == aggregates.query(province = 'Ontario')
+    assert aggregates.query(province = 'Ontario')['households'] == sum(
+        1 for w in book[1:] if w['client'].get('province', '').strip().lower() in ('on', 'ontario') and analyze_estate_gaps(w['client'], as_of = REFERENCE_DATE)
+    )
@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import RULES, analyze_estate_gaps, parse_date
+from timeline import project_timeline
+from datetime import date, timedelta
+import json
+
+CLIENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'config', 'clients.json')
+
+
+def load_profiles():
+    with open(CLIENTS_PATH) as f:
+        return [c['client'] for c in json.load(f)['clients']]
+
+
+def test_dispatch_table_only_holds_applicable_rules():
+    table = RULES.compile()
+
+    assert [r.rule_id for r in table['TFSA']] == ['T1', 'T3', 'T6', 'T2', 'T5', 'C6']
+    assert [r.rule_id for r in table['RRIF']] == ['R1', 'R6', 'R3', 'R7', 'C6']
+    assert 'FHSA' not in table
+    assert all(r.scope == 'client' for r in table['client'])
+
+
+def test_skip_and_only_filter_rules():
+    profiles = load_profiles()
+
+    for profile in profiles:
+        full = analyze_estate_gaps(profile)
+        skipped = analyze_estate_gaps(profile, skip = {'L0', 'C6'})
+        only = analyze_estate_gaps(profile, only = {'L0'})
+
+        assert skipped == [f for f in full if f['rule'] not in ('L0', 'C6')]
+        assert only == [f for f in full if f['rule'] == 'L0']
+
+
+def test_rule_timing_counts_calls():
+    profiles = load_profiles()
+    RULES.reset_stats()
+    timing, RULES.timing = RULES.timing, True
+    try:
+        for profile in profiles:
+            analyze_estate_gaps(profile)
+    finally:
+        RULES.timing = timing
+
+    calls = {}
+    for s in RULES.stats():
+        calls[s['rule']] = calls.get(s['rule'], 0) + s['calls']
+
+    tfsa_accounts = sum(1 for p in profiles for a in p['accounts'] if a['type'] == 'TFSA')
+    assert calls['T1'] == tfsa_accounts
+    assert calls['Q1'] == len(profiles)
+    RULES.reset_stats()
+
+
+def test_as_of_makes_date_rules_reproducible():
+    profile = load_profiles()[3]
+    will_year = int(profile['will_last_updated'][:4])
+
+    early = analyze_estate_gaps(profile, as_of = f'{will_year + 5}-01-01')
+    late = analyze_estate_gaps(profile, as_of = date(will_year + 20, 1, 1))
+
+    assert not any(f['issue'].startswith('Will has not been updated') for f in early)
+    assert any(f['issue'] == 'Will has not been updated in 19 years' for f in late)
+
+
+def test_projected_flip_dates_match_engine():
+    profile = load_profiles()[3]
+    as_of = parse_date(profile['will_last_updated']) + timedelta(days = 100)
+
+    events = project_timeline(profile, as_of)
+    assert [e['rule'] for e in events] == ['L0']
+
+    flip = parse_date(events[0]['date'])
+    outdated = lambda day: [f for f in analyze_estate_gaps(profile, as_of = day) if f['issue'].startswith('Will has not')]
+    assert outdated(flip - timedelta(days = 1)) == []
+    assert outdated(flip) == [events[0]['finding']]
+
+
+def test_projected_cohabitation_flip():
+    profile = load_profiles()[1]
+    start = parse_date(profile['current_partner']['cohabitation_start'])
+
+    events = project_timeline(profile, start)
+    l5 = [e for e in events if e['rule'] == 'L5']
+    assert len(l5) == 1
+
+    flip = parse_date(l5[0]['date'])
+    assert 'L5' not in {f['rule'] for f in analyze_estate_gaps(profile, as_of = flip - timedelta(days = 1))}
+    assert 'L5' in {f['rule'] for f in analyze_estate_gaps(profile, as_of = flip)}
@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import analyze_estate_gaps
+from api import ClientAPI
+from service import load_book
+from web import server_port, start_server
+from datetime import date
+import asyncio
+import httpx
+import json
+import shutil
+import subprocess
+
+
+def test_importing_app_does_no_work(tmp_path):
+    # Run from an empty directory with no API key: any eager read would fail
+    env = dict(os.environ, PYTHONPATH = os.path.join(os.path.dirname(__file__), '..', 'backend'))
+    env.pop('ANTHROPIC_API_KEY', None)
+    result = subprocess.run([sys.executable, '-c', 'import app'], cwd = tmp_path, env = env, capture_output = True, text = True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_one_client_with_etags_and_gzip(tmp_path):
+    path = tmp_path / 'clients.json'
+    shutil.copy(os.path.join(os.path.dirname(__file__), '..', 'backend', 'config', 'clients.json'), path)
+
+    async def run():
+        api = ClientAPI(str(path))
+        server = await start_server(api.handle)
+        async with httpx.AsyncClient(base_url = f"http://127.0.0.1:{server_port(server)}") as http:
+            first = await http.get('/clients/1', headers = {'Accept-Encoding': 'gzip'})
+            raw = await http.get('/clients/1', headers = {'Accept-Encoding': 'identity'})
+            repeat = await http.get('/clients/1', headers = {'If-None-Match': first.headers['etag']})
+            # The gzip tag does not validate the identity body
+            other_encoding = await http.get('/clients/1', headers = {'Accept-Encoding': 'identity', 'If-None-Match': first.headers['etag']})
+            index = await http.get('/clients')
+            missing = await http.get('/clients/99')
+
+            # An edit to the book changes what is served
+            data = json.loads(path.read_text())
+            data['clients'][1]['client']['name'] = 'Renamed Client'
+            path.write_text(json.dumps(data))
+            os.utime(path, ns = (os.stat(path).st_atime_ns, os.stat(path).st_mtime_ns + 10**9))
+            edited = await http.get('/clients/1', headers = {'If-None-Match': first.headers['etag']})
+
+            # So does a new day
+            api.as_of = date(2000, 1, 1)
+            next_day = await http.get('/clients/1')
+        server.close()
+        return api, first, raw, repeat, other_encoding, index, missing, edited, next_day
+
+    api, first, raw, repeat, other_encoding, index, missing, edited, next_day = asyncio.run(run())
+    client = load_book()[1]['client']
+
+    assert first.status_code == 200 and first.headers['content-encoding'] == 'gzip'
+    assert first.json() == {'index': 1, 'scenario': load_book()[1]['_scenario'], 'client': client, 'findings': analyze_estate_gaps(client)}
+    assert int(first.headers['content-length']) < len(raw.content)
+    assert raw.headers['etag'] != first.headers['etag']
+    assert repeat.status_code == 304 and repeat.content == b''
+    assert other_encoding.status_code == 200 and other_encoding.content == raw.content
+
+    assert [c['name'] for c in index.json()] == [w['client']['name'] for w in load_book()]
+    assert missing.status_code == 404
+
+    assert edited.status_code == 200 and edited.json()['client']['name'] == 'Renamed Client'
+    # Only the client asked for since the reload has been analysed
+    assert set(api.payloads) == {1}
+    assert next_day.status_code == 200 and api.as_of == date.today()
@@ -0,0 +1,118 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import analyze_estate_gaps
+from bulk import analyze_book, compact_document, expand_document
+from stream import stream_book
+from datetime import date
+import gzip
+import json
+import pytest
+
+CLIENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'config', 'clients.json')
+
+
+def load_profiles():
+    with open(CLIENTS_PATH) as f:
+        return [c['client'] for c in json.load(f)['clients']]
+
+
+def test_bulk_matches_serial_in_input_order():
+    profiles = load_profiles() * 7
+    expected = [analyze_estate_gaps(p) for p in profiles]
+
+    results, shard_stats = analyze_book(profiles, workers = 2, chunk_size = 4)
+
+    assert results == expected
+    assert [s['shard'] for s in shard_stats] == list(range(9))
+    assert sum(s['clients'] for s in shard_stats) == len(profiles)
+
+
+def test_bulk_inline_single_worker():
+    profiles = load_profiles()
+    results, shard_stats = analyze_book(profiles, workers = 1)
+
+    assert results == [analyze_estate_gaps(p) for p in profiles]
+    assert len(shard_stats) == 1
+
+
+def write_ndjson(path, profiles):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt') as f:
+        for p in profiles:
+            f.write(json.dumps(p) + '\n')
+
+
+def read_ndjson(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_stream_gzip_round_trip(tmp_path):
+    profiles = load_profiles() * 3
+    src = str(tmp_path / 'book.ndjson.gz')
+    dst = str(tmp_path / 'findings.ndjson.gz')
+    write_ndjson(src, profiles)
+
+    stream_book(src, dst, workers = 1, chunk_size = 4)
+
+    rows = read_ndjson(dst)
+    assert [r['findings'] for r in rows] == [analyze_estate_gaps(p) for p in profiles]
+    assert [r['line'] for r in rows] == list(range(1, len(profiles) + 1))
+
+
+def test_stream_resumes_from_checkpoint(tmp_path):
+    profiles = load_profiles() * 2
+    src = str(tmp_path / 'book.ndjson')
+    dst = str(tmp_path / 'findings.ndjson')
+    checkpoint = str(tmp_path / 'findings.offsets')
+
+    # First run only sees the first half of the book, then "crashes" mid-write
+    write_ndjson(src, profiles[:4])
+    stream_book(src, dst, checkpoint, workers = 1, chunk_size = 2)
+    with open(dst, 'a') as f:
+        f.write('{"line": 5, "partial')
+
+    write_ndjson(src, profiles)
+    stream_book(src, dst, checkpoint, workers = 1, chunk_size = 2)
+
+    rows = read_ndjson(dst)
+    assert [r['line'] for r in rows] == list(range(1, len(profiles) + 1))
+    assert [r['findings'] for r in rows] == [analyze_estate_gaps(p) for p in profiles]
+
+
+def test_resumed_stream_keeps_the_first_run_date(tmp_path):
+    # Sandra's L5 finding counts months, so her findings change with the date
+    profiles = [load_profiles()[1]] * 4
+    src = str(tmp_path / 'book.ndjson')
+    dst = str(tmp_path / 'findings.ndjson')
+    checkpoint = str(tmp_path / 'findings.offsets')
+    started = date(2026, 1, 1)
+
+    write_ndjson(src, profiles[:2])
+    stream_book(src, dst, checkpoint, workers = 1, chunk_size = 2, as_of = started)
+    with open(checkpoint) as f:
+        assert json.load(f)['as_of'] == '2026-01-01'
+
+    # Resumed on a later day without --as-of
+    write_ndjson(src, profiles)
+    stream_book(src, dst, checkpoint, workers = 1, chunk_size = 2)
+    assert [r['findings'] for r in read_ndjson(dst)] == [analyze_estate_gaps(p, as_of = started) for p in profiles]
+
+    with pytest.raises(ValueError):
+        stream_book(src, dst, checkpoint, workers = 1, as_of = date(2026, 2, 1))
+
+
+def test_compact_document_round_trip():
+    # Templates are written once, so the saving shows on books of any real size
+    profiles = load_profiles() * 20
+    results, _ = analyze_book(profiles, workers = 1, compact = True)
+    entries = [{'name': p['name'], 'scenario': None, 'findings': f} for p, f in zip(profiles, results)]
+
+    document = json.loads(json.dumps(compact_document(entries)))
+    expanded = expand_document(document)
+
+    assert [e['findings'] for e in expanded] == [analyze_estate_gaps(p) for p in profiles]
+    assert len(json.dumps(document)) < len(json.dumps(expanded))
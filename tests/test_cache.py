@@ -0,0 +1,92 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import analyze_estate_gaps
+from bulk import analyze_book
+from cache import FindingsCache
+from datetime import date
+import copy
+import json
+
+CLIENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'config', 'clients.json')
+
+
+def load_profiles():
+    with open(CLIENTS_PATH) as f:
+        return [c['client'] for c in json.load(f)['clients']]
+
+
+def test_key_is_canonical_and_versioned():
+    profile = load_profiles()[0]
+    reordered = dict(reversed(list(profile.items())))
+    cache = FindingsCache()
+
+    assert cache.key(profile) == cache.key(reordered)
+    assert cache.key(profile) != FindingsCache(version = 'other').key(profile)
+
+    changed = copy.deepcopy(profile)
+    changed['accounts'][0]['balance'] += 1
+    assert cache.key(profile) != cache.key(changed)
+
+
+def test_only_dated_profiles_are_keyed_on_the_date():
+    marcus, sandra = load_profiles()[:2]
+    cache = FindingsCache()
+
+    # Nothing in Marcus's profile depends on the date: tomorrow's run hits
+    cache.analyze(marcus, date(2026, 1, 1))
+    cache.analyze(marcus, date(2026, 1, 2))
+    assert cache.stats()['hits'] == 1
+
+    # Sandra's L5 finding counts months since 2024-04-15; the 21st month
+    # starts on 2026-01-05
+    assert cache.key(sandra, date(2026, 1, 1)) == cache.key(sandra, date(2026, 1, 4))
+    assert cache.key(sandra, date(2026, 1, 4)) != cache.key(sandra, date(2026, 1, 5))
+    assert analyze_estate_gaps(sandra, as_of = date(2026, 1, 1)) == analyze_estate_gaps(sandra, as_of = date(2026, 1, 4))
+    assert analyze_estate_gaps(sandra, as_of = date(2026, 1, 4)) != analyze_estate_gaps(sandra, as_of = date(2026, 1, 5))
+
+
+def test_callers_cannot_change_cached_findings():
+    profile = load_profiles()[1]
+    cache = FindingsCache()
+
+    first = cache.analyze(profile)
+    first[0]['issue'] = 'edited'
+    second = cache.analyze(profile)
+    second[0]['issue'] = 'edited again'
+
+    assert cache.analyze(profile) == analyze_estate_gaps(profile)
+
+
+def test_lru_eviction_and_counters():
+    profiles = load_profiles()
+    cache = FindingsCache(max_entries = 2)
+
+    for profile in profiles[:3]:
+        assert cache.analyze(profile) == analyze_estate_gaps(profile)
+    cache.analyze(profiles[2])
+
+    stats = cache.stats()
+    assert stats['misses'] == 3
+    assert stats['hits'] == 1
+    assert stats['evictions'] == 1
+    assert stats['entries'] == 2
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    profiles = load_profiles()
+    FindingsCache(directory = str(tmp_path)).analyze(profiles[1])
+
+    restarted = FindingsCache(directory = str(tmp_path))
+    assert restarted.analyze(profiles[1]) == analyze_estate_gaps(profiles[1])
+    assert restarted.stats()['disk_hits'] == 1
+
+
+def test_bulk_second_run_is_all_cache_hits(tmp_path):
+    profiles = load_profiles()
+    first, _ = analyze_book(profiles, workers = 1, cache_dir = str(tmp_path))
+    second, shard_stats = analyze_book(profiles, workers = 1, cache_dir = str(tmp_path))
+
+    assert first == second == [analyze_estate_gaps(p) for p in profiles]
+    assert sum(s['cache_hits'] for s in shard_stats) == len(profiles)
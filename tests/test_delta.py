@@ -0,0 +1,75 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import FINDING_TEMPLATES, analyze_estate_gaps, finding_id
+from delta import NEW, RESOLVED, SEVERITY_CHANGED, diff_runs, iter_run
+from stream import stream_book
+from synthetic import REFERENCE_DATE, generate_book
+import json
+
+
+def run(wrappers):
+    return [(w['_profile_id'], analyze_estate_gaps(w['client'], as_of = REFERENCE_DATE)) for w in wrappers]
+
+
+def test_tfsa_findings_carry_their_account_id():
+    book = generate_book(2000, seed = 5)
+    seen = set()
+    for wrapper in book:
+        accounts = {a['account_id'] for a in wrapper['client']['accounts']}
+        for f in analyze_estate_gaps(wrapper['client'], as_of = REFERENCE_DATE, compact = True):
+            if f.template_id in ('T2', 'T5', 'C6-TFSA'):
+                assert f.account_id in accounts
+                seen.add(f.template_id)
+    assert seen == {'T2', 'T5', 'C6-TFSA'}
+
+
+def test_ids_are_deterministic_across_forms():
+    client = generate_book(1, seed = 3)[0]['client']
+    compact = analyze_estate_gaps(client, as_of = REFERENCE_DATE, compact = True)
+    full = analyze_estate_gaps(client, as_of = REFERENCE_DATE)
+
+    assert [finding_id('S1', f) for f in compact] == [finding_id('S1', f) for f in full]
+    assert len({finding_id('S1', f) for f in full}) == len(full)
+    assert finding_id('S1', full[0]) != finding_id('S2', full[0])
+
+
+def test_only_the_delta_is_emitted(monkeypatch):
+    book = generate_book(400, seed = 6)
+    before = run(book)
+
+    # One household fixes its TFSA, one leaves the book, one joins
+    edited = next(w for w, (_, findings) in zip(book, before) if any(f['rule'] == 'T1' for f in findings))
+    for account in edited['client']['accounts']:
+        if account['type'] == 'TFSA':
+            account['successor_holder'] = {'name': 'Pat', 'relationship': 'spouse', 'is_currently_spouse': True, 'is_currently_alive': True}
+    departed = book.pop(10)
+    joined = generate_book(401, seed = 7)[-1]
+    joined['_profile_id'] = 'NEW'
+    book.insert(200, joined)
+
+    # And L0 is re-graded
+    monkeypatch.setitem(FINDING_TEMPLATES, 'L0-no-will', dict(FINDING_TEMPLATES['L0-no-will'], severity = 'CRITICAL'))
+    after = run(book)
+
+    changes = list(diff_runs(before, after))
+    expected_new = sum(len(f) for c, f in after if c == 'NEW')
+    assert len([c for c in changes if c['change'] == NEW and c['client_id'] == 'NEW']) == expected_new
+    assert {c['client_id'] for c in changes if c['change'] == RESOLVED} >= {departed['_profile_id'], edited['_profile_id']}
+
+    regraded = [c for c in changes if c['change'] == SEVERITY_CHANGED]
+    assert regraded and all(c['rule'] == 'L0' and c['escalated'] and c['previous_severity'] == 'HIGH' for c in regraded)
+    assert not list(diff_runs(before, before))
+
+
+def test_runs_are_read_from_any_output_format(tmp_path):
+    book = generate_book(300, seed = 9)
+    ndjson = tmp_path / 'book.ndjson'
+    ndjson.write_text(''.join(json.dumps(w) + '\n' for w in book))
+
+    stream_book(str(ndjson), str(tmp_path / 'compact.ndjson.gz'), workers = 1, as_of = REFERENCE_DATE, compact = True)
+    document = [{'client_id': c, 'findings': f} for c, f in run(book)]
+    (tmp_path / 'findings.json').write_text(json.dumps(document))
+
+    assert not list(diff_runs(iter_run(str(tmp_path / 'findings.json')), iter_run(str(tmp_path / 'compact.ndjson.gz'))))
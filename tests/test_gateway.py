@@ -0,0 +1,83 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from gateway import Gateway
+from mock_llm import MockLLM
+import asyncio
+import httpx
+import json
+import time
+
+
+async def start(mock_kwargs = None, **gateway_kwargs):
+    mock = await MockLLM(**(mock_kwargs or {})).start()
+    gateway = await Gateway('test-key', mock.base_url, **gateway_kwargs).start(port = 0)
+    http = httpx.AsyncClient(base_url = f"http://127.0.0.1:{gateway.port}", timeout = 30)
+    return mock, gateway, http
+
+
+async def stop(mock, gateway, http):
+    await http.aclose()
+    await gateway.close()
+    await mock.close()
+
+
+def message_body(stream = False, model = 'claude-haiku-4-5', content = 'What happens to my TFSA?'):
+    return {'model': model, 'max_tokens': 64, 'stream': stream, 'messages': [{'role': 'user', 'content': content}]}
+
+
+def test_streams_chunks_as_they_arrive_over_one_upstream_connection():
+    async def run():
+        mock, gateway, http = await start({'token_delay': 0.02, 'reply_words': 10})
+        arrivals = []
+        start_time = time.perf_counter()
+        async with http.stream('POST', '/api/messages', json = message_body(stream = True)) as response:
+            status = response.status_code
+            async for line in response.aiter_lines():
+                if '"text_delta"' in line:
+                    arrivals.append((time.perf_counter() - start_time, json.loads(line[len('data: '):])['delta']['text']))
+
+        plain = await http.post('/api/messages', json = message_body())
+        await stop(mock, gateway, http)
+        return status, arrivals, plain, mock.stats()
+
+    status, arrivals, plain, stats = asyncio.run(run())
+
+    assert status == 200
+    assert ''.join(text for _, text in arrivals) == plain.json()['content'][0]['text']
+    # Tokens reached the client spread out over the generation, not all at the end
+    assert arrivals[-1][0] - arrivals[0][0] > 0.1
+    assert stats == {'requests': 2, 'connections': 1, 'peak_in_flight': 1}
+
+
+def test_keeps_upstream_status_and_enforces_limits():
+    async def run():
+        mock, gateway, http = await start({'token_delay': 0.05, 'reply_words': 5}, max_concurrent = 2, max_body = 4096)
+        overloaded = await http.post('/api/messages', json = message_body(model = 'mock-error-529'))
+        too_large = await http.post('/api/messages', json = message_body(content = 'x' * 5000))
+        responses = await asyncio.gather(*[http.post('/api/messages', json = message_body()) for _ in range(5)])
+        await stop(mock, gateway, http)
+        return overloaded, too_large, responses
+
+    overloaded, too_large, responses = asyncio.run(run())
+
+    assert overloaded.status_code == 529 and overloaded.json()['error']['message'] == 'Mock 529'
+    assert too_large.status_code == 413
+    assert sorted(r.status_code for r in responses) == [200, 200, 429, 429, 429]
+
+
+def test_a_stalled_stream_ends_with_an_error_event():
+    async def run():
+        mock, gateway, http = await start({'token_delay': 0.5, 'reply_words': 5}, read_timeout = 0.2)
+        async with http.stream('POST', '/api/messages', json = message_body(stream = True)) as response:
+            status = response.status_code
+            body = (await response.aread()).decode('utf-8')
+        await stop(mock, gateway, http)
+        return status, body
+
+    status, body = asyncio.run(run())
+
+    assert status == 200
+    assert 'event: error' in body and 'ReadTimeout' in body
+    assert 'message_stop' not in body
@@ -0,0 +1,79 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from hardstop import classify, evaluate, hard_stop_response, load_corpus
+from mock_llm import MockLLM
+from service import Session, load_book, make_llm
+from analysis import analyze_estate_gaps
+import asyncio
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), 'hard_stop_corpus.jsonl')
+# Written after the patterns were frozen and never used to change them;
+# edits to hardstop.py must not be checked against it first
+HELDOUT_PATH = os.path.join(os.path.dirname(__file__), 'hard_stop_heldout.jsonl')
+
+
+def test_corpus_precision_recall_and_latency():
+    result = evaluate(load_corpus(CORPUS_PATH))
+
+    assert result['precision'] >= 0.95
+    assert result['recall'] >= 0.9
+    assert result['mean_us'] < 1000
+
+
+def test_heldout_precision_recall():
+    # Scored 0.947 / 0.900 when it was added; these floors only catch regressions
+    result = evaluate(load_corpus(HELDOUT_PATH))
+
+    assert result['precision'] >= 0.9
+    assert result['recall'] >= 0.85
+
+
+def test_the_object_must_be_the_designation_or_designee():
+    # An account named later in the clause is not the verb's object
+    assert not classify('Move on to my TFSA.').hard_stop
+    assert not classify('Remove the part about my will.').hard_stop
+    assert not classify('Can you fix the formatting of your answer about my RRSP?').hard_stop
+    assert classify('Can you take Robert off my RRIF?').hard_stop
+    assert classify('Change my TFSA so my husband is the successor holder.').hard_stop
+
+
+def test_lexical_cues_leave_opinion_questions_to_the_model():
+    intent = classify('Would you change my beneficiary if you were me?')
+    assert not intent.hard_stop and intent.score > 0
+
+
+def test_questions_about_changes_are_not_hard_stops():
+    assert classify('Can you change my TFSA beneficiary to my wife?').hard_stop
+    assert classify('Remove my ex from the RRSP').hard_stop
+    assert not classify('How do I change my TFSA beneficiary?').hard_stop
+    assert not classify('Can you explain what a successor annuitant is?').hard_stop
+
+
+def test_response_names_the_referenced_account_and_no_people():
+    client = load_book()[1]['client']
+    answer = hard_stop_response(classify('Please switch my TFSA to my sister for me'), client)
+
+    assert answer.startswith('This is where I stop')
+    assert 'TFSA beneficiary designation form' in answer
+    assert 'RRSP' not in answer
+    assert not any(part in answer for part in client['name'].split())
+
+
+def test_session_answers_change_requests_without_the_model():
+    async def run():
+        mock = await MockLLM().start()
+        client = load_book()[1]['client']
+        session = Session('s', client, analyze_estate_gaps(client))
+        pieces = [piece async for piece in session.reply(make_llm('test-key', mock.base_url), 'Can you just change the beneficiary to Tom for me?')]
+        await mock.close()
+        return session, ''.join(pieces), mock.stats()
+
+    session, answer, stats = asyncio.run(run())
+
+    assert answer.startswith('This is where I stop')
+    assert stats['requests'] == 0
+    assert session.usage[-1]['hard_stop'] and session.usage[-1]['output_tokens'] == 0
+    # Kept verbatim in memory like any hard-stop turn
+    assert session.memory.stats()['pinned_turns'] == 1
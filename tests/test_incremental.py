@@ -0,0 +1,58 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import analyze_estate_gaps
+from incremental import affected_units, apply_patch, reanalyze
+from analysis import RULES
+import copy
+import json
+
+CLIENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'config', 'clients.json')
+
+
+def load_profiles():
+    with open(CLIENTS_PATH) as f:
+        return [c['client'] for c in json.load(f)['clients']]
+
+
+def test_beneficiary_death_only_touches_death_rules():
+    profile = load_profiles()[2]
+    units = affected_units([('accounts', 0, 'beneficiary_primary', 'is_currently_alive')], profile, RULES.compile())
+
+    rule_ids = {r.rule_id for r, _ in units.values()}
+    assert rule_ids == {'T6', 'L0', 'L5'}
+
+
+def test_patch_matches_full_rerun():
+    for profile in load_profiles():
+        previous = analyze_estate_gaps(profile)
+        for i, account in enumerate(profile['accounts']):
+            patch = [{
+                'op': 'replace',
+                'path': f'/accounts/{i}/beneficiary_primary',
+                'value': {'name': 'Alex', 'relationship': 'brother', 'is_currently_alive': False}
+            }]
+            updated, _ = apply_patch(profile, patch)
+            assert reanalyze(profile, previous, patch = patch) == analyze_estate_gaps(updated)
+
+
+def test_new_profile_matches_full_rerun():
+    for profile in load_profiles():
+        previous = analyze_estate_gaps(profile)
+
+        updated = copy.deepcopy(profile)
+        updated['marital_status'] = 'divorced'
+        updated['has_will'] = True
+        updated['children'] = [{'name': 'Kid', 'is_minor': True, 'age_months': 3}]
+
+        assert reanalyze(profile, previous, new_profile = updated) == analyze_estate_gaps(updated)
+
+
+def test_added_account_falls_back_to_full_run():
+    profile = load_profiles()[0]
+    previous = analyze_estate_gaps(profile)
+    patch = [{'op': 'add', 'path': '/accounts/-', 'value': {'type': 'RRIF', 'account_id': 'WS-RRIF-9', 'balance': 250000}}]
+
+    updated, _ = apply_patch(profile, patch)
+    assert reanalyze(profile, previous, patch = patch) == analyze_estate_gaps(updated)
@@ -0,0 +1,32 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from loadtest import compare, load_scripts, run_load
+from service import load_book
+import asyncio
+
+
+def test_every_persona_has_a_script():
+    scripts = load_scripts()
+    assert {w['_profile_id'] for w in load_book()} <= set(scripts)
+    assert scripts['P002'][2] == 'Can you just change the beneficiary to Tom for me?'
+
+
+def test_load_run_reports_latency_errors_and_prompt_growth():
+    report = asyncio.run(run_load(users = 4, rounds = 2, first_token_delay = 0.0, token_delay = 0.0, reply_words = 5,
+                                  error_rate = 0.3, retries = 0, seed = 3))
+
+    scripts = load_scripts()
+    assert report['turns'] == 2 * sum(len(scripts[w['_profile_id']]) for w in load_book())
+    # Injected failures reach the user as errors when nothing retries them
+    assert report['outcomes']['error'] == report['upstream']['errors'] > 0
+    assert report['outcomes']['hard_stop'] == 4
+    assert 0 < report['ttft_p50_ms'] <= report['turn_p99_ms']
+
+    growth = list(report['prompt_tokens_by_turn'].values())
+    assert growth[1] > growth[0]
+
+    assert not compare(report, report)
+    slower = dict(report, turn_p95_ms = report['turn_p95_ms'] * 2)
+    assert compare(slower, report) == [f"turn_p95_ms {slower['turn_p95_ms']:,.3f} vs baseline {report['turn_p95_ms']:,.3f}"]
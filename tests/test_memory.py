@@ -0,0 +1,76 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from memory import ConversationMemory
+from prompt import estimate_tokens
+
+FINDINGS = [
+    {'rule': 'R3', 'severity': 'CRITICAL', 'account_type': 'RRSP'},
+    {'rule': 'T1', 'severity': 'HIGH', 'account_type': 'TFSA'}
+]
+
+
+def question(i):
+    return f"Question {i}: can you explain again how my TFSA passes to my family and what the tax looks like?"
+
+
+def answer(i):
+    return f"Answer {i}. " + "Your TFSA passes outside the estate when a successor holder is named. " * 8
+
+
+def test_long_conversation_costs_about_the_same_per_turn():
+    memory = ConversationMemory(FINDINGS, token_budget = 1500, summary_budget = 300)
+    sent = []
+    for i in range(50):
+        sent.append(estimate_tokens(memory.messages(question(i))))
+        stats = memory.add_turn(question(i), answer(i))
+
+    # Once the budget is reached the cost per turn stops growing
+    assert max(sent[15:]) < 2100
+    assert max(sent[15:]) - min(sent[15:]) < 250
+    assert stats['turns'] == 50 and stats['summarized_turns'] > 40
+    assert stats['history_tokens'] <= 1500 and stats['summary_tokens'] <= 300
+
+    messages = memory.messages()
+    assert messages[0]['content'].startswith('Summary of our conversation so far:')
+    assert [m['role'] for m in messages] == ['user', 'assistant'] * (len(messages) // 2)
+    # The newest turns are verbatim
+    assert messages[-2]['content'] == question(49)
+
+
+def test_critical_and_hard_stop_turns_are_never_folded():
+    memory = ConversationMemory(FINDINGS, token_budget = 800)
+    memory.add_turn("Please switch my RRSP beneficiary to my partner.", "This is where I stop. That decision has to be yours. Here is what you need to do yourself: ...")
+    memory.add_turn("What is the R3 issue?", "Your RRSP still names your ex-spouse.")
+    for i in range(30):
+        memory.add_turn(question(i), answer(i))
+
+    texts = [m['content'] for m in memory.messages()]
+    assert "Please switch my RRSP beneficiary to my partner." in texts
+    assert "What is the R3 issue?" in texts
+    assert memory.stats()['pinned_turns'] == 2
+
+
+def test_only_concrete_finding_references_are_pinned():
+    memory = ConversationMemory(FINDINGS, token_budget = 800)
+    memory.add_turn("Is anything critical?", "Nothing critical beyond what we covered.")
+    memory.add_turn("What does R3 mean in general?", "It is a rule about outdated designations.")
+    memory.add_turn("Tell me about my TFSA.", "Your TFSA has a successor holder named. T1 is the only note.")
+    assert memory.stats()['pinned_turns'] == 0
+
+    memory.add_turn("And the RRSP?", "R3: your RRSP still names your ex-spouse.")
+    assert memory.stats()['pinned_turns'] == 1
+
+
+def test_pinned_turns_are_capped_and_the_oldest_fold():
+    memory = ConversationMemory(FINDINGS, token_budget = 800, max_pinned = 2)
+    for i in range(4):
+        memory.add_turn(f"Pinned question {i} about R3 on my RRSP?", answer(i))
+    for i in range(30):
+        memory.add_turn(question(i), answer(i))
+
+    texts = [m['content'] for m in memory.messages()]
+    assert memory.stats()['pinned_turns'] == 2
+    assert "Pinned question 3 about R3 on my RRSP?" in texts
+    assert "Pinned question 0 about R3 on my RRSP?" not in texts
@@ -0,0 +1,96 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+import pytest
+
+from analysis import FINDINGS, RULE_EVALUATIONS, RULES, analyze_estate_gaps
+from benchmark import measure_rule_costs
+from metrics import REGISTRY, TELEMETRY, enable, traces
+from mock_llm import MockLLM
+from service import LLM_FIRST_TOKEN_SECONDS, LLM_SECONDS, LLM_TOKENS, ChatService, load_book, make_llm
+from synthetic import REFERENCE_DATE, generate_book
+from web import server_port, start_server
+import asyncio
+import httpx
+import re
+import subprocess
+
+
+@pytest.fixture
+def telemetry():
+    REGISTRY.reset()
+    enable()
+    yield
+    enable(False)
+    REGISTRY.reset()
+
+
+def test_the_engine_does_not_load_the_http_layer():
+    env = dict(os.environ, PYTHONPATH = os.path.join(os.path.dirname(__file__), '..', 'backend'))
+    code = "import sys, analysis, bulk; assert 'web' not in sys.modules, 'web imported'"
+    result = subprocess.run([sys.executable, '-c', code], env = env, capture_output = True, text = True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_nothing_is_recorded_while_disabled():
+    REGISTRY.reset()
+    for wrapper in generate_book(50, seed = 2):
+        analyze_estate_gaps(wrapper['client'], as_of = REFERENCE_DATE)
+    assert not TELEMETRY.enabled and not RULES.timing
+    assert not FINDINGS.values and not RULE_EVALUATIONS.values and not TELEMETRY.spans
+
+
+def test_rule_and_severity_counts_match_the_findings(telemetry):
+    severities = {}
+    for wrapper in generate_book(200, seed = 4):
+        for f in analyze_estate_gaps(wrapper['client'], as_of = REFERENCE_DATE):
+            severities[f['severity']] = severities.get(f['severity'], 0) + 1
+
+    assert {labels[0]: n for labels, n in FINDINGS.values.items()} == severities
+    assert sum(r.calls for r in RULES.rules) >= sum(RULE_EVALUATIONS.values.values()) > 0
+    assert len([s for s in traces() if s['name'] == 'analysis']) == 200
+
+    text = REGISTRY.render()
+    sample = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? [0-9.e+-]+$')
+    for line in text.splitlines():
+        assert line.startswith('# ') or sample.match(line), line
+    assert 'estate_rule_seconds_bucket{rule="L0",le="+Inf"}' in text
+
+
+def test_profiling_leaves_telemetry_timing_on(telemetry):
+    measure_rule_costs([w['client'] for w in generate_book(5, seed = 1)], REFERENCE_DATE)
+    assert RULES.timing
+
+
+def test_a_chat_turn_is_traced_from_analysis_to_model_call(telemetry):
+    async def run():
+        mock = await MockLLM(token_delay = 0.001, reply_words = 5).start()
+        service = ChatService(make_llm('test-key', mock.base_url), load_book(), response_cache = None)
+        server = await start_server(service.handle)
+        async with httpx.AsyncClient(base_url = f"http://127.0.0.1:{server_port(server)}", timeout = 30) as http:
+            session_id = (await http.post('/sessions', json = {'client_index': 1})).json()['session_id']
+            async with http.stream('POST', f'/sessions/{session_id}/messages', json = {'content': 'What should I review first?'}) as response:
+                await response.aread()
+            scraped = await http.get('/metrics')
+        server.close()
+        await server.wait_closed()
+        await mock.close()
+        return service.sessions[session_id], scraped
+
+    session, scraped = asyncio.run(run())
+
+    spans = {s['name']: s for s in traces(session.trace.trace_id)}
+    assert set(spans) == {'session.open', 'analysis', 'prompt.build', 'chat.turn', 'llm.call'}
+    assert spans['analysis']['parent_id'] == spans['prompt.build']['parent_id'] == spans['session.open']['span_id']
+    assert spans['chat.turn']['parent_id'] == spans['session.open']['span_id']
+    assert spans['llm.call']['parent_id'] == spans['chat.turn']['span_id']
+
+    model = spans['llm.call']['attributes']['model']
+    usage = session.usage[-1]
+    assert LLM_SECONDS.count(model) == LLM_FIRST_TOKEN_SECONDS.count(model) == 1
+    assert LLM_TOKENS.value(model, 'output') == usage['output_tokens'] > 0
+    assert LLM_TOKENS.value(model, 'cache_write') == usage['cache_write_tokens']
+
+    assert scraped.status_code == 200 and scraped.headers['content-type'].startswith('text/plain')
+    assert 'estate_chat_turns_total{outcome="model"} 1' in scraped.text
@@ -0,0 +1,103 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import analyze_estate_gaps, normalize_name
+from incremental import reanalyze
+from persons import index_book
+from synthetic import REFERENCE_DATE, generate_book
+import copy
+
+
+def designee(name, **extra):
+    return dict({'name': name, 'relationship': 'friend', 'is_currently_alive': True}, **extra)
+
+
+def shared_book():
+    # The same person designated across five households, spelled differently.
+    # Three of them have the date of birth on file.
+    book = generate_book(200, seed = 8)
+    spellings = ['Dr. Alex Moreau', 'alex moreau', 'ALEX  MOREAU', 'Alex Moreau', 'Alex Moreau']
+    for n, (wrapper, spelling) in enumerate(zip(book[10:60:10], spellings)):
+        dob = {'date_of_birth': '1975-06-30'} if n < 3 else {}
+        wrapper['client']['accounts'][0]['beneficiary_primary'] = designee(spelling, **dob)
+    # A different Alex Moreau, told apart by date of birth
+    book[100]['client']['accounts'][0]['beneficiary_primary'] = designee('Alex Moreau', date_of_birth = '1990-01-01')
+    return book
+
+
+def test_names_are_normalized():
+    assert normalize_name("Dr. Zoë  O'Brien-Smith") == normalize_name('zoe obrien smith')
+    assert normalize_name('John Smith Sr.') == normalize_name('john smith senior') != normalize_name('John Smith Jr.')
+    assert normalize_name(None) is None
+
+    client = copy.deepcopy(generate_book(1, seed = 0)[0]['client'])
+    client['children'] = [{'name': 'Lily Kowalski', 'is_minor': True}]
+    client['accounts'] = [{'type': 'RRSP', 'account_id': 'A', 'balance': 1000, 'beneficiary_primary': {'name': 'lily kowalski', 'relationship': 'daughter'}}]
+    assert 'R5' in [f['rule'] for f in analyze_estate_gaps(client)]
+
+
+def test_death_reaches_every_household_that_names_the_person():
+    book = shared_book()
+    before = {w['_profile_id']: copy.deepcopy(w['client']) for w in book}
+    index = index_book(book)
+
+    patches = index.record_death('Alex Moreau', dob = '1975-06-30')
+    confirmed = {w['_profile_id'] for w in book[10:40:10]}
+    assert set(patches) == confirmed and index.drain_dirty() == confirmed
+
+    for client_id, patch in patches.items():
+        profile = index.profiles[client_id]
+        assert profile['accounts'][0]['beneficiary_primary']['is_currently_alive'] is False
+        # Patches feed straight into incremental re-analysis
+        previous = analyze_estate_gaps(before[client_id], as_of = REFERENCE_DATE)
+        assert reanalyze(before[client_id], previous, patch = patch, as_of = REFERENCE_DATE) == analyze_estate_gaps(profile, as_of = REFERENCE_DATE)
+
+    # Matches on name alone are queued for review, not patched, and the
+    # Alex Moreau with another date of birth is left out altogether
+    name_only = {w['_profile_id'] for w in book[40:60:10]}
+    assert {ref.client_id for ref in index.review[-1][1]} == name_only
+    for wrapper in book[40:60:10] + [book[100]]:
+        assert index.profiles[wrapper['_profile_id']]['accounts'][0]['beneficiary_primary']['is_currently_alive'] is True
+    assert len(index.lookup('alex moreau')) == 6
+
+
+def test_same_name_strangers_are_not_merged():
+    book = generate_book(50, seed = 9)
+    book[3]['client']['accounts'][0]['beneficiary_primary'] = designee('John Smith Sr.', relationship = 'father')
+    book[7]['client']['accounts'][0]['beneficiary_primary'] = designee('John Smith Jr.', relationship = 'son')
+    book[9]['client']['accounts'][0]['beneficiary_primary'] = designee('John Smith Sr.')
+    index = index_book(book)
+
+    # Reported by the household that names him as father: only that
+    # reference is corroborated; the other John Smith Sr. needs review
+    patches = index.record_death('John Smith Sr.', client_id = book[3]['_profile_id'], relationship = 'father')
+    assert set(patches) == {book[3]['_profile_id']}
+    assert [ref.client_id for ref in index.review[-1][1]] == [book[9]['_profile_id']]
+    assert index.profiles[book[7]['_profile_id']]['accounts'][0]['beneficiary_primary']['is_currently_alive'] is True
+
+    # A name alone patches nothing
+    assert index.record_death('John Smith Jr.') == {}
+
+
+def test_divorce_marks_designations_and_reindexes():
+    book = shared_book()
+    index = index_book(book)
+    wrapper = next(
+        w for w in book
+        if w['client'].get('marital_status') == 'married'
+        and any(ref.client_id == w['_profile_id'] and ref.is_designation for ref in index.lookup(w['client']['spouse']['name']))
+    )
+    client_id = wrapper['_profile_id']
+    spouse = wrapper['client']['spouse']['name']
+
+    index.record_divorce(client_id)
+    profile = index.profiles[client_id]
+
+    assert profile['marital_status'] == 'divorced'
+    named = [ref for ref in index.lookup(spouse) if ref.client_id == client_id and ref.is_designation]
+    assert named and all(profile['accounts'][ref.path[1]][ref.path[2]]['is_currently_spouse'] is False for ref in named)
+    assert 'L2' in [f['rule'] for f in analyze_estate_gaps(profile, as_of = REFERENCE_DATE)]
+
+    index.remove_household(client_id)
+    assert all(ref.client_id != client_id for ref in index.lookup(spouse))
@@ -0,0 +1,94 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import analyze_estate_gaps
+from pipeline import EventLog, Pipeline
+from synthetic import REFERENCE_DATE, generate_book
+import json
+
+CLIENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'config', 'clients.json')
+
+
+def load_wrappers():
+    with open(CLIENTS_PATH) as f:
+        return json.load(f)['clients']
+
+
+def rules(findings):
+    return [f['rule'] for f in findings]
+
+
+def test_bursts_are_coalesced_per_household(tmp_path):
+    log = EventLog(str(tmp_path / 'events.ndjson'))
+    flushed = []
+    pipeline = Pipeline(load_wrappers(), log.path, str(tmp_path / 'state'), window = 2.0, as_of = REFERENCE_DATE, sink = lambda client_id, profile, findings: flushed.append(client_id))
+
+    # Marcus writes a will and names his wife on the TFSA in one sitting
+    log.append({'type': 'will_updated', 'client_id': 'P001', 'date': '2025-10-01'})
+    log.append({'type': 'designation_updated', 'client_id': 'P001', 'account_id': 'WS-TFSA-001', 'slot': 'successor_holder',
+                'person': {'name': 'Priya Reid', 'relationship': 'spouse', 'is_currently_spouse': True, 'is_currently_alive': True}})
+    log.append({'type': 'child_born', 'client_id': 'P005', 'child': {'name': 'Maya'}, 'date': '2025-09-01'})
+
+    assert pipeline.poll(now = 100.0) == [] and set(pipeline.pending) == {'P001', 'P005'}
+    with open(log.path, 'a') as f:
+        f.write(json.dumps({'type': 'account_closed', 'client_id': 'P001'}) + '\n')
+    log.append({'type': 'designation_updated', 'client_id': 'P001', 'account_id': 'missing', 'slot': 'successor_holder', 'person': None})
+    assert pipeline.poll(now = 101.5) == []
+    assert len(pipeline.rejected) == 2
+
+    assert pipeline.poll(now = 103.0) == ['P001', 'P005'] and flushed == ['P001', 'P005']
+    for client_id in flushed:
+        profile = pipeline.index.profiles[client_id]
+        assert pipeline.findings(client_id) == analyze_estate_gaps(profile, as_of = REFERENCE_DATE)
+
+    assert 'L0' not in rules(pipeline.findings('P001'))
+    assert 'L3' in rules(pipeline.findings('P005'))
+    assert pipeline.index.profiles['P001']['accounts'][0]['successor_holder']['name'] == 'Priya Reid'
+
+
+def test_restart_resumes_without_reapplying_events(tmp_path):
+    log = EventLog(str(tmp_path / 'events.ndjson'))
+    state = str(tmp_path / 'state')
+    pipeline = Pipeline(load_wrappers(), log.path, state, window = 0.0, max_delay = 60.0, as_of = REFERENCE_DATE)
+
+    log.append({'type': 'child_born', 'client_id': 'P003', 'child': {'name': 'Ada'}})
+    pipeline.poll(now = 0.0)
+    log.append({'type': 'child_born', 'client_id': 'P003', 'child': {'name': 'Ben'}})
+    log.append({'type': 'married', 'client_id': 'P005', 'spouse': {'name': 'Sam Lee'}, 'date': '2025-08-01'})
+    pipeline.ingest(now = 1.0)
+    pipeline.flush(['P003'])
+
+    # P005 was still pending, so the log checkpoint stays behind its event,
+    # and the replayed child_born must not be applied to P003 a second time
+    restarted = Pipeline(load_wrappers(), log.path, state, window = 0.0, as_of = REFERENCE_DATE)
+    assert restarted.drain() == ['P005']
+    assert [c['name'] for c in restarted.index.profiles['P003']['children']][-2:] == ['Ada', 'Ben']
+    assert len(restarted.index.profiles['P003']['children']) == 3
+    assert 'L1' in rules(restarted.findings('P005'))
+
+    again = Pipeline(load_wrappers(), log.path, state, window = 0.0, as_of = REFERENCE_DATE)
+    assert again.drain() == []
+
+
+def test_death_re_analyses_every_household_naming_the_person(tmp_path):
+    book = generate_book(300, seed = 2)
+    named = book[5:50:9]
+    for wrapper in named:
+        wrapper['client']['accounts'][0]['beneficiary_primary'] = {'name': 'Jordan Blake', 'relationship': 'friend', 'is_currently_alive': True, 'date_of_birth': '1961-02-14'}
+    # Someone else with the same name and no date of birth on file
+    stranger = book[200]
+    stranger['client']['accounts'][0]['beneficiary_primary'] = {'name': 'Jordan Blake', 'relationship': 'friend', 'is_currently_alive': True}
+
+    log = EventLog(str(tmp_path / 'events.ndjson'))
+    pipeline = Pipeline(book, log.path, str(tmp_path / 'state'), as_of = REFERENCE_DATE)
+    log.append({'type': 'beneficiary_died', 'name': 'jordan blake', 'dob': '1961-02-14'})
+
+    assert sorted(pipeline.drain()) == sorted(w['_profile_id'] for w in named)
+    assert pipeline.index.profiles[stranger['_profile_id']]['accounts'][0]['beneficiary_primary']['is_currently_alive'] is True
+    assert [ref.client_id for _, refs in pipeline.index.review for ref in refs] == [stranger['_profile_id']]
+    for wrapper in named:
+        profile = pipeline.index.profiles[wrapper['_profile_id']]
+        assert profile['accounts'][0]['beneficiary_primary']['is_currently_alive'] is False
+        assert pipeline.findings(wrapper['_profile_id']) == analyze_estate_gaps(profile, as_of = REFERENCE_DATE)
+    assert all(latency < 5 for latency in pipeline.latencies)
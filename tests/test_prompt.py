@@ -0,0 +1,56 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import analyze_estate_gaps
+from prompt import STATIC_PROMPT, build_system_prompt, turn_usage, with_cache_breakpoint
+from types import SimpleNamespace
+import copy
+import json
+
+CLIENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'config', 'clients.json')
+
+
+def load_profiles():
+    with open(CLIENTS_PATH) as f:
+        return [c['client'] for c in json.load(f)['clients']]
+
+
+def test_static_prefix_is_shared_and_client_block_is_reused():
+    a, b = load_profiles()[:2]
+    prompt_a = build_system_prompt(a, analyze_estate_gaps(a))
+    prompt_b = build_system_prompt(b, analyze_estate_gaps(b))
+
+    assert prompt_a[0] == prompt_b[0] and prompt_a[0]['text'] == STATIC_PROMPT
+    assert all(block['cache_control'] == {'type': 'ephemeral'} for block in prompt_a)
+    assert a['name'] not in STATIC_PROMPT and a['name'] in prompt_a[1]['text']
+
+    # Same profile with keys in another order — the identical block comes back
+    reordered = dict(reversed(list(copy.deepcopy(a).items())))
+    assert build_system_prompt(reordered, analyze_estate_gaps(a))[1]['text'] is prompt_a[1]['text']
+    assert '\n  ' not in prompt_a[1]['text'].split('FINDINGS')[0]
+
+    changed = copy.deepcopy(a)
+    changed['has_will'] = True
+    assert build_system_prompt(changed, analyze_estate_gaps(changed))[1] != prompt_a[1]
+
+
+def test_cache_breakpoint_on_last_message_only():
+    history = [
+        {'role': 'user', 'content': 'What happens to my RRSP?'},
+        {'role': 'assistant', 'content': 'It goes to your estate.'},
+        {'role': 'user', 'content': 'Why?'}
+    ]
+    marked = with_cache_breakpoint(history)
+
+    assert marked[:2] == history[:2]
+    assert marked[2]['content'] == [{'type': 'text', 'text': 'Why?', 'cache_control': {'type': 'ephemeral'}}]
+    assert history[2]['content'] == 'Why?'
+
+
+def test_turn_usage_splits_cached_input():
+    usage = SimpleNamespace(input_tokens = 20, cache_creation_input_tokens = 0, cache_read_input_tokens = 1980, output_tokens = 150)
+    turn = turn_usage(usage)
+
+    assert turn['input_tokens'] == 2000
+    assert turn['cached_ratio'] == 0.99
@@ -0,0 +1,98 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import analyze_estate_gaps
+from mock_llm import MockLLM
+from response_cache import ResponseCache, findings_fingerprint, normalize_question
+from service import ChatService, load_book, make_llm
+import asyncio
+import copy
+
+
+def renamed(client, suffix):
+    client = copy.deepcopy(client)
+    client['name'] = f"Client {suffix}"
+    for account in client['accounts']:
+        for slot in ('successor_holder', 'successor_annuitant', 'beneficiary_primary'):
+            if account.get(slot):
+                account[slot]['name'] = f"Person {suffix}"
+    return client
+
+
+def test_key_ignores_names_punctuation_and_filler():
+    sandra = load_book()[1]['client']
+    other = renamed(sandra, 'B')
+
+    assert findings_fingerprint(analyze_estate_gaps(sandra)) == findings_fingerprint(analyze_estate_gaps(other))
+    assert findings_fingerprint(analyze_estate_gaps(sandra)) != findings_fingerprint(analyze_estate_gaps(load_book()[0]['client']))
+    assert normalize_question("Hi, so... What happens to my RRSP if I die tomorrow?") == normalize_question("what happens to my rrsp if i die tomorrow")
+
+
+def test_clients_with_different_amounts_do_not_share_answers():
+    gerald = load_book()[3]['client']
+    richer = renamed(gerald, 'C')
+    for account in richer['accounts']:
+        if account['type'] == 'RRIF':
+            account['balance'] *= 2
+    # The same issues, but a different R7 bill
+    assert [f['issue'] for f in analyze_estate_gaps(gerald)] == [f['issue'] for f in analyze_estate_gaps(richer)]
+
+    cache = ResponseCache()
+    first = findings_fingerprint(analyze_estate_gaps(gerald))
+    second = findings_fingerprint(analyze_estate_gaps(richer))
+    assert first != second
+    assert cache.put('What will my estate owe?', first, 'About $128,069 in tax and probate on the RRIF.', gerald)
+    assert cache.get('What will my estate owe?', second) is None
+
+
+def test_ttl_lru_bypass_and_client_specific_answers():
+    now = [0.0]
+    cache = ResponseCache(ttl = 60, max_entries = 2, clock = lambda: now[0])
+    client = load_book()[1]['client']
+
+    assert cache.put('Should I be worried?', 'fp', 'Yes — a few things need attention.', client)
+    assert cache.get('should i be worried', 'fp') == 'Yes — a few things need attention.'
+
+    # Hard-stop intents never touch the cache
+    assert cache.get('Can you just change the beneficiary to Tom for me?', 'fp') is None
+    assert not cache.put('Can you just change the beneficiary to Tom for me?', 'fp', 'Sure')
+
+    # Nothing that names a person or quotes a balance is shared
+    assert not cache.put('Who gets my TFSA?', 'fp', 'Robert would receive it.', client)
+    assert not cache.put('How much is in my RRSP?', 'fp', 'You have $198,400 there.', client)
+
+    cache.put('a', 'fp', 'A')
+    cache.put('b', 'fp', 'B')
+    assert cache.get('should i be worried', 'fp') is None
+
+    now[0] = 61
+    assert cache.get('b', 'fp') is None
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['bypasses'], stats['rejected'], stats['evictions'], stats['expirations']) == (1, 1, 2, 1, 1)
+
+
+def test_repeated_first_question_skips_the_model():
+    async def run():
+        mock = await MockLLM().start()
+        book = load_book()
+        service = ChatService(make_llm('test-key', mock.base_url), book, response_cache = ResponseCache())
+
+        answers = []
+        for client in (book[1]['client'], renamed(book[1]['client'], 'B'), renamed(book[1]['client'], 'C')):
+            session = service.create_session(client)
+            answers.append(''.join([piece async for piece in session.reply(service.llm, 'Should I be worried about anything?', cache = service.response_cache)]))
+
+        # Later turns always go to the model
+        follow_up = [piece async for piece in session.reply(service.llm, 'Should I be worried about anything?', cache = service.response_cache)]
+        await mock.close()
+        return answers, follow_up, session, mock.stats(), service.response_cache.stats()
+
+    answers, follow_up, session, mock_stats, cache_stats = asyncio.run(run())
+
+    assert answers[0] == answers[1] == answers[2]
+    assert mock_stats['requests'] == 2
+    assert cache_stats['hits'] == 2
+    assert session.usage[0]['cached_response'] and not session.usage[1]['cached_response']
+    assert ''.join(follow_up).startswith('Mock reply 2')
@@ -0,0 +1,116 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+import pytest
+
+from analysis import RULE_PACK, ClientIndex, analyze_estate_gaps
+from cache import FindingsCache
+from incremental import reanalyze
+from rulepack import DEFAULT_PATH, RulePackError, RulePackHolder
+from synthetic import REFERENCE_DATE, generate_book
+from vectorized import analyze_book_vectorized
+import json
+
+
+def write_pack(path, **changes):
+    with open(DEFAULT_PATH) as f:
+        document = json.load(f)
+    document.update(changes)
+    with open(path, 'w') as f:
+        json.dump(document, f)
+    return str(path)
+
+
+@pytest.fixture
+def provincial_pack(tmp_path):
+    path = write_pack(tmp_path / 'pack.json', version = 'test-provincial', provinces = {
+        'Quebec': {'civil_law': True},
+        'ON': {'cohabitation_months': 36, 'will_outdated_years': 5},
+        'Alberta': {'rrif_liquidity_min_balance': 500000, 'newborn_months': 24}
+    })
+    RULE_PACK.reload(path)
+    yield path
+    RULE_PACK.reload(DEFAULT_PATH)
+
+
+def test_province_overrides_apply_in_both_engines(provincial_pack):
+    client = {'name': 'Test', 'province': 'Ontario', 'has_will': True, 'accounts': [],
+              'current_partner': {'name': 'Sam', 'months_living_together': 20}}
+    assert 'L5' not in [f['rule'] for f in analyze_estate_gaps(client, as_of = REFERENCE_DATE)]
+    client['province'] = 'Manitoba'
+    assert 'L5' in [f['rule'] for f in analyze_estate_gaps(client, as_of = REFERENCE_DATE)]
+
+    book = [w['client'] for w in generate_book(1500, seed = 12)]
+    assert analyze_book_vectorized(book, REFERENCE_DATE) == [analyze_estate_gaps(p, as_of = REFERENCE_DATE) for p in book]
+
+    # Moving province re-runs the threshold rules incrementally
+    previous = analyze_estate_gaps(client, as_of = REFERENCE_DATE)
+    patch = [{'op': 'replace', 'path': '/province', 'value': 'Ontario'}]
+    assert reanalyze(client, previous, patch = patch, as_of = REFERENCE_DATE) == analyze_estate_gaps(dict(client, province = 'Ontario'), as_of = REFERENCE_DATE)
+
+
+def test_invalid_packs_are_rejected(tmp_path):
+    bad = [
+        {'defaults': {'civil_law': False, 'rrif_liquidity_min_balance': 100000, 'will_outdated_years': 10, 'cohabitation_months': 12}},
+        {'provinces': {'Atlantis': {'civil_law': True}}},
+        {'provinces': {'Ontario': {'will_outdated_years': True}}},
+        {'provinces': {'Ontario': {'cohabitation_months': -1}}},
+        {'severity_order': ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']},
+        {'version': ''}
+    ]
+    for i, changes in enumerate(bad):
+        with pytest.raises(RulePackError):
+            RulePackHolder(write_pack(tmp_path / f'bad{i}.json', **changes), RULE_PACK.severities)
+
+
+def test_reload_swaps_atomically_and_feeds_cache_keys(tmp_path):
+    path = write_pack(tmp_path / 'pack.json')
+    holder = RulePackHolder(path, RULE_PACK.severities)
+    client = generate_book(1, seed = 1)[0]['client']
+    index = ClientIndex(client, REFERENCE_DATE, holder.current)
+
+    write_pack(path, version = '2025.2', defaults = dict(holder.current.provinces['Ontario'].to_dict(), civil_law = False, will_outdated_years = 3))
+    os.utime(path, ns = (0, 1))
+    assert holder.reload_if_changed().version == '2025.2'
+    # An analysis that had already started keeps the pack it began with
+    assert index.pack.version == '2025.1' and index.thresholds.will_outdated_years == 10
+
+    # A broken edit is reported and the running pack stays in place
+    with open(path, 'w') as f:
+        f.write('{"version": ')
+    os.utime(path, ns = (0, 2))
+    assert holder.reload_if_changed().version == '2025.2' and holder.error
+
+    cache = FindingsCache()
+    before = cache.key(client, REFERENCE_DATE)
+    RULE_PACK.reload(write_pack(tmp_path / 'next.json', version = 'next'))
+    try:
+        assert cache.key(client, REFERENCE_DATE) != before
+    finally:
+        RULE_PACK.reload(DEFAULT_PATH)
+
+
+def test_new_thresholds_under_the_same_version_change_cache_keys(tmp_path):
+    client = generate_book(1, seed = 1)[0]['client']
+    cache = FindingsCache()
+    before = cache.key(client, REFERENCE_DATE)
+    identity = RULE_PACK.current.identity
+
+    # Reformatting the file leaves the compiled pack, and the keys, alone
+    with open(DEFAULT_PATH) as f:
+        document = json.load(f)
+    reformatted = tmp_path / 'reformatted.json'
+    reformatted.write_text(json.dumps(document, indent = 4))
+    RULE_PACK.reload(str(reformatted))
+    try:
+        assert RULE_PACK.current.identity == identity
+        assert cache.key(client, REFERENCE_DATE) == before
+
+        defaults = dict(document['defaults'], will_outdated_years = document['defaults']['will_outdated_years'] + 1)
+        RULE_PACK.reload(write_pack(tmp_path / 'edited.json', defaults = defaults))
+        assert RULE_PACK.current.version == document['version']
+        assert RULE_PACK.current.identity != identity
+        assert cache.key(client, REFERENCE_DATE) != before
+    finally:
+        RULE_PACK.reload(DEFAULT_PATH)
@@ -0,0 +1,131 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from mock_llm import MockLLM
+from service import ChatService, load_book, make_llm
+from web import ChunkedResponse, server_port, start_server
+import asyncio
+import httpx
+import json
+
+
+async def read_events(response):
+    events = []
+    event = None
+    async for line in response.aiter_lines():
+        if line.startswith('event: '):
+            event = line[len('event: '):]
+        elif line.startswith('data: '):
+            events.append((event, json.loads(line[len('data: '):])))
+    return events
+
+
+async def run_conversations(sessions, turns, max_connections):
+    mock = await MockLLM(token_delay = 0.001, reply_words = 5).start()
+    service = ChatService(make_llm('test-key', mock.base_url, max_connections), load_book())
+    server = await start_server(service.handle)
+
+    async with httpx.AsyncClient(base_url = f"http://127.0.0.1:{server_port(server)}", timeout = 30) as http:
+
+        async def conversation(i):
+            created = await http.post('/sessions', json = {'client_index': i % 5})
+            assert created.status_code == 201
+            session_id = created.json()['session_id']
+
+            replies = []
+            for turn in range(turns):
+                async with http.stream('POST', f'/sessions/{session_id}/messages', json = {'content': f"question {turn}"}) as response:
+                    events = await read_events(response)
+                deltas = [data['text'] for event, data in events if event == 'delta']
+                assert len(deltas) > 1 and events[-1][0] == 'done'
+                replies.append(''.join(deltas))
+            return session_id, replies
+
+        results = await asyncio.gather(*[conversation(i) for i in range(sessions)])
+        history = (await http.get(f'/sessions/{results[0][0]}')).json()
+
+    server.close()
+    await mock.close()
+    return results, history, mock.stats()
+
+
+def test_concurrent_sessions_stream_over_a_shared_pool():
+    results, history, stats = asyncio.run(run_conversations(sessions = 12, turns = 2, max_connections = 4))
+
+    for _, replies in results:
+        assert replies[0].startswith('Mock reply 1 to: question 0')
+        # The second turn was sent with the first one in its history
+        assert replies[1].startswith('Mock reply 2 to: question 1')
+
+    assert len(history['history']) == 4 and len(history['usage']) == 2
+    # Later turns read the shared system prompt from the provider cache
+    assert history['usage'][1]['cache_read_tokens'] > 0
+
+    assert stats['requests'] == 24
+    assert stats['connections'] <= 4
+
+
+def test_upstream_errors_are_reported_and_not_kept():
+    async def run():
+        mock = await MockLLM().start()
+        service = ChatService(make_llm('test-key', mock.base_url), load_book(), model = 'mock-error-429')
+        service.llm = service.llm.with_options(max_retries = 0)
+        server = await start_server(service.handle)
+        async with httpx.AsyncClient(base_url = f"http://127.0.0.1:{server_port(server)}") as http:
+            session_id = (await http.post('/sessions', json = {'client_index': 1})).json()['session_id']
+            async with http.stream('POST', f'/sessions/{session_id}/messages', json = {'content': 'hello'}) as response:
+                events = await read_events(response)
+            missing = await http.post('/sessions/nope/messages', json = {'content': 'hello'})
+        server.close()
+        await mock.close()
+        return events, service.sessions[session_id], missing.status_code
+
+    events, session, missing_status = asyncio.run(run())
+
+    assert events == [('error', {'status': 429, 'message': events[0][1]['message']})]
+    assert session.memory.messages() == []
+    assert missing_status == 404
+
+
+def test_failures_after_the_stream_starts_stay_inside_it():
+    async def run():
+        mock = await MockLLM(reply_words = 5).start()
+        service = ChatService(make_llm('test-key', mock.base_url), load_book(), response_cache = None)
+        server = await start_server(service.handle)
+
+        async def broken(request, writer):
+            response = ChunkedResponse(writer)
+            await response.start()
+            await response.event('delta', {'text': 'partial'})
+            raise RuntimeError('secret detail')
+        raw_server = await start_server(broken)
+
+        async with httpx.AsyncClient(base_url = f"http://127.0.0.1:{server_port(server)}") as http:
+            session_id = (await http.post('/sessions', json = {'client_index': 1})).json()['session_id']
+            session = service.sessions[session_id]
+
+            async def failing_reply(*args, **kwargs):
+                yield 'Hello'
+                raise KeyError('secret detail')
+            session.reply = failing_reply
+
+            async with http.stream('POST', f'/sessions/{session_id}/messages', json = {'content': 'hello'}) as response:
+                events = await read_events(response)
+
+        reader, writer = await asyncio.open_connection('127.0.0.1', server_port(raw_server))
+        writer.write(b'GET / HTTP/1.1\r\nHost: x\r\n\r\n')
+        raw = await reader.read()
+        writer.close()
+
+        for s in (server, raw_server):
+            s.close()
+        await mock.close()
+        return events, raw.decode('latin-1')
+
+    events, raw = asyncio.run(run())
+
+    assert events == [('delta', {'text': 'Hello'}), ('error', {'status': 500, 'message': 'Internal error'})]
+    # No second status line inside the open chunked body, and no details
+    assert raw.count('HTTP/1.1') == 1 and 'partial' in raw
+    assert 'secret detail' not in raw
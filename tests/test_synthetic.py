@@ -0,0 +1,43 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+from analysis import analyze_estate_gaps
+from benchmark import compare, run_benchmark
+from synthetic import REFERENCE_DATE, ProfileGenerator, generate_book
+
+
+def test_generator_is_seeded():
+    book = generate_book(40, seed = 3)
+
+    assert generate_book(40, seed = 3) == book
+    assert generate_book(40, seed = 4) != book
+    # Profile n does not depend on how many came before it
+    assert list(ProfileGenerator(3).generate(10, start = 30)) == book[30:]
+
+
+def test_generator_honours_scale_knobs():
+    book = generate_book(200, seed = 1, accounts = (2, 4), children = (1, 1), events = (0, 0))
+
+    assert all(2 <= len(w['client']['accounts']) <= 4 for w in book)
+    assert all(len(w['client']['children']) == 1 for w in book)
+    assert all(w['_events'] == [] for w in book)
+
+
+def test_generated_book_exercises_every_rule():
+    fired = set()
+    for wrapper in generate_book(2000, seed = 0):
+        fired.update(f['rule'] for f in analyze_estate_gaps(wrapper['client'], as_of = REFERENCE_DATE))
+
+    assert fired >= {'Q1', 'T1', 'T3', 'T6', 'R1', 'R3', 'R4', 'R6', 'R7', 'C6', 'L0', 'L1', 'L2', 'L3', 'L5', 'C2', 'C5'}
+
+
+def test_benchmark_flags_regressions():
+    report = run_benchmark(clients = 50, repeat = 1)
+    assert report['clients_per_sec'] > 0
+    assert report['p99_us'] >= report['p50_us']
+    assert 'C6' in report['rules']
+
+    assert compare(report, report) == []
+    slower = dict(report, clients_per_sec = report['clients_per_sec'] * 0.5)
+    assert compare(slower, report) and compare(report, dict(report, p99_us = report['p99_us'] / 2))
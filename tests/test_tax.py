@@ -0,0 +1,129 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from analysis import analyze_estate_gaps
+from exposure import household_exposure, parse_scenario, simulate_book
+from synthetic import REFERENCE_DATE, generate_book
+from tax import ASSUMED_LABEL, PROVINCE_NAMES, TABLES, deemed_income_tax, income_tax, probate_fee
+from vectorized import analyze_book_vectorized
+import argparse
+import copy
+import json
+
+CLIENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'config', 'clients.json')
+
+
+def load_profiles():
+    with open(CLIENTS_PATH) as f:
+        return [c['client'] for c in json.load(f)['clients']]
+
+
+def test_brackets_and_probate_by_province():
+    # $100,000 in Ontario: federal 6,187 + 8,738; Ontario 2,027 + 4,311
+    assert round(income_tax(100000, 'Ontario')) == 21263
+    # Quebec residents get the federal abatement
+    assert income_tax(100000, 'QC') == income_tax(100000, 'Quebec')
+    assert income_tax(100000, 'Quebec') - income_tax(100000, 'Ontario') > 4000
+
+    assert probate_fee(500000, 'Ontario') == 6750
+    assert probate_fee(500000, 'Alberta') == 525
+    assert probate_fee(500000, 'Manitoba') == 0
+    assert probate_fee(0, 'Ontario') == 0
+
+
+def test_scalar_and_array_forms_agree_to_the_dollar():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 2000000, 2000).astype(np.float64)
+    codes = rng.integers(0, len(PROVINCE_NAMES), 2000)
+    income = rng.integers(0, 300000, 2000).astype(np.float64)
+
+    taxes = TABLES.deemed_income_tax(values, codes, income)
+    fees = TABLES.probate_fee(values, codes)
+    for i in range(len(values)):
+        assert taxes[i] == deemed_income_tax(values[i], PROVINCE_NAMES[codes[i]], income[i])
+        assert fees[i] == probate_fee(values[i], PROVINCE_NAMES[codes[i]])
+
+
+def test_r7_uses_real_tax_and_both_engines_agree():
+    rrif_client = load_profiles()[3]
+    r7 = [f for f in analyze_estate_gaps(rrif_client) if f['rule'] == 'R7'][0]
+    assert '$312,000' in r7['consequence'] and 'Ontario' in r7['consequence']
+
+    # Enough non-registered money to pay the bill clears R7
+    covered = copy.deepcopy(rrif_client)
+    for account in covered['accounts']:
+        if account['type'] == 'non-registered':
+            account['balance'] = 150000
+    assert not [f for f in analyze_estate_gaps(covered) if f['rule'] == 'R7']
+
+    book = [w['client'] for w in generate_book(500, seed = 11)]
+    assert analyze_book_vectorized(book, REFERENCE_DATE) == [analyze_estate_gaps(p, as_of = REFERENCE_DATE) for p in book]
+
+
+def test_r7_bill_allows_for_rollover_and_designees():
+    gerald = load_profiles()[3]
+    rrif = next(a for a in gerald['accounts'] if a['type'] == 'RRIF')
+    full_bill = deemed_income_tax(312000, 'Ontario') + probate_fee(312000, 'Ontario')
+    assert f"${full_bill:,}" in [f for f in analyze_estate_gaps(gerald) if f['rule'] == 'R7'][0]['consequence']
+
+    # A living adult child as beneficiary keeps the RRIF out of probate; the tax is still due
+    child = copy.deepcopy(gerald)
+    next(a for a in child['accounts'] if a['type'] == 'RRIF')['beneficiary_primary'] = {
+        'name': 'Patricia Whitmore', 'relationship': 'daughter', 'is_currently_alive': True}
+    r7 = [f for f in analyze_estate_gaps(child) if f['rule'] == 'R7'][0]
+    assert f"${deemed_income_tax(rrif['balance'], 'Ontario'):,}" in r7['consequence']
+
+    # A living spouse as successor annuitant rolls it over: no tax, no probate, no R7
+    spouse = copy.deepcopy(gerald)
+    next(a for a in spouse['accounts'] if a['type'] == 'RRIF')['successor_annuitant'] = {
+        'name': 'Joan Whitmore', 'relationship': 'spouse', 'is_currently_spouse': True, 'is_currently_alive': True}
+    assert not [f for f in analyze_estate_gaps(spouse) if f['rule'] == 'R7']
+
+    assert analyze_book_vectorized([child, spouse], REFERENCE_DATE) == [analyze_estate_gaps(p, as_of = REFERENCE_DATE) for p in (child, spouse)]
+
+
+def test_scenarios_and_spousal_rollover():
+    client = load_profiles()[1]
+    # An ex-spouse does not qualify for the rollover, so the RRSP is income
+    assert household_exposure(client)['deemed_income'] == 198400
+
+    married = copy.deepcopy(client)
+    for account in married['accounts']:
+        if account['type'] == 'RRSP':
+            account['successor_annuitant'] = {'name': 'Partner', 'relationship': 'spouse', 'is_currently_spouse': True, 'is_currently_alive': True}
+            account['beneficiary_primary'] = None
+    exposure = household_exposure(married)
+    widowed = household_exposure(married, {'rollover': False})
+    assert exposure['income_tax'] == 0 and widowed['income_tax'] > 0
+
+    book = [w['client'] for w in generate_book(300, seed = 4)]
+    result = simulate_book(book, [{'name': 'base'}, {'name': 'crash', 'growth': 0.7}, {'name': 'alberta', 'province': 'Alberta'}])
+    assert result['income_tax'].shape == (3, 300)
+    assert result['income_tax'][1].sum() < result['income_tax'][0].sum()
+    assert result['probate'][2].max() <= 525
+    assert household_exposure(book[7])['total'] == result['total'][0, 7]
+
+
+def test_territories_are_taxed_and_unknown_provinces_are_flagged():
+    gerald = load_profiles()[3]
+    yukon = dict(gerald, province = 'YT')
+    typo = dict(gerald, province = 'Albrta')
+
+    assert household_exposure(yukon)['income_tax'] != household_exposure(dict(gerald, province = 'Ontario'))['income_tax']
+    assert household_exposure(yukon)['assumed_province'] == 0
+    assert household_exposure(typo)['assumed_province'] == 1
+    assert household_exposure(typo, {'province': 'Alberta'})['assumed_province'] == 0
+
+    bills = {f['rule']: f['consequence'] for f in analyze_estate_gaps(typo, as_of = REFERENCE_DATE)}
+    assert ASSUMED_LABEL in bills['R7']
+    assert 'in Yukon' in {f['rule']: f['consequence'] for f in analyze_estate_gaps(yukon, as_of = REFERENCE_DATE)}['R7']
+    assert analyze_book_vectorized([yukon, typo], REFERENCE_DATE) == [analyze_estate_gaps(p, as_of = REFERENCE_DATE) for p in (yukon, typo)]
+
+    assert parse_scenario('north:province=Nunavut')['province'] == 'Nunavut'
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_scenario('typo:province=Albrta')
@@ -0,0 +1,49 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from analysis import analyze_estate_gaps
+from bulk import analyze_book
+from vectorized import analyze_book_vectorized
+import copy
+import json
+
+CLIENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'backend', 'config', 'clients.json')
+
+
+def load_profiles():
+    with open(CLIENTS_PATH) as f:
+        return [c['client'] for c in json.load(f)['clients']]
+
+
+def test_vectorized_matches_scalar_on_clients_json():
+    profiles = load_profiles()
+    assert analyze_book_vectorized(profiles) == [analyze_estate_gaps(p) for p in profiles]
+
+
+def test_vectorized_matches_scalar_on_edge_cases():
+    profiles = load_profiles()
+
+    quebec = copy.deepcopy(profiles[0])
+    quebec['province'] = 'QC'
+
+    no_accounts = copy.deepcopy(profiles[4])
+    no_accounts['accounts'] = []
+
+    minor_beneficiary = copy.deepcopy(profiles[2])
+    minor_beneficiary['children'] = [{'name': 'Kid', 'is_minor': True, 'age_months': 4}]
+    for account in minor_beneficiary['accounts']:
+        account['beneficiary_primary'] = {'name': 'Kid', 'relationship': 'child'}
+
+    book = profiles + [quebec, no_accounts, minor_beneficiary]
+    assert analyze_book_vectorized(book) == [analyze_estate_gaps(p) for p in book]
+
+
+def test_bulk_vectorized_engine():
+    profiles = load_profiles() * 3
+    results, _ = analyze_book(profiles, workers = 1, chunk_size = 4, engine = 'vectorized')
+    assert results == [analyze_estate_gaps(p) for p in profiles]